@@ -0,0 +1,198 @@
+"""
+Compact binary history format with memory-mapped, lazy loading.
+
+A binary history file is an 8-byte magic header followed by fixed-width 25-byte records:
+an opcode byte and three little-endian float64 columns (a, b, result). Because every
+record has the same size, record k starts at HEADER_SIZE + k * RECORD_SIZE, so the file
+can be memory-mapped and records decoded only when they are accessed. Results that are
+not real numbers (e.g. complex powers) are stored as NaN.
+"""
+import csv
+import logging
+import math
+import mmap
+import os
+import struct
+from typing import Iterator, List
+
+from app.history_manager import FIELDNAMES, HistoryStorage, OperationCommand
+
+MAGIC = b"CALCHST1"
+HEADER_SIZE = len(MAGIC)
+RECORD = struct.Struct("<Bddd")
+RECORD_SIZE = RECORD.size
+
+# Opcode byte for each operation name; new operations must be appended to keep old files readable
+OPERATIONS: List[str] = ['add', 'subtract', 'multiply', 'divide', 'power', 'mod', 'powmod']
+OPCODES = {operation: code for code, operation in enumerate(OPERATIONS)}
+
+
+def _as_float(value) -> float:
+    """Convert a result to float, mapping values without a float form to NaN."""
+    try:
+        return float(value)
+    except TypeError:
+        return math.nan
+
+
+def pack_record(command: OperationCommand) -> bytes:
+    """
+    Encode one operation as a fixed-width record.
+
+    Raises:
+        ValueError: If the operation has no opcode.
+    """
+    try:
+        opcode = OPCODES[command.operation]
+    except KeyError:
+        raise ValueError(f"Operation '{command.operation}' cannot be stored in binary history") from None
+    return RECORD.pack(opcode, float(command.a), float(command.b), _as_float(command.result))
+
+
+def unpack_record(buffer, offset: int) -> OperationCommand:
+    """Decode the record starting at `offset` in `buffer`."""
+    opcode, a, b, result = RECORD.unpack_from(buffer, offset)
+    return OperationCommand(OPERATIONS[opcode], a, b, result)
+
+
+class BinaryHistoryStorage(HistoryStorage):
+    """
+    History storage backed by a memory-mapped binary history file.
+
+    Nothing is decoded at load time: indexing a record unpacks just that record from the
+    mapping. Appends are written straight to the file, and undo/clear truncate it.
+
+    Attributes:
+        history_file (str): Path of the binary history file.
+    """
+
+    def __init__(self, history_file: str) -> None:
+        self.history_file = history_file
+        self._buffer = None
+        self._mapped_count = 0
+        self._count = 0
+        self.reload()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+        if index >= self._mapped_count:
+            self._map()
+        return unpack_record(self._buffer, HEADER_SIZE + index * RECORD_SIZE)
+
+    def __iter__(self) -> Iterator[OperationCommand]:
+        if self._mapped_count < self._count:
+            self._map()
+        for offset in range(HEADER_SIZE, HEADER_SIZE + self._count * RECORD_SIZE, RECORD_SIZE):
+            yield unpack_record(self._buffer, offset)
+
+    def append(self, command: OperationCommand) -> None:
+        self.extend([command])
+
+    def extend(self, commands: List[OperationCommand]) -> None:
+        data = b"".join(pack_record(command) for command in commands)
+        with open(self.history_file, 'ab') as file:
+            if file.tell() == 0:
+                file.write(MAGIC)
+            file.write(data)
+        self._count += len(commands)
+
+    def pop(self) -> OperationCommand:
+        if not self._count:
+            raise IndexError("pop from empty history")
+        command = self[-1]
+        self._truncate(self._count - 1)
+        return command
+
+    def clear(self) -> None:
+        self._truncate(0)
+
+    def save(self) -> None:
+        # Every mutation is already on disk
+        pass
+
+    def reload(self) -> None:
+        self._unmap()
+        self._count = 0
+        if os.path.exists(self.history_file):
+            size = os.path.getsize(self.history_file)
+            if size:
+                with open(self.history_file, 'rb') as file:
+                    if file.read(HEADER_SIZE) != MAGIC:
+                        raise ValueError(f"{self.history_file} is not a binary history file")
+                self._count = (size - HEADER_SIZE) // RECORD_SIZE
+                if size != HEADER_SIZE + self._count * RECORD_SIZE:
+                    # A partial record left by an interrupted write; later appends must
+                    # start on a record boundary
+                    logging.warning(f"Dropping a partial record at the end of {self.history_file}")
+                    self._truncate(self._count)
+
+    def close(self) -> None:
+        """Release the memory mapping."""
+        self._unmap()
+
+    def _map(self) -> None:
+        """Map the file, falling back to reading it when memory mapping is unavailable."""
+        self._unmap()
+        with open(self.history_file, 'rb') as file:
+            try:
+                self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                self._buffer = file.read()
+        self._mapped_count = (len(self._buffer) - HEADER_SIZE) // RECORD_SIZE
+
+    def _unmap(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._buffer = None
+        self._mapped_count = 0
+
+    def _truncate(self, count: int) -> None:
+        """Shrink the file to its first `count` records."""
+        # The mapping must be released before the file shrinks underneath it
+        self._unmap()
+        with open(self.history_file, 'ab') as file:
+            if file.tell() == 0:
+                file.write(MAGIC)
+            file.truncate(HEADER_SIZE + count * RECORD_SIZE)
+        self._count = count
+
+
+def csv_to_binary(csv_file: str, binary_file: str) -> int:
+    """
+    Convert a CSV history file to the binary format.
+
+    Returns:
+        int: The number of records written.
+    """
+    count = 0
+    with open(csv_file, 'r', newline='') as source, open(binary_file, 'wb') as target:
+        target.write(MAGIC)
+        for row in csv.DictReader(source):
+            target.write(pack_record(OperationCommand(
+                row["operation"], float(row["a"]), float(row["b"]), float(row["result"]))))
+            count += 1
+    return count
+
+
+def binary_to_csv(binary_file: str, csv_file: str) -> int:
+    """
+    Convert a binary history file to the CSV format read by CsvHistoryStorage.
+
+    Returns:
+        int: The number of records written.
+    """
+    storage = BinaryHistoryStorage(binary_file)
+    with open(csv_file, 'w', newline='') as target:
+        writer = csv.DictWriter(target, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(command.to_dict() for command in storage)
+    storage.close()
+    return len(storage)
@@ -1,12 +1,31 @@
 from abc import ABC, abstractmethod
-from app.operations import addition, power, subtraction, multiplication, modulus, division, Number
+from functools import wraps
+from app.operations import addition, modular_power, power, subtraction, multiplication, modulus, division, Number
+
+def memoized(method):
+    """
+    Cache the return value of a no-argument Calculation method.
+
+    The cached value is kept until one of the operands is reassigned. Exceptions are
+    not cached, so e.g. a division by zero raises on every call.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self):
+        cache = self._cache
+        if name not in cache:
+            cache[name] = method(self)
+        return cache[name]
+    return wrapper
 
 class Calculation(ABC):
     """
     Abstract base class representing a mathematical calculation.
     
     This class defines the structure for any arithmetic operation, requiring subclasses
-    to implement the `compute`, `__str__`, and `__repr__` methods. 
+    to implement the `compute`, `__str__`, and `__repr__` methods. Subclasses decorate
+    them with `memoized` so the result and its formatting are computed only once.
 
     Attributes:
     a (Number): The first operand (can be int or float).
@@ -26,8 +45,33 @@ class Calculation(ABC):
         """
         if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
             raise TypeError("Both a and b must be numbers (int or float)")
-        self.a = a
-        self.b = b
+        self._cache = {}
+        self._a = a
+        self._b = b
+
+    @property
+    def a(self) -> Number:
+        """The first operand. Assigning it discards cached results."""
+        return self._a
+
+    @a.setter
+    def a(self, value: Number) -> None:
+        if not isinstance(value, (int, float)):
+            raise TypeError("Both a and b must be numbers (int or float)")
+        self._a = value
+        self._cache.clear()
+
+    @property
+    def b(self) -> Number:
+        """The second operand. Assigning it discards cached results."""
+        return self._b
+
+    @b.setter
+    def b(self, value: Number) -> None:
+        if not isinstance(value, (int, float)):
+            raise TypeError("Both a and b must be numbers (int or float)")
+        self._b = value
+        self._cache.clear()
 
     @classmethod
     def create(cls, a: Number, b: Number) -> 'Calculation':
@@ -82,12 +126,15 @@ class Addition(Calculation):
     Inherits from the Calculation base class and implements the `compute`, `__str__`, and `__repr__` methods.
     """
     
+    @memoized
     def compute(self) -> Number:
         return addition(self.a, self.b)
 
+    @memoized
     def __str__(self) -> str:
         return f"Addition: {self.a} + {self.b} = {self.compute()}"
 
+    @memoized
     def __repr__(self) -> str:
         return f"Addition(a={self.a}, b={self.b}, result={self.compute()})"
     
@@ -107,12 +154,15 @@ class Subtraction(Calculation):
     Inherits from the Calculation base class and implements the `compute`, `__str__`, and `__repr__` methods.
     """
     
+    @memoized
     def compute(self) -> Number:
         return subtraction(self.a, self.b)
 
+    @memoized
     def __str__(self) -> str:
         return f"Subtraction: {self.a} - {self.b} = {self.compute()}"
 
+    @memoized
     def __repr__(self) -> str:
         return f"Subtraction(a={self.a}, b={self.b}, result={self.compute()})"
     
@@ -131,12 +181,15 @@ class Multiplication(Calculation):
     Inherits from the Calculation base class and implements the `compute`, `__str__`, and `__repr__` methods.
     """
     
+    @memoized
     def compute(self) -> Number:
         return multiplication(self.a, self.b)
 
+    @memoized
     def __str__(self) -> str:
         return f"Multiplication: {self.a} * {self.b} = {self.compute()}"
 
+    @memoized
     def __repr__(self) -> str:
         return f"Multiplication(a={self.a}, b={self.b}, result={self.compute()})"
     
@@ -155,6 +208,7 @@ class Division(Calculation):
     Inherits from the Calculation base class and implements the `compute`, `__str__`, and `__repr__` methods.
     """
     
+    @memoized
     def compute(self) -> Number:
         if self.b == 0:
             raise ZeroDivisionError("Division by zero is not allowed")
@@ -174,12 +228,14 @@ class Division(Calculation):
         """
         return cls(a, b)
 
+    @memoized
     def __str__(self) -> str:
         result = self.compute()
         # If the result is a whole number, format it as an integer; otherwise, keep it as a float.
         formatted_result = int(result) if result.is_integer() else result
         return f"Division: {self.a} / {self.b} = {formatted_result}"
 
+    @memoized
     def __repr__(self) -> str:
         result = self.compute()
         formatted_result = int(result) if result.is_integer() else result
@@ -195,7 +251,14 @@ class Power(Calculation):
     
     Inherits from the Calculation base class and implements the `compute`, `__str__`, and `__repr__` methods. 
     """
+    @memoized
     def compute(self) -> Number:
+        """
+        Computes a ** b, estimating the size of the result first.
+
+        Raises:
+            CostLimitError: If the result would be too large to compute (see app.operations.power).
+        """
         return power(self.a, self.b)
 
     @classmethod
@@ -211,9 +274,11 @@ class Power(Calculation):
             Power: A new instance of the Power calculation.
         """
         return cls(a, b)
+    @memoized
     def __str__(self) -> str:
         return f"Power: {self.a} ** {self.b} = {self.compute()}"
 
+    @memoized
     def __repr__(self) -> str:
         return f"Power(a={self.a}, b={self.b}, result={self.compute()})"
 
@@ -241,6 +306,7 @@ class Modulus(Calculation):
         """
         return cls(a, b)
     
+    @memoized
     def compute(self) -> Number:
         """
         Computes the modulus of the two operands.
@@ -255,6 +321,7 @@ class Modulus(Calculation):
             raise ZeroDivisionError("Modulus by zero is not allowed")
         return modulus(self.a, self.b)
     
+    @memoized
     def __str__(self) -> str:
         """
         Returns a user-friendly string representation of the modulus operation.
@@ -264,6 +331,7 @@ class Modulus(Calculation):
         """
         return f"Modulus: {self.a} % {self.b} = {self.compute()}"
     
+    @memoized
     def __repr__(self) -> str:
         """
         Returns a detailed string representation of the modulus operation for debugging.
@@ -276,3 +344,62 @@ class Modulus(Calculation):
     @property
     def operation(self) -> str:
         return 'mod'
+
+class ModularPower(Calculation):
+    """
+    Represents (a ** b) % modulus, computed without building a ** b.
+
+    The modulus is fixed at creation. History records the operation as 'powmod' with its
+    base and exponent only, since history entries hold two operands.
+
+    Attributes:
+        modulus (Number): The modulus; must be a non-zero whole number.
+    """
+
+    def __init__(self, a: Number, b: Number, modulus: Number) -> None:
+        if not isinstance(modulus, (int, float)):
+            raise TypeError("The modulus must be a number (int or float)")
+        super().__init__(a, b)
+        self._modulus = modulus
+
+    @property
+    def modulus(self) -> Number:
+        return self._modulus
+
+    @classmethod
+    def create(cls, a: Number, b: Number, modulus: Number) -> 'ModularPower':
+        """
+        Factory method to create a new ModularPower instance.
+
+        Args:
+            a (Number): The base.
+            b (Number): The exponent.
+            modulus (Number): The modulus.
+
+        Returns:
+            ModularPower: A new instance of the ModularPower calculation.
+        """
+        return cls(a, b, modulus)
+
+    @memoized
+    def compute(self) -> Number:
+        """
+        Computes (a ** b) % modulus in time proportional to the bits of b.
+
+        Raises:
+            ValueError: If an operand is not a whole number.
+            ZeroDivisionError: If the modulus is zero.
+        """
+        return modular_power(self.a, self.b, self.modulus)
+
+    @memoized
+    def __str__(self) -> str:
+        return f"ModularPower: {self.a} ** {self.b} mod {self.modulus} = {self.compute()}"
+
+    @memoized
+    def __repr__(self) -> str:
+        return f"ModularPower(a={self.a}, b={self.b}, modulus={self.modulus}, result={self.compute()})"
+
+    @property
+    def operation(self) -> str:
+        return 'powmod'
@@ -1,15 +1,31 @@
-from typing import List, Union
+import time
+from typing import List, Optional, Union
 from app.calculation import Calculation
 from app.history_manager import HistoryManager, OperationCommand
+from app.metrics import METRICS
 from app.operations import Number
 
 
 class Calculator:
-    def __init__(self):
-        self.history_manager = HistoryManager()
+    def __init__(self, history_manager: Optional[HistoryManager] = None, time_budget: Optional[float] = None):
+        # Share the caller's history manager so each operation is persisted exactly once
+        self.history_manager = history_manager if history_manager is not None else HistoryManager()
+        # With a time budget (seconds), calculations run in a worker process that is
+        # replaced when one overruns; see app.time_budget
+        self._runner = None
+        if time_budget:
+            from app.time_budget import BudgetedRunner
+            self._runner = BudgetedRunner(time_budget)
 
     def perform_operation(self, calculation):
-        result = calculation.compute()
+        start = time.perf_counter()
+        if self._runner is not None:
+            result = self._runner.compute(calculation)
+            # Keep the worker's result so formatting the calculation does not recompute it
+            calculation._cache['compute'] = result
+        else:
+            result = calculation.compute()
+        computed = time.perf_counter()
         # Assuming 'calculation' has 'operation', 'a', and 'b' attributes
         operation_command = OperationCommand(
             operation=calculation.operation,  # e.g., 'add', 'subtract'
@@ -18,8 +34,31 @@ class Calculator:
             result=result
         )
         self.history_manager.add_to_history(operation_command)
+        METRICS.observe("compute", computed - start, calculation.operation)
+        METRICS.observe("persist", time.perf_counter() - computed, calculation.operation)
         return result
 
+    def perform_values(self, operation: str, kernel, a: Number, b: Number) -> Number:
+        """
+        Computes `kernel(a, b)` and records it as `operation`, without creating a Calculation.
+
+        The fast path for built-in operations (see app.dispatch); it is timed and recorded
+        like `perform_operation`. It ignores the time budget, so callers use
+        `perform_operation` when one is set.
+        """
+        start = time.perf_counter()
+        result = kernel(a, b)
+        computed = time.perf_counter()
+        self.history_manager.add_values(operation, a, b, result)
+        METRICS.observe("compute", computed - start, operation)
+        METRICS.observe("persist", time.perf_counter() - computed, operation)
+        return result
+
+    @property
+    def time_budget(self) -> Optional[float]:
+        """Seconds each calculation may take, or None without a budget."""
+        return self._runner.budget if self._runner is not None else None
+
     def get_history(self):
         return self.history_manager.get_full_history()
 
@@ -28,6 +67,11 @@ class Calculator:
 
     def clear_history(self):
         self.history_manager.clear_history()
+
+    def close(self):
+        """Stops the calculation worker, if any."""
+        if self._runner is not None:
+            self._runner.close()
     # In app/calculator/__init__.py or wherever your Calculator class is defined
 
 def perform_operation(self, calculation):
@@ -0,0 +1,95 @@
+"""
+Operation dispatch: a precompiled fast path for the built-in operations and a lazily
+loaded registry for operations added by plugins.
+
+`FAST_OPERATIONS` maps each built-in operation name straight to its `app.operations`
+kernel and a bound format method producing the same text as the matching Calculation's
+`__str__`, so a command can be computed, recorded and printed without creating a
+Calculation. The kernels raise the same errors as the Calculation classes (e.g.
+ZeroDivisionError for a zero divisor).
+
+Calculation subclasses remain the extension point. Plugins register them under the
+`calculator.operations` entry point group, e.g. in a plugin's pyproject.toml:
+
+    [project.entry-points."calculator.operations"]
+    hypot = "calculator_geometry:Hypotenuse"
+
+Entry points are only read the first time an unknown operation is looked up, so
+plugins cost nothing at startup.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Type
+
+from app.calculation import Calculation
+from app.operations import Number, addition, division, modulus, multiplication, power, subtraction
+
+PLUGIN_GROUP = "calculator.operations"
+
+
+class FastOperation(NamedTuple):
+    kernel: Callable[[Number, Number], Number]
+    describe: Callable[[Number, Number, Number], str]
+
+
+def _describe_division(a: Number, b: Number, result: Number) -> str:
+    # Whole results print as integers, like Division.__str__
+    return f"Division: {a} / {b} = {int(result) if result.is_integer() else result}"
+
+
+FAST_OPERATIONS: Dict[str, FastOperation] = {
+    'add': FastOperation(addition, "Addition: {} + {} = {}".format),
+    'subtract': FastOperation(subtraction, "Subtraction: {} - {} = {}".format),
+    'multiply': FastOperation(multiplication, "Multiplication: {} * {} = {}".format),
+    'divide': FastOperation(division, _describe_division),
+    'power': FastOperation(power, "Power: {} ** {} = {}".format),
+    'mod': FastOperation(modulus, "Modulus: {} % {} = {}".format),
+}
+
+
+class OperationRegistry:
+    """
+    Maps operation names to Calculation classes, loading plugins on the first unknown name.
+    """
+
+    def __init__(self, operations: Optional[Dict[str, Type[Calculation]]] = None,
+                 group: str = PLUGIN_GROUP) -> None:
+        self._operations: Dict[str, Type[Calculation]] = dict(operations or {})
+        self.group = group
+        self._plugins_loaded = False
+
+    def register(self, name: str, calculation_class: Type[Calculation]) -> None:
+        """
+        Register a Calculation subclass under `name`.
+
+        Raises:
+            TypeError: If `calculation_class` is not a Calculation subclass.
+        """
+        if not (isinstance(calculation_class, type) and issubclass(calculation_class, Calculation)):
+            raise TypeError(f"{calculation_class!r} is not a Calculation subclass")
+        self._operations[name] = calculation_class
+
+    def get(self, name: str) -> Optional[Type[Calculation]]:
+        """Return the Calculation class for `name`, or None if no operation has that name."""
+        calculation_class = self._operations.get(name)
+        if calculation_class is None and not self._plugins_loaded:
+            self.load_plugins()
+            calculation_class = self._operations.get(name)
+        return calculation_class
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def names(self) -> List[str]:
+        """Return every registered operation name, loading plugins first."""
+        if not self._plugins_loaded:
+            self.load_plugins()
+        return list(self._operations)
+
+    def load_plugins(self) -> None:
+        """Register the Calculation classes advertised by installed plugins; built-ins take precedence."""
+        self._plugins_loaded = True
+        # Imported here: reading package metadata is slow and rarely needed
+        from importlib.metadata import entry_points
+        for entry_point in entry_points(group=self.group):
+            if entry_point.name not in self._operations:
+                self.register(entry_point.name, entry_point.load())
+
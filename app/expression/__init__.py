@@ -0,0 +1,301 @@
+"""
+Arithmetic expression engine with a compiled plan cache.
+
+An expression such as ``(3 + 4) * 2 ** 8 % 7`` is tokenized, parsed into an AST,
+constant-folded and compiled into a `Plan`: a postfix program whose steps are the
+existing Calculation subclasses. Compiled plans are kept in an LRU cache keyed by the
+token-normalized expression text, so repeating a formula skips parsing entirely, however
+it is spaced.
+
+Operators follow Python precedence: ``**`` (right-associative, binds tighter than a
+unary minus on its left), then unary ``-``/``+``, then ``*``, ``/``, ``%``, then ``+``, ``-``.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple, Type, Union
+
+from app.calculation import Addition, Calculation, Division, Modulus, Multiplication, Power, Subtraction
+from app.operations import Number
+
+# Calculation class behind each binary operator
+OPERATORS: Dict[str, Type[Calculation]] = {
+    '+': Addition,
+    '-': Subtraction,
+    '*': Multiplication,
+    '/': Division,
+    '**': Power,
+    '%': Modulus,
+}
+
+# Number of compiled plans kept in the LRU cache
+PLAN_CACHE_SIZE = 256
+
+# Deepest AST accepted; parsing, folding and compiling recurse once per level
+MAX_DEPTH = 100
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|(\*\*|[-+*/%()]))")
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be tokenized or parsed."""
+
+
+class Num(NamedTuple):
+    value: Number
+
+
+class Neg(NamedTuple):
+    operand: 'Node'
+
+
+class BinOp(NamedTuple):
+    symbol: str
+    left: 'Node'
+    right: 'Node'
+
+
+Node = Union[Num, Neg, BinOp]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split an expression into number and operator tokens.
+
+    Raises:
+        ExpressionError: If the text contains anything else.
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise ExpressionError(f"unexpected character '{text[position:].lstrip()[0]}'")
+        tokens.append(match.group(1) or match.group(2))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing an AST from a token list."""
+
+    def __init__(self, tokens: List[str]) -> None:
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ExpressionError("empty expression")
+        node = self.expression()
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"unexpected '{self.tokens[self.position]}'")
+        return node
+
+    def peek(self) -> str:
+        return self.tokens[self.position] if self.position < len(self.tokens) else ''
+
+    def take(self) -> str:
+        token = self.peek()
+        if not token:
+            raise ExpressionError("unexpected end of expression")
+        self.position += 1
+        return token
+
+    def descend(self, levels: int = 1) -> None:
+        """Account for `levels` more levels of nesting (negative to leave them)."""
+        self.depth += levels
+        if self.depth > MAX_DEPTH:
+            raise ExpressionError("expression nested too deeply")
+
+    def expression(self) -> Node:
+        node = self.term()
+        levels = 0
+        # Each operator in a chain nests the tree one level deeper on the left
+        while self.peek() in ('+', '-'):
+            symbol = self.take()
+            self.descend()
+            levels += 1
+            node = BinOp(symbol, node, self.term())
+        self.depth -= levels
+        return node
+
+    def term(self) -> Node:
+        node = self.unary()
+        levels = 0
+        while self.peek() in ('*', '/', '%'):
+            symbol = self.take()
+            self.descend()
+            levels += 1
+            node = BinOp(symbol, node, self.unary())
+        self.depth -= levels
+        return node
+
+    def unary(self) -> Node:
+        if self.peek() in ('-', '+'):
+            symbol = self.take()
+            self.descend()
+            operand = self.unary()
+            self.depth -= 1
+            return Neg(operand) if symbol == '-' else operand
+        return self.power()
+
+    def power(self) -> Node:
+        node = self.atom()
+        if self.peek() == '**':
+            self.take()
+            self.descend()
+            node = BinOp('**', node, self.unary())
+            self.depth -= 1
+        return node
+
+    def atom(self) -> Node:
+        token = self.take()
+        if token == '(':
+            self.descend()
+            node = self.expression()
+            self.depth -= 1
+            if self.take() != ')':
+                raise ExpressionError("missing ')'")
+            return node
+        if token in OPERATORS or token == ')':
+            raise ExpressionError(f"unexpected '{token}'")
+        return Num(float(token))
+
+
+def parse(text: str) -> Node:
+    """
+    Parse an expression into an AST.
+
+    Raises:
+        ExpressionError: If the expression is malformed or nested more than MAX_DEPTH levels deep.
+    """
+    return _Parser(tokenize(text)).parse()
+
+
+def fold(node: Node) -> Node:
+    """
+    Replace every constant subtree with its value.
+
+    Subtrees that fail to evaluate (e.g. division by zero) or produce a non-real result
+    are left in place so the error is raised when the plan runs.
+    """
+    if isinstance(node, Num):
+        return node
+    if isinstance(node, Neg):
+        operand = fold(node.operand)
+        return Num(-operand.value) if isinstance(operand, Num) else Neg(operand)
+    left, right = fold(node.left), fold(node.right)
+    if isinstance(left, Num) and isinstance(right, Num):
+        try:
+            value = OPERATORS[node.symbol].create(left.value, right.value).compute()
+        except (ArithmeticError, TypeError, ValueError):
+            value = None
+        if isinstance(value, (int, float)):
+            return Num(value)
+    return BinOp(node.symbol, left, right)
+
+
+Step = Tuple[str, Union[Number, Type[Calculation], None]]
+
+
+class Plan:
+    """
+    A compiled expression: a postfix program over constants and Calculation classes.
+
+    The root operation is not folded, so evaluating a plan returns the root Calculation
+    (to be performed and recorded like any other command). An expression whose root is
+    not a binary operator, such as '7' or '-(2 ** 3)', evaluates to a plain number and
+    has no operation to record.
+
+    Attributes:
+        text (str): The normalized expression text.
+        steps (List[Step]): ('const', value), ('neg', None) or ('op', Calculation class).
+    """
+
+    __slots__ = ('text', 'steps')
+
+    def __init__(self, text: str, steps: List[Step]) -> None:
+        self.text = text
+        self.steps = steps
+
+    def evaluate(self) -> Union[Calculation, Number]:
+        """
+        Run the plan.
+
+        Returns:
+            Calculation or Number: The root calculation, not yet computed, or a plain number.
+
+        Raises:
+            ZeroDivisionError, OverflowError, TypeError: From intermediate calculations.
+        """
+        stack: List = []
+        last = len(self.steps) - 1
+        for index, (kind, argument) in enumerate(self.steps):
+            if kind == 'const':
+                stack.append(argument)
+            elif kind == 'neg':
+                stack.append(-stack.pop())
+            else:
+                b = stack.pop()
+                a = stack.pop()
+                calculation = argument.create(a, b)
+                if index == last:
+                    return calculation
+                stack.append(calculation.compute())
+        return stack.pop()
+
+
+def _emit(node: Node, steps: List[Step]) -> None:
+    if isinstance(node, Num):
+        steps.append(('const', node.value))
+    elif isinstance(node, Neg):
+        _emit(node.operand, steps)
+        steps.append(('neg', None))
+    else:
+        _emit(node.left, steps)
+        _emit(node.right, steps)
+        steps.append(('op', OPERATORS[node.symbol]))
+
+
+def normalize(text: str) -> str:
+    """
+    Rejoin the tokens with single spaces so '(1+2)' and '( 1 + 2 )' share one cache entry.
+
+    Raises:
+        ExpressionError: If the text contains an invalid character.
+    """
+    return " ".join(tokenize(text))
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _compile(text: str) -> Plan:
+    tree = parse(text)
+    if isinstance(tree, BinOp):
+        # Keep the root operation so it is performed and recorded like a regular command
+        tree = BinOp(tree.symbol, fold(tree.left), fold(tree.right))
+    else:
+        tree = fold(tree)
+    steps: List[Step] = []
+    _emit(tree, steps)
+    return Plan(text, steps)
+
+
+def compile_expression(text: str) -> Plan:
+    """
+    Compile an expression, reusing the cached plan for previously seen text.
+
+    Raises:
+        ExpressionError: If the expression is malformed.
+    """
+    return _compile(normalize(text))
+
+
+def plan_cache_info():
+    """Return hit/miss statistics of the plan cache."""
+    return _compile.cache_info()
+
+
+def clear_plan_cache() -> None:
+    """Drop every cached plan."""
+    _compile.cache_clear()
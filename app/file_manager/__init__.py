@@ -1,6 +1,41 @@
+import asyncio
+import functools
+import itertools
+import mmap
 import os
 import logging
-from typing import Any
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, AnyStr, Callable, Dict, IO, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from app.metrics import METRICS
+
+# Chunk size for streaming reads: large enough to amortize system calls, small enough
+# that memory stays flat however big the file is
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Distinguishes temporary files written concurrently by one process
+_temp_counter = itertools.count()
+
+# Threads shared by the async and bulk APIs. File I/O mostly waits on the disk, so more
+# threads than cores pays off, but the bound keeps thousands of files from opening at once
+MAX_IO_WORKERS = 16
+# Failures named individually in a bulk operation's error summary
+MAX_LOGGED_FAILURES = 5
+
+_io_pool: Optional[ThreadPoolExecutor] = None
+_io_pool_lock = threading.Lock()
+
+
+def _get_io_pool() -> ThreadPoolExecutor:
+    """Return the shared I/O thread pool, creating it on first use."""
+    global _io_pool
+    with _io_pool_lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(MAX_IO_WORKERS, thread_name_prefix="file-io")
+        return _io_pool
 
 # Set up logging configuration
 def setup_logging(level: int = logging.INFO) -> None:
@@ -12,16 +47,23 @@ def setup_logging(level: int = logging.INFO) -> None:
     logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class FileManager:
-    def __init__(self, filename: str) -> None:
+    def __init__(self, filename: str, log_each: bool = True) -> None:
         """Initialize FileManager with a specified filename.
         
         Args:
             filename (str): The name of the file to manage.
+            log_each (bool): Whether to log every operation (default: True). Bulk
+                operations turn this off and log one summary instead.
         """
         self.filename = filename
+        self.log_each = log_each
+
+    def _log(self, level: int, message: str) -> None:
+        if self.log_each:
+            logging.log(level, message)
 
     def write_file(self, data: str) -> None:
-        """Write data to a file.
+        """Write data to a file atomically.
         
         Args:
             data (str): The data to write to the file.
@@ -29,12 +71,61 @@ class FileManager:
         Raises:
             IOError: If an I/O error occurs during writing.
         """
+        self.write_chunks((data,))
+
+    def write_chunks(self, chunks: Iterable[AnyStr], binary: bool = False) -> int:
+        """Write chunks from an iterable (e.g. a generator) to the file atomically.
+        
+        The chunks go to a temporary file in the same directory, which is fsynced and
+        then renamed over the file, so a crash mid-write leaves the previous contents
+        intact and only one chunk needs to be in memory at a time.
+        
+        Args:
+            chunks (Iterable[AnyStr]): The str chunks to write, or bytes if `binary`.
+            binary (bool): Whether the chunks are bytes (default: False).
+        
+        Returns:
+            int: The number of characters (or bytes) written.
+        
+        Raises:
+            IOError: If an I/O error occurs during writing.
+        """
+        start = time.perf_counter()
+        written = 0
         try:
-            with open(self.filename, 'w') as file:
-                file.write(data)
-            logging.info(f"Successfully wrote to file: {self.filename}")
+            with self._atomic_open('wb' if binary else 'w') as file:
+                for chunk in chunks:
+                    written += file.write(chunk)
+            METRICS.observe("file.write", time.perf_counter() - start)
+            METRICS.increment("file.bytes_written", written)
+            self._log(logging.INFO, f"Successfully wrote to file: {self.filename}")
+            return written
         except IOError as e:
-            logging.error(f"Failed to write to file '{self.filename}'. Error: {e}")
+            self._log(logging.ERROR, f"Failed to write to file '{self.filename}'. Error: {e}")
+            raise
+
+    @contextmanager
+    def _atomic_open(self, mode: str) -> Iterator[IO]:
+        """Open a temporary file that replaces the file only if the block completes."""
+        directory, name = os.path.split(self.filename)
+        temp_path = os.path.join(directory, f".{name}.{os.getpid()}.{next(_temp_counter)}.tmp")
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            try:
+                # Keep the permissions of the file being replaced
+                os.chmod(temp_path, os.stat(self.filename).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            with open(fd, mode) as file:
+                yield file
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.filename)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
             raise
 
     def read_file(self) -> str:
@@ -47,29 +138,278 @@ class FileManager:
             FileNotFoundError: If the file does not exist.
             IOError: If an I/O error occurs during reading.
         """
+        start = time.perf_counter()
         try:
             with open(self.filename, 'r') as file:
                 content = file.read()
-            logging.info(f"Successfully read from file: {self.filename}")
+            METRICS.observe("file.read", time.perf_counter() - start)
+            METRICS.increment("file.bytes_read", len(content))
+            self._log(logging.INFO, f"Successfully read from file: {self.filename}")
             return content
         except FileNotFoundError:
-            logging.error(f"File not found: {self.filename}")
+            self._log(logging.ERROR, f"File not found: {self.filename}")
             raise
         except IOError as e:
-            logging.error(f"Failed to read from file '{self.filename}'. Error: {e}")
+            self._log(logging.ERROR, f"Failed to read from file '{self.filename}'. Error: {e}")
             raise
 
+    def read_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE, binary: bool = False) -> Iterator[AnyStr]:
+        """Read the file lazily in chunks.
+        
+        Args:
+            chunk_size (int): The maximum characters (or bytes) per chunk.
+            binary (bool): Whether to yield bytes instead of str (default: False).
+        
+        Yields:
+            AnyStr: Successive chunks of the file.
+        
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            IOError: If an I/O error occurs during reading.
+        """
+        # Only time spent reading is measured, not time the consumer holds each chunk
+        elapsed = 0.0
+        total = 0
+        try:
+            with open(self.filename, 'rb' if binary else 'r') as file:
+                while True:
+                    start = time.perf_counter()
+                    chunk = file.read(chunk_size)
+                    elapsed += time.perf_counter() - start
+                    if not chunk:
+                        break
+                    total += len(chunk)
+                    yield chunk
+            METRICS.observe("file.read", elapsed)
+            METRICS.increment("file.bytes_read", total)
+            self._log(logging.INFO, f"Successfully read from file: {self.filename}")
+        except FileNotFoundError:
+            self._log(logging.ERROR, f"File not found: {self.filename}")
+            raise
+        except IOError as e:
+            self._log(logging.ERROR, f"Failed to read from file '{self.filename}'. Error: {e}")
+            raise
+
+    @contextmanager
+    def read_mapped(self) -> Iterator[memoryview]:
+        """Memory-map the file and provide a read-only, zero-copy view of its bytes.
+        
+        Pages are read on demand by the operating system, so the file is never copied
+        into Python memory. The view is only valid inside the `with` block; slices taken
+        from it must not be kept beyond it. Where mapping is unavailable the file is
+        read into memory instead.
+        
+        Yields:
+            memoryview: The contents of the file.
+        
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            IOError: If an I/O error occurs during reading.
+        """
+        start = time.perf_counter()
+        try:
+            with open(self.filename, 'rb') as file:
+                try:
+                    buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    # Empty files cannot be mapped
+                    buffer = file.read()
+        except FileNotFoundError:
+            self._log(logging.ERROR, f"File not found: {self.filename}")
+            raise
+        except IOError as e:
+            self._log(logging.ERROR, f"Failed to read from file '{self.filename}'. Error: {e}")
+            raise
+        METRICS.observe("file.map", time.perf_counter() - start)
+        METRICS.increment("file.bytes_mapped", len(buffer))
+        self._log(logging.INFO, f"Successfully mapped file: {self.filename}")
+        view = memoryview(buffer)
+        try:
+            yield view
+        finally:
+            view.release()
+            if isinstance(buffer, mmap.mmap):
+                try:
+                    buffer.close()
+                except BufferError:
+                    # A slice of the view is still alive; the mapping closes when it is collected
+                    pass
+
     def delete_file(self) -> None:
         """Delete the file, if it exists.
         
         Raises:
             OSError: If an error occurs during deletion.
         """
+        start = time.perf_counter()
         try:
             os.remove(self.filename)
-            logging.info(f"Successfully deleted file: {self.filename}")
+            METRICS.observe("file.delete", time.perf_counter() - start)
+            self._log(logging.INFO, f"Successfully deleted file: {self.filename}")
         except FileNotFoundError:
-            logging.warning(f"File not found for deletion: {self.filename}")
+            self._log(logging.WARNING, f"File not found for deletion: {self.filename}")
         except OSError as e:
-            logging.error(f"Failed to delete file '{self.filename}'. Error: {e}")
+            self._log(logging.ERROR, f"Failed to delete file '{self.filename}'. Error: {e}")
             raise
+
+    async def read_file_async(self) -> str:
+        """Read the file on the shared I/O thread pool without blocking the event loop.
+        
+        Returns:
+            str: The content of the file.
+        """
+        return await self._run_async(self.read_file)
+
+    async def write_file_async(self, data: str) -> None:
+        """Write the file atomically on the shared I/O thread pool without blocking the event loop.
+        
+        Args:
+            data (str): The data to write to the file.
+        """
+        await self._run_async(self.write_file, data)
+
+    async def delete_file_async(self) -> None:
+        """Delete the file on the shared I/O thread pool without blocking the event loop."""
+        await self._run_async(self.delete_file)
+
+    @staticmethod
+    async def _run_async(method: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(_get_io_pool(), functools.partial(method, *args))
+
+
+class BulkResult(NamedTuple):
+    """Outcome of a bulk operation, keyed by filename in the order the files were given.
+
+    Attributes:
+        results (Dict[str, Any]): The value for every file that succeeded (None for writes and deletes).
+        errors (Dict[str, Exception]): The exception for every file that failed.
+    """
+    results: Dict[str, Any]
+    errors: Dict[str, Exception]
+
+
+def _submit(calls: Iterable[Tuple[str, Callable[[], Any]]]) -> Dict[str, Future]:
+    pool = _get_io_pool()
+    return {filename: pool.submit(call) for filename, call in calls}
+
+
+def _report(action: str, futures: Dict[str, Future], start: float) -> BulkResult:
+    """Collect finished futures into a BulkResult and log one summary for the whole batch."""
+    results: Dict[str, Any] = {}
+    errors: Dict[str, Exception] = {}
+    for filename, future in futures.items():
+        error = future.exception()
+        if error is None:
+            results[filename] = future.result()
+        else:
+            errors[filename] = error
+    elapsed = time.perf_counter() - start
+    METRICS.observe(f"file.bulk_{action}", elapsed)
+    logging.info(f"Bulk {action}: {len(results)} of {len(futures)} files succeeded in {elapsed:.3f}s")
+    if errors:
+        METRICS.increment("errors.file_bulk", len(errors))
+        failures = "; ".join(f"{filename}: {error}" for filename, error in list(errors.items())[:MAX_LOGGED_FAILURES])
+        if len(errors) > MAX_LOGGED_FAILURES:
+            failures += f"; and {len(errors) - MAX_LOGGED_FAILURES} more"
+        logging.error(f"Bulk {action} failed for {len(errors)} files: {failures}")
+    return BulkResult(results, errors)
+
+
+def _read_calls(filenames: Iterable[str]) -> List[Tuple[str, Callable[[], Any]]]:
+    return [(filename, FileManager(filename, log_each=False).read_file) for filename in dict.fromkeys(filenames)]
+
+
+def _write_calls(contents: Mapping[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    return [(filename, functools.partial(FileManager(filename, log_each=False).write_file, data))
+            for filename, data in contents.items()]
+
+
+def _delete_calls(filenames: Iterable[str]) -> List[Tuple[str, Callable[[], Any]]]:
+    return [(filename, FileManager(filename, log_each=False).delete_file) for filename in dict.fromkeys(filenames)]
+
+
+def _run_bulk(action: str, calls: List[Tuple[str, Callable[[], Any]]]) -> BulkResult:
+    start = time.perf_counter()
+    futures = _submit(calls)
+    wait(futures.values())
+    return _report(action, futures, start)
+
+
+async def _run_bulk_async(action: str, calls: List[Tuple[str, Callable[[], Any]]]) -> BulkResult:
+    start = time.perf_counter()
+    futures = _submit(calls)
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    remaining = len(futures)
+    counter_lock = threading.Lock()
+
+    def set_done() -> None:
+        # The awaiting task may have been cancelled meanwhile
+        if not done.done():
+            done.set_result(None)
+
+    def finished(_: Future) -> None:
+        nonlocal remaining
+        with counter_lock:
+            remaining -= 1
+            last = remaining == 0
+        if last:
+            loop.call_soon_threadsafe(set_done)
+
+    # One wake-up of the event loop for the whole batch rather than one per file
+    for future in futures.values():
+        future.add_done_callback(finished)
+    if futures:
+        await done
+    return _report(action, futures, start)
+
+
+def read_files(filenames: Iterable[str]) -> BulkResult:
+    """Read many files concurrently.
+
+    Args:
+        filenames (Iterable[str]): The files to read.
+
+    Returns:
+        BulkResult: The contents of every file read and the error for every file that could not be.
+    """
+    return _run_bulk("read", _read_calls(filenames))
+
+
+def write_files(contents: Mapping[str, str]) -> BulkResult:
+    """Write many files concurrently, each one atomically.
+
+    Args:
+        contents (Mapping[str, str]): The data to write, by filename.
+
+    Returns:
+        BulkResult: None for every file written and the error for every file that could not be.
+    """
+    return _run_bulk("write", _write_calls(contents))
+
+
+def delete_files(filenames: Iterable[str]) -> BulkResult:
+    """Delete many files concurrently; files that do not exist count as deleted.
+
+    Args:
+        filenames (Iterable[str]): The files to delete.
+
+    Returns:
+        BulkResult: None for every file deleted and the error for every file that could not be.
+    """
+    return _run_bulk("delete", _delete_calls(filenames))
+
+
+async def read_files_async(filenames: Iterable[str]) -> BulkResult:
+    """Read many files concurrently without blocking the event loop; see `read_files`."""
+    return await _run_bulk_async("read", _read_calls(filenames))
+
+
+async def write_files_async(contents: Mapping[str, str]) -> BulkResult:
+    """Write many files concurrently without blocking the event loop; see `write_files`."""
+    return await _run_bulk_async("write", _write_calls(contents))
+
+
+async def delete_files_async(filenames: Iterable[str]) -> BulkResult:
+    """Delete many files concurrently without blocking the event loop; see `delete_files`."""
+    return await _run_bulk_async("delete", _delete_calls(filenames))
@@ -1,6 +1,43 @@
 import csv
+import io
 import os
-from typing import List, Union
+import threading
+import time
+import weakref
+from abc import abstractmethod
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.metrics import METRICS
+from app.operations import Number
+
+try:
+    import fcntl
+    from fcntl import LOCK_EX, LOCK_SH, LOCK_UN
+except ImportError:  # pragma: no cover - Windows has no advisory file locks
+    fcntl = None
+
+# Column layout shared by every CSV history file
+FIELDNAMES = ["operation", "a", "b", "result"]
+
+# Sidecar file holding the byte offset of every CSV record, one uint64 per record
+INDEX_SUFFIX = ".idx"
+OFFSET_SIZE = array('Q').itemsize
+
+# Block size used when reading a history file backwards
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# Lock file taken by shared CSV histories, next to the history file
+LOCK_SUFFIX = ".lock"
+
+# Bytes before the end of the file remembered to detect that another process rewrote it
+SYNC_CHECK_SIZE = 64
+
+# History file extensions stored in SQLite (app.sqlite_history)
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
 
 # Command pattern for executing operations
 class OperationCommand:
@@ -8,6 +45,8 @@ class OperationCommand:
     Represents a record of an operation performed, used for history tracking.
     """
 
+    __slots__ = ('operation', 'a', 'b', 'result')
+
     def __init__(self, operation: str, a: float, b: float, result: float) -> None:
         self.operation = operation  # The operation performed (e.g., 'add')
         self.a = a                  # The first operand
@@ -16,6 +55,15 @@ class OperationCommand:
 
     def __str__(self) -> str:
         return f"{self.operation} {self.a} {self.b} = {self.result}"
+
+    def __eq__(self, other: object) -> bool:
+        """Two records are equal when they describe the same operation and values."""
+        if not isinstance(other, OperationCommand):
+            return NotImplemented
+        return (self.operation, self.a, self.b, self.result) == (other.operation, other.a, other.b, other.result)
+
+    def __hash__(self) -> int:
+        return hash((self.operation, self.a, self.b, self.result))
     
     def undo_last(self):
         """Undoes the last executed command, if any exist in history."""
@@ -41,73 +89,1119 @@ class OperationCommand:
             "result": self.result
         }
 
+def _format_row(values: list) -> bytes:
+    """Encode one CSV row exactly as csv.DictWriter writes it."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _parse_row(line: bytes) -> 'OperationCommand':
+    """Parse one encoded CSV data row."""
+    operation, a, b, result = next(csv.reader([line.decode('utf-8')]))
+    return OperationCommand(operation, float(a), float(b), float(result))
+
+
+def _exact_float(value) -> Optional[float]:
+    """Return `value` as a float if that conversion is lossless, otherwise None."""
+    if type(value) is float:
+        return value
+    try:
+        converted = float(value)
+    except (TypeError, ValueError):
+        return None
+    return converted if converted == value else None
+
+
+class ColumnarHistory(Sequence):
+    """
+    Compact in-memory list of operations stored as parallel columns.
+
+    Operands and results live in `array('d')` columns and operation names are interned
+    into a small code table, so an entry costs a few dozen bytes instead of a full
+    OperationCommand object. Indexing builds an OperationCommand view on demand. Records
+    whose values cannot be stored losslessly as float (e.g. complex results) are kept
+    as-is in a side table.
+    """
+
+    def __init__(self, commands: Iterable[OperationCommand] = ()) -> None:
+        self.clear()
+        self.extend(commands)
+
+    def clear(self) -> None:
+        """Remove every record."""
+        self._codes = array('H')
+        self._a = array('d')
+        self._b = array('d')
+        self._results = array('d')
+        self._names: List[str] = []
+        self._name_codes: Dict[str, int] = {}
+        self._objects: Dict[int, OperationCommand] = {}
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._codes)))]
+        if index < 0:
+            index += len(self._codes)
+        if not 0 <= index < len(self._codes):
+            raise IndexError("history index out of range")
+        if index in self._objects:
+            return self._objects[index]
+        return OperationCommand(self._names[self._codes[index]], self._a[index], self._b[index], self._results[index])
+
+    def __iter__(self) -> Iterator[OperationCommand]:
+        for index in range(len(self._codes)):
+            yield self[index]
+
+    def append_values(self, operation: str, a: float, b: float, result: float) -> None:
+        """Append one record given as float values, without building an OperationCommand."""
+        code = self._name_codes.get(operation)
+        if code is None:
+            code = self._name_codes[operation] = len(self._names)
+            self._names.append(operation)
+        self._codes.append(code)
+        self._a.append(a)
+        self._b.append(b)
+        self._results.append(result)
+
+    def append(self, command: OperationCommand) -> None:
+        """Append one record."""
+        a, b, result = _exact_float(command.a), _exact_float(command.b), _exact_float(command.result)
+        if a is None or b is None or result is None:
+            self._objects[len(self._codes)] = command
+            a = b = result = float('nan')
+        self.append_values(command.operation, a, b, result)
+
+    def extend(self, commands: Iterable[OperationCommand]) -> None:
+        """Append several records."""
+        for command in commands:
+            self.append(command)
+
+    def pop(self) -> OperationCommand:
+        """Remove and return the last record.
+
+        Raises:
+            IndexError: If the history is empty.
+        """
+        command = self[-1]
+        self._objects.pop(len(self._codes) - 1, None)
+        for column in (self._codes, self._a, self._b, self._results):
+            column.pop()
+        return command
+
+    def replace(self, index: int, command: OperationCommand) -> None:
+        """Overwrite the record at `index`."""
+        a, b, result = _exact_float(command.a), _exact_float(command.b), _exact_float(command.result)
+        if a is None or b is None or result is None:
+            self._objects[index] = command
+            a = b = result = float('nan')
+        else:
+            self._objects.pop(index, None)
+        code = self._name_codes.get(command.operation)
+        if code is None:
+            code = self._name_codes[command.operation] = len(self._names)
+            self._names.append(command.operation)
+        self._codes[index] = code
+        self._a[index] = a
+        self._b[index] = b
+        self._results[index] = result
+
+
+class _Overwritten(dict):
+    """Records a published version can still see that writers have since overwritten, by position."""
+
+    __slots__ = ('length', '__weakref__')
+
+    def __init__(self, length: int) -> None:
+        super().__init__()
+        self.length = length
+
+    # Tracked by identity in a WeakSet, not compared by contents
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+
+class HistorySnapshot(Sequence):
+    """
+    Read-only view of the first `length` records of a ColumnarHistory.
+
+    Records appended to the underlying history later are not visible, so a snapshot stays
+    consistent while writers keep appending. Undo only shortens the published length, so
+    a writer may later overwrite a slot this snapshot still covers; it first saves the old
+    record in the snapshot's `overwritten` table.
+    """
+
+    __slots__ = ('_records', '_length', '_overwritten')
+
+    def __init__(self, records: ColumnarHistory, length: int, overwritten: Optional[Dict] = None) -> None:
+        self._records = records
+        self._length = length
+        self._overwritten = {} if overwritten is None else overwritten
+
+    def _get(self, index: int) -> OperationCommand:
+        # Read the slot before the table: a writer saves to the table before overwriting
+        record = self._records[index]
+        saved = self._overwritten.get(index)
+        return record if saved is None else saved
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("history index out of range")
+        return self._get(index)
+
+    def __iter__(self) -> Iterator[OperationCommand]:
+        for index in range(self._length):
+            yield self._get(index)
+
+    def tail(self, n: int) -> List[OperationCommand]:
+        """Return the last `n` records, oldest first."""
+        return self[max(self._length - n, 0):] if n > 0 else []
+
+
+class HistoryStorage(Sequence):
+    """
+    Abstract base class for the storage behind a HistoryManager.
+
+    A storage is a read-only sequence of OperationCommand records that persists its own
+    mutations. Subclasses decide the on-disk format and how much of it is kept in memory.
+    """
+
+    # Incremented whenever records written by another process are picked up, so caches
+    # built over the storage (e.g. the query index) know to rebuild
+    external_changes = 0
+
+    def tail(self, n: int) -> List[OperationCommand]:
+        """Return the last `n` records, oldest first."""
+        if n <= 0:
+            return []
+        return list(self[max(len(self) - n, 0):])
+
+    @abstractmethod
+    def append(self, command: OperationCommand) -> None:
+        """Append one record and persist it."""
+
+    def append_values(self, operation: str, a: Number, b: Number, result: Number) -> None:
+        """Append one record given as values. Storages that keep columns avoid building a record."""
+        self.append(OperationCommand(operation, a, b, result))
+
+    @abstractmethod
+    def extend(self, commands: List[OperationCommand]) -> None:
+        """Append several records and persist them together."""
+
+    @abstractmethod
+    def pop(self) -> OperationCommand:
+        """Remove and return the last record.
+
+        Raises:
+            IndexError: If the storage is empty.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every record."""
+
+    @abstractmethod
+    def save(self) -> None:
+        """Rewrite the whole file from the current records."""
+
+    @abstractmethod
+    def reload(self) -> None:
+        """Discard in-memory state and read the records from disk again."""
+
+    def flush(self) -> None:
+        """Make sure every record is written to disk. Storages that write synchronously need nothing."""
+
+    def close(self) -> None:
+        """Flush and release any resources held by the storage."""
+        self.flush()
+
+
+class MemoryHistoryStorage(HistoryStorage):
+    """
+    Keeps history only in memory, in a ColumnarHistory, without any file.
+
+    Useful for worker processes and tests that must not touch the history file.
+    """
+
+    def __init__(self) -> None:
+        self._records = ColumnarHistory()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index):
+        return self._records[index]
+
+    def __iter__(self) -> Iterator[OperationCommand]:
+        return iter(self._records)
+
+    def append(self, command: OperationCommand) -> None:
+        self._records.append(command)
+
+    def append_values(self, operation: str, a: Number, b: Number, result: Number) -> None:
+        if type(a) is float and type(b) is float and type(result) is float:
+            self._records.append_values(operation, a, b, result)
+        else:
+            self._records.append(OperationCommand(operation, a, b, result))
+
+    def extend(self, commands: List[OperationCommand]) -> None:
+        self._records.extend(commands)
+
+    def pop(self) -> OperationCommand:
+        return self._records.pop()
+
+    def clear(self) -> None:
+        self._records.clear()
+
+    def save(self) -> None:
+        pass
+
+    def reload(self) -> None:
+        pass
+
+
+class CsvHistoryStorage(HistoryStorage):
+    """
+    Stores history in memory as a ColumnarHistory and persists it to a CSV file.
+
+    Nothing is read at construction; appends go straight to the file. Otherwise the whole
+    file is loaded into memory by the first read. In lazy mode it is not loaded at all:
+    iteration streams the file, `tail` reads backwards from the end, and the whole file
+    is only loaded into memory when a mutation needs it. With `index` enabled a sidecar file of record byte offsets makes
+    reading entry k a single seek. With a `durability` level, appends go through a
+    write-behind HistoryWriter and anything that reads or rewrites the file flushes it first.
+
+    The byte offset of every record is tracked (in memory once loaded, otherwise in the
+    sidecar index or by reading the end of the file), so undo truncates the file to the
+    start of the last record and clear truncates it to the header; neither rewrites rows.
+
+    With `shared`, several processes may use the same file. Every write holds an exclusive
+    `fcntl` lock on `<history file>.lock` and every read a shared one. Before either, the
+    storage compares the file's size and modification time with what it last saw and reads
+    only the rows appended since then; a file that shrank or whose end changed (another
+    process's undo, clear or save) is reloaded. Undo and clear act on the shared history,
+    so undo removes the newest record whichever process wrote it. Queued write-behind
+    records join the in-memory history when they are written, after any records other
+    processes wrote first, so reads flush the queue.
+
+    Attributes:
+        history_file (str): Path of the CSV file.
+        append_only (bool): When True, new records are appended to the file as single rows
+            instead of rewriting the whole history on every add.
+        lazy (bool): When True, the file is not loaded into memory up front.
+        index_file (str or None): Path of the sidecar offset index, if enabled.
+        durability (str or None): Write-behind durability level (see app.history_writer),
+            or None to write synchronously on every add.
+        shared (bool): When True, the file may be written by other processes at the same time.
+    """
+
+    def __init__(self, history_file: str, append_only: bool = True, lazy: bool = False,
+                 index: bool = False, durability: Optional[str] = None, batch_size: int = 100,
+                 flush_interval: float = 0.05, shared: bool = False) -> None:
+        if durability is not None and not append_only:
+            raise ValueError("Write-behind durability requires append_only history")
+        self.history_file = history_file
+        self.append_only = append_only
+        self.lazy = lazy
+        self.index_file = history_file + INDEX_SUFFIX if index else None
+        self.durability = durability
+        self.shared = shared
+        # Guards the in-memory state against the write-behind thread in shared mode, and
+        # makes the file lock reentrant within this process
+        self._mutex = threading.RLock()
+        self._lock_depth = 0
+        self._lock_owner: Optional[int] = None
+        # (size, mtime_ns, last bytes) of the file when this storage last read or wrote it
+        self._synced: Optional[Tuple[int, int, bytes]] = None
+        self._writer = None
+        if durability is not None:
+            from app.history_writer import HistoryWriter
+            self._writer = HistoryWriter(self._write_pending, durability, batch_size, flush_interval)
+        self._records: Optional[ColumnarHistory] = None
+        # Byte offset of every written record, tracked while the records are loaded
+        self._offsets: Optional[array] = None
+        self._count: Optional[int] = None
+        self.reload()
+        if self.index_file and not self._index_is_valid():
+            self.rebuild_index()
+
+    @property
+    def records(self) -> ColumnarHistory:
+        """The in-memory records, loading the whole file on first use."""
+        if self._records is None:
+            self._load()
+        return self._records
+
+    def __len__(self) -> int:
+        self._before_read()
+        if self._records is not None:
+            return len(self._records)
+        if self._count is None:
+            self.flush()
+            if self.index_file:
+                self._count = os.path.getsize(self.index_file) // OFFSET_SIZE
+            else:
+                self._count = self._count_rows()
+        return self._count
+
+    def __getitem__(self, index):
+        self._before_read()
+        if self._records is not None:
+            return self._records[index]
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1 and stop == len(self):
+                return self.tail(stop - start)
+            return list(islice(self._iter_file(), start, stop, step))
+        if index < 0 and not self.index_file:
+            entries = self.tail(-index)
+            if len(entries) < -index:
+                raise IndexError("history index out of range")
+            return entries[0]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if self.index_file:
+            return self._read_indexed(index)
+        return next(islice(self._iter_file(), index, None))
+
+    def __iter__(self) -> Iterator[OperationCommand]:
+        self._before_read()
+        if self._records is not None:
+            return iter(self._records)
+        return self._iter_file()
+
+    def tail(self, n: int) -> List[OperationCommand]:
+        if n <= 0:
+            return []
+        self._before_read()
+        if self._records is not None:
+            return self._records[-n:]
+        if self.index_file:
+            count = len(self)
+            if not count:
+                return []
+            start = self._read_offset(max(count - n, 0))
+            with open(self.history_file, 'rb') as file:
+                file.seek(start)
+                lines = file.read().splitlines()
+        else:
+            lines = self._tail_lines(n)
+        return [_parse_row(line) for line in lines if line]
+
+    def append(self, command: OperationCommand) -> None:
+        self.extend([command])
+
+    def extend(self, commands: List[OperationCommand]) -> None:
+        if not self.append_only:
+            with self._locked():
+                self.records.extend(commands)
+                self.save()
+            return
+        if self.shared:
+            # The records join the in-memory history when written, after other processes' rows
+            if self._writer is not None:
+                self._writer.submit(commands)
+            else:
+                self.append_rows(commands)
+            return
+        if self._records is not None:
+            self._records.extend(commands)
+        elif self._count is not None:
+            self._count += len(commands)
+        if self._writer is not None:
+            self._writer.submit(commands)
+        else:
+            self.append_rows(commands)
+
+    def pop(self) -> OperationCommand:
+        self.flush()
+        with self._locked():
+            return self._pop()
+
+    def _pop(self) -> OperationCommand:
+        if self._records is not None:
+            command = self._records.pop()
+            offset = self._offsets.pop()
+            count = len(self._records)
+        else:
+            # Not loaded: read just the last row, without loading the history
+            lines = self._tail_lines(1)
+            if not lines:
+                raise IndexError("pop from empty history")
+            command = _parse_row(lines[0])
+            if self.index_file:
+                count = os.path.getsize(self.index_file) // OFFSET_SIZE - 1
+                offset = self._read_offset(count)
+            else:
+                count = 0
+                offset = self._last_row_offset()
+            if self._count is not None:
+                self._count -= 1
+        self._truncate(offset, count)
+        return command
+
+    def clear(self) -> None:
+        self.flush()
+        with self._locked():
+            if os.path.exists(self.history_file):
+                with open(self.history_file, 'rb') as file:
+                    header_size = len(file.readline())
+                self._truncate(header_size, 0)
+            self._records = ColumnarHistory()
+            self._offsets = array('Q')
+            self._count = None
+
+    def save(self) -> None:
+        self.flush()
+        with self._locked():
+            self._write_rows(self.records, mode='wb')
+
+    def append_rows(self, commands: Iterable[OperationCommand]) -> None:
+        """
+        Append the given operations to the CSV file without rewriting existing rows.
+
+        The header is written first when the file is missing or empty, so the result
+        stays readable by `reload`.
+        """
+        self._write_rows(commands, mode='ab')
+
+    def reload(self) -> None:
+        self.flush()
+        with self._locked(exclusive=False):
+            self._records = None
+            self._offsets = None
+            self._count = None
+            self._synced = None
+            # The file is read by the first access that needs it
+            if self.shared:
+                self._mark_synced()
+
+    def flush(self) -> None:
+        """Write any records still queued in the write-behind writer."""
+        # The writer needs the lock to write, so the thread holding it must not wait for it
+        if self._writer is not None and self._lock_owner != threading.get_ident():
+            self._writer.flush()
+
+    def close(self) -> None:
+        """Stop the write-behind writer after writing every queued record."""
+        if self._writer is not None:
+            self._writer.close()
+
+    def rebuild_index(self) -> None:
+        """Rewrite the sidecar offset index by scanning the CSV file once."""
+        self.flush()
+        offsets = array('Q')
+        if os.path.exists(self.history_file):
+            with open(self.history_file, 'rb') as file:
+                position = len(file.readline())
+                for line in file:
+                    if line.strip():
+                        offsets.append(position)
+                    position += len(line)
+        with open(self.index_file, 'wb') as index:
+            offsets.tofile(index)
+        self._count = None
+
+    def _load(self) -> None:
+        """Read the whole CSV file into memory, noting where each record starts."""
+        self.flush()
+        start = time.perf_counter()
+        records = ColumnarHistory()
+        offsets = array('Q')
+        if os.path.exists(self.history_file):
+            with open(self.history_file, 'rb') as file:
+                position = len(file.readline())
+
+                def rows() -> Iterator[str]:
+                    nonlocal position
+                    for line in file:
+                        if line.strip():
+                            offsets.append(position)
+                            yield line.decode('utf-8')
+                        position += len(line)
+
+                append_values = records.append_values
+                for operation, a, b, result in csv.reader(rows()):
+                    append_values(operation, float(a), float(b), float(result))
+        self._records, self._offsets = records, offsets
+        if self.shared:
+            self._mark_synced()
+        METRICS.observe("history.load", time.perf_counter() - start)
+
+    def _write_pending(self, commands: List[OperationCommand]) -> None:
+        """Write callback for the HistoryWriter; fsyncs unless durability is 'exit'."""
+        self._write_rows(commands, mode='ab', sync=self.durability != 'exit')
+
+    def _write_rows(self, commands: Iterable[OperationCommand], mode: str, sync: bool = False) -> None:
+        """Write rows in binary mode ('wb' rewrites, 'ab' appends), keeping the index in step."""
+        with self._locked():
+            if self.shared and mode == 'ab':
+                commands = list(commands)
+                if self._records is not None:
+                    self._records.extend(commands)
+                elif self._count is not None:
+                    self._count += len(commands)
+            self._write_rows_locked(commands, mode, sync)
+
+    def _write_rows_locked(self, commands: Iterable[OperationCommand], mode: str, sync: bool) -> None:
+        start = time.perf_counter()
+        chunks: List[bytes] = []
+        offsets = array('Q')
+        with open(self.history_file, mode) as file:
+            position = file.tell()
+            if position == 0:
+                chunks.append(_format_row(FIELDNAMES))
+                position = len(chunks[0])
+            for command in commands:
+                row = _format_row([command.operation, command.a, command.b, command.result])
+                offsets.append(position)
+                position += len(row)
+                chunks.append(row)
+            file.write(b"".join(chunks))
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        if self.index_file:
+            with open(self.index_file, mode) as index:
+                offsets.tofile(index)
+        if self._offsets is not None:
+            if mode == 'wb':
+                self._offsets = offsets
+            else:
+                self._offsets.extend(offsets)
+        if self.shared:
+            self._mark_synced()
+        METRICS.observe("history.write", time.perf_counter() - start)
+        METRICS.increment("history.rows_written", len(offsets))
+
+    def _truncate(self, size: int, count: int) -> None:
+        """Cut the file to `size` bytes and, with an index, the sidecar to `count` records."""
+        start = time.perf_counter()
+        with open(self.history_file, 'r+b') as file:
+            file.truncate(size)
+        if self.index_file:
+            with open(self.index_file, 'r+b') as index:
+                index.truncate(count * OFFSET_SIZE)
+        if self.shared:
+            self._mark_synced()
+        METRICS.observe("history.truncate", time.perf_counter() - start)
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True) -> Iterator[None]:
+        """
+        In shared mode, hold the file lock and pick up other processes' changes first.
+
+        Nested calls reuse the outer lock, which must then be exclusive if any inner call is.
+        """
+        if not self.shared:
+            yield
+            return
+        with self._mutex:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(self.history_file + LOCK_SUFFIX, 'ab') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), LOCK_EX if exclusive else LOCK_SH)
+                self._lock_depth = 1
+                self._lock_owner = threading.get_ident()
+                try:
+                    self._sync()
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    self._lock_owner = None
+                    if fcntl is not None:
+                        fcntl.flock(lock.fileno(), LOCK_UN)
+
+    def _before_read(self) -> None:
+        """Load a deferred history, and in shared mode pick up other processes' rows first."""
+        if self._records is None and not self.lazy:
+            self.flush()
+            with self._locked(exclusive=False):
+                if self._records is None:
+                    self._load()
+        elif self.shared:
+            self.flush()
+            with self._locked(exclusive=False):
+                pass
+
+    def _file_state(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.history_file)
+        except FileNotFoundError:
+            return 0, 0
+        return stat.st_size, stat.st_mtime_ns
+
+    def _mark_synced(self) -> None:
+        """Remember the file as this storage has just read or written it."""
+        size, mtime = self._file_state()
+        end = b""
+        if size:
+            with open(self.history_file, 'rb') as file:
+                file.seek(max(size - SYNC_CHECK_SIZE, 0))
+                end = file.read()
+        self._synced = (size, mtime, end)
+
+    def _sync(self) -> None:
+        """
+        Bring the in-memory state up to date with the file; the caller holds the file lock.
+
+        Rows appended since the last read or write are parsed and appended. Any other
+        change reloads the file.
+        """
+        if self._synced is None:
+            return
+        synced_size, synced_mtime, end = self._synced
+        size, mtime = self._file_state()
+        if (size, mtime) == (synced_size, synced_mtime):
+            return
+        self.external_changes += 1
+        METRICS.increment("history.external_changes")
+        appended = size > synced_size
+        if appended and end:
+            with open(self.history_file, 'rb') as file:
+                file.seek(synced_size - len(end))
+                appended = file.read(len(end)) == end
+        if self._records is None:
+            # Lazy: nothing is cached but the record count
+            self._count = None
+            self._mark_synced()
+        elif not appended:
+            self._load()
+        else:
+            self._load_appended(synced_size)
+
+    def _load_appended(self, position: int) -> None:
+        """Parse the rows from byte `position` to the end into the in-memory records."""
+        offsets = self._offsets
+        append_values = self._records.append_values
+        with open(self.history_file, 'rb') as file:
+            file.seek(position)
+            if position == 0:
+                position = len(file.readline())
+            for line in file:
+                if line.strip():
+                    offsets.append(position)
+                    operation, a, b, result = next(csv.reader([line.decode('utf-8')]))
+                    append_values(operation, float(a), float(b), float(result))
+                position += len(line)
+        self._mark_synced()
+
+    def _last_row_offset(self) -> int:
+        """Find where the last data row starts by reading backwards from the end of the file."""
+        with open(self.history_file, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            position = file.tell()
+            data = b""
+            while position > 0:
+                step = min(TAIL_BLOCK_SIZE, position)
+                position -= step
+                file.seek(position)
+                data = file.read(step) + data
+                # The newline ending the previous row, ignoring the one ending the last row
+                newline = data.rstrip(b"\r\n").rfind(b"\n")
+                if newline >= 0:
+                    return position + newline + 1
+        return 0
+
+    def _index_is_valid(self) -> bool:
+        """Cheap consistency check: the last indexed row must end exactly at EOF."""
+        if not os.path.exists(self.index_file):
+            return False
+        if not os.path.exists(self.history_file):
+            return os.path.getsize(self.index_file) == 0
+        count = os.path.getsize(self.index_file) // OFFSET_SIZE
+        with open(self.history_file, 'rb') as file:
+            if not count:
+                file.readline()
+                return not file.read().strip()
+            file.seek(self._read_offset(count - 1))
+            return len(file.read().splitlines()) == 1
+
+    def _read_offset(self, index: int) -> int:
+        """Read the byte offset of record `index` from the sidecar index."""
+        self.flush()
+        with open(self.index_file, 'rb') as file:
+            file.seek(index * OFFSET_SIZE)
+            offset = array('Q')
+            offset.frombytes(file.read(OFFSET_SIZE))
+        return offset[0]
+
+    def _read_indexed(self, index: int) -> OperationCommand:
+        with open(self.history_file, 'rb') as file:
+            file.seek(self._read_offset(index))
+            return _parse_row(file.readline())
+
+    def _iter_file(self) -> Iterator[OperationCommand]:
+        """Stream records from the CSV file without loading it."""
+        self.flush()
+        if not os.path.exists(self.history_file):
+            return
+        with open(self.history_file, 'rb') as file:
+            file.readline()
+            for line in file:
+                if line.strip():
+                    yield _parse_row(line)
+
+    def _count_rows(self) -> int:
+        self.flush()
+        if not os.path.exists(self.history_file):
+            return 0
+        with open(self.history_file, 'rb') as file:
+            file.readline()
+            return sum(1 for line in file if line.strip())
+
+    def _tail_lines(self, n: int) -> List[bytes]:
+        """Return the last `n` data lines, reading the file backwards in blocks."""
+        self.flush()
+        if not os.path.exists(self.history_file):
+            return []
+        with open(self.history_file, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            position = file.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= n:
+                step = min(TAIL_BLOCK_SIZE, position)
+                position -= step
+                file.seek(position)
+                data = file.read(step) + data
+        lines = [line for line in data.splitlines() if line.strip()]
+        if position == 0:
+            lines = lines[1:]
+        return lines[-n:]
+
+
 class HistoryManager:
     """
-    Manages the history of executed operations using lists.
+    Manages the history of executed operations.
 
     This class allows adding to, retrieving, saving, loading, clearing, and undoing history records.
-    Calculation history is stored in a CSV file for persistence across sessions.
+    Calculation history is stored in a CSV file for persistence across sessions, in the compact
+    binary format of `app.binary_history` when the history file ends in '.bin', or in an SQLite
+    database (`app.sqlite_history`) when it ends in '.db', '.sqlite' or '.sqlite3'.
+
+    Changes are serialized by a lock, so several threads may add, undo and clear through
+    one manager. With `thread_safe`, readers additionally get consistent snapshots without
+    waiting for writers: the manager keeps a columnar copy of the history in memory, and
+    `get_full_history`, `get_latest`, `get_entry` and `iter_history` read a prefix of it
+    that later appends do not touch. Undo takes constant time: it only shortens the
+    published prefix, and an append that later reuses the popped slot first saves the old
+    record for the snapshots that can still see it. Clear starts a new copy.
     """
 
-    def __init__(self, history_file: str = "history.csv") -> None:
-        """Initializes the history manager with a specified history file."""
+    def __init__(self, history_file: str = "history.csv", append_only: bool = True,
+                 storage: Optional[HistoryStorage] = None, lazy: bool = False,
+                 index: bool = False, durability: Optional[str] = None, batch_size: int = 100,
+                 flush_interval: float = 0.05, segment_rows: Optional[int] = None,
+                 segment_bytes: Optional[int] = None, compress_segments: bool = True,
+                 retain_segments: Optional[int] = None, thread_safe: bool = False,
+                 shared: bool = False) -> None:
+        """
+        Initializes the history manager with a specified history file.
+
+        Args:
+            history_file (str): Path of the file used for persistence.
+            append_only (bool): When True, new operations are appended to a CSV file as a
+                single row instead of rewriting the whole history on every add.
+            storage (HistoryStorage, optional): Storage to use instead of the one picked
+                from the history file extension.
+            lazy (bool): When True, a CSV history is read from disk on demand instead of
+                being loaded into memory up front.
+            index (bool): When True, a CSV history keeps a sidecar offset index so any
+                entry can be read with a single seek.
+            durability (str, optional): Write-behind level for a CSV history: 'always',
+                'batch' or 'exit' (see app.history_writer). None writes synchronously.
+            batch_size (int): Pending records that trigger a write with 'batch' durability.
+            flush_interval (float): Seconds a record may stay queued with 'batch' durability.
+            segment_rows (int, optional): Split a CSV history into segment files of at most
+                this many records (see app.segmented_history).
+            segment_bytes (int, optional): Split a CSV history into segment files of about
+                this many bytes.
+            compress_segments (bool): Gzip full segments in the background.
+            retain_segments (int, optional): Full segments kept; older ones are deleted.
+            thread_safe (bool): Serve reads from lock-free snapshots of an in-memory copy.
+                With `shared`, reads take the lock to pick up other processes' changes,
+                rebuilding the copy whenever there are any.
+            shared (bool): Let several processes use the same CSV or SQLite history file at
+                once (see CsvHistoryStorage and SqliteHistoryStorage).
+        """
         self.history_file = history_file
-        self._history: List[OperationCommand] = []  # Stores the history as a list of OperationCommand
-        # Load existing history if available
-        self.load_history()
+        self.append_only = append_only
+        self.lazy = lazy
+        self.index = index
+        self.durability = durability
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_rows = segment_rows
+        self.segment_bytes = segment_bytes
+        self.compress_segments = compress_segments
+        self.retain_segments = retain_segments
+        self.shared = shared
+        if storage is None:
+            storage = self._default_storage()
+        self._history: HistoryStorage = storage
+        # Query index, built by the first query and then kept in step with every change
+        self._index: Optional['HistoryIndex'] = None
+        # external_changes of the storage when the index was built
+        self._index_changes = 0
+        # Serializes changes to the storage, the index and the snapshot copy
+        self._lock = threading.RLock()
+        self.thread_safe = thread_safe
+        # With thread_safe, (records, length, overwritten) of the latest state; readers take
+        # it without locking, and writers replace it only after a change is complete
+        self._published: Optional[Tuple[ColumnarHistory, int, _Overwritten]] = None
+        # The overwritten tables of published versions that may still be read
+        self._versions: 'weakref.WeakSet[_Overwritten]' = weakref.WeakSet()
+        # external_changes of the storage when the snapshot copy was last rebuilt
+        self._published_changes = 0
+        if thread_safe:
+            self._republish()
+
+    def _republish(self) -> None:
+        """Rebuild the snapshot copy from the storage; the caller holds the lock (or is __init__)."""
+        records = ColumnarHistory(self._history)
+        self._published_changes = self._history.external_changes
+        self._publish(records, len(records))
+
+    def _publish(self, records: ColumnarHistory, length: int) -> None:
+        """Make the first `length` records the state snapshots see; the caller holds the lock."""
+        overwritten = _Overwritten(length)
+        self._versions.add(overwritten)
+        self._published = (records, length, overwritten)
+
+    def _republish_if_changed(self) -> bool:
+        """Rebuild the snapshot copy if other processes changed a shared history; the caller holds the lock."""
+        # Reading the length picks up records other processes added to a shared history
+        len(self._history)
+        if self._published_changes == self._history.external_changes:
+            return False
+        self._republish()
+        return True
+
+    def _default_storage(self) -> HistoryStorage:
+        """
+        Create the storage matching the history file extension.
+
+        Raises:
+            ValueError: If CSV-only options are combined with a '.bin' or SQLite history file.
+        """
+        segmented = self.segment_rows or self.segment_bytes
+        if segmented and (self.history_file.endswith(SQLITE_SUFFIXES + ('.bin',)) or self.lazy or self.index):
+            raise ValueError("Segmented history requires a CSV history file without lazy or index")
+        if self.shared and (segmented or self.history_file.endswith('.bin')):
+            raise ValueError("shared is only supported by CSV and SQLite history files")
+        if segmented:
+            from app.segmented_history import SegmentedHistoryStorage
+            return SegmentedHistoryStorage(self.history_file, segment_rows=self.segment_rows,
+                                           segment_bytes=self.segment_bytes, compress=self.compress_segments,
+                                           retain_segments=self.retain_segments, append_only=self.append_only,
+                                           durability=self.durability, batch_size=self.batch_size,
+                                           flush_interval=self.flush_interval)
+        if self.history_file.endswith(SQLITE_SUFFIXES):
+            if not self.append_only or self.lazy or self.index:
+                raise ValueError("append_only=False, lazy and index are not supported by SQLite history files")
+            from app.sqlite_history import SqliteHistoryStorage
+            return SqliteHistoryStorage(self.history_file, durability=self.durability, batch_size=self.batch_size,
+                                        flush_interval=self.flush_interval, shared=self.shared)
+        if self.history_file.endswith('.bin'):
+            if not self.append_only or self.lazy or self.index or self.durability is not None:
+                raise ValueError("append_only=False, lazy, index and durability are not supported "
+                                 "by binary history files")
+            from app.binary_history import BinaryHistoryStorage
+            return BinaryHistoryStorage(self.history_file)
+        return CsvHistoryStorage(self.history_file, append_only=self.append_only, lazy=self.lazy,
+                                 index=self.index, durability=self.durability, batch_size=self.batch_size,
+                                 flush_interval=self.flush_interval, shared=self.shared)
 
     def add_to_history(self, operation: 'OperationCommand') -> None:
-        """Add an operation to the history and save it to CSV."""
-        self._history.append(operation)
-        self.save_history()
+        """Add an operation to the history and persist it."""
+        with self._lock:
+            self._history.append(operation)
+            self._index_added([operation])
+            if self._published is not None:
+                self._publish_added([operation])
+
+    def add_values(self, operation: str, a: Number, b: Number, result: Number) -> None:
+        """Add an operation given as values, without building an OperationCommand when possible."""
+        if self._index is not None or self._published is not None:
+            self.add_to_history(OperationCommand(operation, a, b, result))
+            return
+        with self._lock:
+            self._history.append_values(operation, a, b, result)
+
+    def add_many(self, operations: Iterable[OperationCommand]) -> None:
+        """Add several operations to the history and persist them in a single write."""
+        operations = list(operations)
+        if operations:
+            with self._lock:
+                self._history.extend(operations)
+                self._index_added(operations)
+                if self._published is not None:
+                    self._publish_added(operations)
+
+    def _publish_added(self, operations: List[OperationCommand]) -> None:
+        """Append to the snapshot copy and publish the new length; the caller holds the lock."""
+        if self.shared and self._republish_if_changed():
+            return
+        records, length, _ = self._published
+        for operation in operations:
+            if length < len(records):
+                # A slot left behind by undo: older snapshots may still see its record
+                previous = records[length]
+                for version in list(self._versions):
+                    if version.length > length:
+                        version.setdefault(length, previous)
+                records.replace(length, operation)
+            else:
+                records.append(operation)
+            length += 1
+        if length != len(self._history):
+            # The storage dropped old records (segment retention)
+            self._republish()
+        else:
+            self._publish(records, length)
+
+    def snapshot(self) -> Sequence:
+        """
+        Return a consistent read-only view of the history as it is now.
+
+        With `thread_safe` this never waits for writers, except in `shared` mode, where it
+        takes the lock to pick up other processes' changes first. Otherwise it is the live
+        history.
+        """
+        published = self._published
+        if published is None:
+            return self._history
+        if self.shared:
+            with self._lock:
+                self._republish_if_changed()
+                published = self._published
+        return HistorySnapshot(*published)
+
+    def _index_added(self, operations: List[OperationCommand]) -> None:
+        """Keep the query index in step with appended operations."""
+        if self._index is None:
+            return
+        if len(self._index) + len(operations) == len(self._history):
+            self._index.extend(operations)
+        else:
+            # The storage dropped old records (segment retention), shifting every position
+            self._index = None
 
     def get_latest(self, n: int = 1) -> List[OperationCommand]:
-        """Retrieve the latest n operations."""
-        return self._history[-n:]
+        """Retrieve the latest n operations, reading only the end of the history when possible."""
+        return self.snapshot().tail(n)
+
+    def get_entry(self, index: int) -> OperationCommand:
+        """
+        Retrieve a single operation by position (negative positions count from the end).
+
+        Raises:
+            IndexError: If there is no entry at that position.
+        """
+        return self.snapshot()[index]
+
+    def iter_history(self) -> Iterator[OperationCommand]:
+        """Iterate over the history, oldest first, without loading it all when lazy."""
+        return iter(self.snapshot())
 
     def clear_history(self) -> None:
-        """Clear the entire history and remove the CSV file."""
-        self._history = []
-        self.save_history()
+        """Clear the entire history and its persisted records."""
+        with self._lock:
+            self._history.clear()
+            if self._index is not None:
+                self._index.clear()
+            if self._published is not None:
+                self._publish(ColumnarHistory(), 0)
 
-    def get_full_history(self) -> List[OperationCommand]:
-        """Retrieve the entire history."""
-        return self._history
+    def get_full_history(self) -> Sequence:
+        """Retrieve the entire history as a sequence of OperationCommand."""
+        return self.snapshot()
 
     def undo_last(self) -> Union[OperationCommand, None]:
         """Remove the last operation from history and return it."""
-        if self._history:
-            last_entry = self._history.pop()
-            self.save_history()
-            return last_entry
-        return None
+        with self._lock:
+            # Popping directly, rather than checking the length first, avoids loading a deferred history
+            try:
+                operation = self._history.pop()
+            except IndexError:
+                return None
+            if self._index is not None:
+                self._index.pop(operation)
+            if self._published is not None and not (self.shared and self._republish_if_changed()):
+                # Snapshots may still read the popped record, so it stays in place until
+                # an append reuses its slot
+                records, length, _ = self._published
+                self._publish(records, length - 1)
+            return operation
 
     def save_history(self) -> None:
-        """Save the current history to the CSV file."""
-        with open(self.history_file, mode='w', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=["operation", "a", "b", "result"])
-            writer.writeheader()
-            for command in self._history:
-                writer.writerow(command.to_dict())
+        """Rewrite the history file from the current history."""
+        with self._lock:
+            self._history.save()
 
     def pop_last(self) -> Union[OperationCommand, None]:
         """Remove and return the last operation from history."""
-        if self._history:
-            last_command = self._history.pop()
-            self.save_history()
-            return last_command
-        return None
+        return self.undo_last()
 
     def load_history(self) -> None:
-        """Load history from the CSV file if it exists."""
-        if os.path.exists(self.history_file):
-            with open(self.history_file, mode='r') as file:
-                reader = csv.DictReader(file)
-                self._history = [
-                    OperationCommand(
-                        operation=row["operation"],
-                        a=float(row["a"]),
-                        b=float(row["b"]),
-                        result=float(row["result"])
-                    ) for row in reader
-                ]
+        """Reload history from the history file, discarding unsaved in-memory state."""
+        with self._lock:
+            self._history.reload()
+            self._index = None
+            if self._published is not None:
+                self._republish()
+
+    def query(self, query: str) -> List[Tuple[int, OperationCommand]]:
+        """
+        Find the operations matching a query such as 'operation = divide and result > 1e6'.
+
+        The first query indexes the whole history; later ones reuse the index, which is
+        kept up to date by add, undo and clear (see app.history_query).
+
+        Returns:
+            List[Tuple[int, OperationCommand]]: Matching (position, operation) pairs, oldest first.
+
+        Raises:
+            QueryError: If the query is malformed.
+        """
+        from app.history_query import HistoryIndex, parse_query
+        conditions = parse_query(query)
+        with self._lock:
+            # Reading the length picks up records other processes added to a shared history
+            len(self._history)
+            if self._index is None or self._index_changes != self._history.external_changes:
+                self._index_changes = self._history.external_changes
+                self._index = HistoryIndex(self._history)
+            return self._index.search(conditions, self._history.__getitem__)
+
+    def flush(self) -> None:
+        """Write any queued operations to disk."""
+        self._history.flush()
+
+    def close(self) -> None:
+        """Write any queued operations and stop background persistence."""
+        self._history.close()
+
+    def __enter__(self) -> 'HistoryManager':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
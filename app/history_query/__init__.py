@@ -0,0 +1,228 @@
+"""
+Indexed history queries.
+
+A query is a list of conditions joined by 'and', e.g.
+``operation = divide and result > 1e6 and a <= 10``. Fields are `operation` (only `=`)
+and the numeric `a`, `b` and `result` (`=`, `<`, `<=`, `>`, `>=`).
+
+`HistoryIndex` answers queries without scanning the history. It keeps, per operation,
+a posting list of record positions and the operation's results sorted alongside their
+positions, so an operation and a result range are resolved with a dictionary lookup and
+two bisects. Conditions on `a` and `b` are checked only on the records that remain.
+The index is maintained incrementally as records are appended, popped and cleared.
+"""
+import bisect
+import heapq
+import math
+import operator
+import re
+from array import array
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+NUMERIC_FIELDS = ('a', 'b', 'result')
+
+COMPARISONS: Dict[str, Callable[[float, float], bool]] = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+_CONDITION = re.compile(r"\s*(\w+)\s*(<=|>=|==|=|<|>)\s*(\S+)\s*$")
+
+
+class QueryError(ValueError):
+    """Raised when a query cannot be parsed."""
+
+
+class Condition(NamedTuple):
+    field: str
+    comparison: str
+    value: object
+
+
+def parse_query(text: str) -> List[Condition]:
+    """
+    Parse a query such as 'operation = divide and result > 1e6'.
+
+    Raises:
+        QueryError: If a condition is malformed or names an unknown field.
+    """
+    conditions = []
+    for part in re.split(r"\s+and\s+", text.strip(), flags=re.IGNORECASE):
+        match = _CONDITION.match(part)
+        if not match:
+            raise QueryError(f"cannot parse condition '{part.strip()}'")
+        field, comparison, value = match.groups()
+        field = field.lower()
+        if field in ('operation', 'op'):
+            if comparison not in ('=', '=='):
+                raise QueryError("operation only supports '='")
+            conditions.append(Condition('operation', '=', value.lower()))
+        elif field in NUMERIC_FIELDS:
+            try:
+                number = float(value)
+            except ValueError:
+                raise QueryError(f"'{value}' is not a number") from None
+            conditions.append(Condition(field, comparison, number))
+        else:
+            raise QueryError(f"unknown field '{field}', expected operation, a, b or result")
+    return conditions
+
+
+class _SortedIndex:
+    """Values kept in sorted order next to the positions of the records holding them."""
+
+    __slots__ = ('keys', 'positions')
+
+    def __init__(self) -> None:
+        self.keys = array('d')
+        self.positions = array('q')
+
+    @classmethod
+    def build(cls, keys: List[float], positions: List[int]) -> '_SortedIndex':
+        """Index many records at once with a single sort; `positions` must be ascending."""
+        index = cls()
+        # The sort is stable, so equal values stay in position order as `add` keeps them
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        index.keys = array('d', map(keys.__getitem__, order))
+        index.positions = array('q', map(positions.__getitem__, order))
+        return index
+
+    def add(self, value: float, position: int) -> None:
+        # Equal values stay in position order, so the newest is always the last of its run
+        index = bisect.bisect_right(self.keys, value)
+        self.keys.insert(index, value)
+        self.positions.insert(index, position)
+
+    def remove_last(self, value: float) -> None:
+        """Remove the newest record holding `value`."""
+        index = bisect.bisect_right(self.keys, value) - 1
+        del self.keys[index]
+        del self.positions[index]
+
+    def between(self, low: float, low_inclusive: bool, high: float, high_inclusive: bool) -> List[int]:
+        """Return the positions whose value lies in the range, in position order."""
+        start = (bisect.bisect_left if low_inclusive else bisect.bisect_right)(self.keys, low)
+        stop = (bisect.bisect_right if high_inclusive else bisect.bisect_left)(self.keys, high)
+        return sorted(self.positions[start:stop]) if start < stop else []
+
+
+class HistoryIndex:
+    """
+    Per-operation posting lists and sorted result indexes over a history.
+
+    Positions are record indexes in the history, so matches can be fetched with
+    `history[position]`.
+    """
+
+    def __init__(self, commands: Iterable = ()) -> None:
+        self.clear()
+        # Inserting records one by one into the sorted indexes would cost O(n) each, so an
+        # initial history is collected per operation and sorted once
+        results: Dict[str, Tuple[List[float], List[int]]] = {}
+        position = -1
+        for position, command in enumerate(commands):
+            postings = self._postings.get(command.operation)
+            if postings is None:
+                postings = self._postings[command.operation] = array('q')
+                results[command.operation] = ([], [])
+            postings.append(position)
+            result = _indexable(command.result)
+            if result is not None:
+                keys, positions = results[command.operation]
+                keys.append(result)
+                positions.append(position)
+        self._count = position + 1
+        for operation, (keys, positions) in results.items():
+            self._results[operation] = _SortedIndex.build(keys, positions)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        """Forget every record."""
+        self._postings: Dict[str, array] = {}
+        self._results: Dict[str, _SortedIndex] = {}
+        self._count = 0
+
+    def add(self, command) -> None:
+        """Index the record appended at the end of the history."""
+        postings = self._postings.get(command.operation)
+        if postings is None:
+            postings = self._postings[command.operation] = array('q')
+            self._results[command.operation] = _SortedIndex()
+        postings.append(self._count)
+        result = _indexable(command.result)
+        if result is not None:
+            self._results[command.operation].add(result, self._count)
+        self._count += 1
+
+    def extend(self, commands: Iterable) -> None:
+        """Index several appended records."""
+        for command in commands:
+            self.add(command)
+
+    def pop(self, command) -> None:
+        """Unindex `command`, the record just removed from the end of the history."""
+        self._count -= 1
+        self._postings[command.operation].pop()
+        result = _indexable(command.result)
+        if result is not None:
+            self._results[command.operation].remove_last(result)
+
+    def search(self, conditions: List[Condition], fetch: Callable[[int], object]) -> List[Tuple[int, object]]:
+        """
+        Return the (position, record) pairs matching every condition, oldest first.
+
+        Args:
+            conditions (List[Condition]): Parsed query conditions.
+            fetch (Callable): Returns the record at a position, e.g. `history.__getitem__`.
+        """
+        operations = list(self._postings)
+        low, high = (-math.inf, True), (math.inf, True)
+        bounded = False
+        residual = []
+        for condition in conditions:
+            if condition.field == 'operation':
+                operations = [name for name in operations if name == condition.value]
+            elif condition.field == 'result':
+                bounded = True
+                inclusive = condition.comparison in ('=', '==', '<=', '>=')
+                if condition.comparison not in ('<', '<='):
+                    low = _tighter(low, (condition.value, inclusive), upper=False)
+                if condition.comparison not in ('>', '>='):
+                    high = _tighter(high, (condition.value, inclusive), upper=True)
+            else:
+                residual.append(condition)
+
+        if bounded:
+            candidates: Iterable[int] = heapq.merge(*(self._results[name].between(*low, *high)
+                                                      for name in operations))
+        else:
+            candidates = heapq.merge(*(self._postings[name] for name in operations))
+
+        matches = []
+        for position in candidates:
+            command = fetch(position)
+            if all(COMPARISONS[c.comparison](getattr(command, c.field), c.value) for c in residual):
+                matches.append((position, command))
+        return matches
+
+
+def _tighter(current: Tuple[float, bool], new: Tuple[float, bool], upper: bool) -> Tuple[float, bool]:
+    """Return the stricter of two (value, inclusive) range bounds."""
+    if new[0] == current[0]:
+        return current if not current[1] else new
+    return min(current, new) if upper else max(current, new)
+
+
+def _indexable(value) -> Optional[float]:
+    """Return a result as a float for the sorted index, or None if it cannot be ordered."""
+    try:
+        value = float(value)
+    except (TypeError, OverflowError):
+        return None
+    return None if math.isnan(value) else value
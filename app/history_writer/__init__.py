@@ -0,0 +1,178 @@
+"""
+Write-behind persistence for history records.
+
+A HistoryWriter queues records in memory and hands them to a write callable in batches,
+so the command path does not wait for disk I/O. The durability level decides when a
+queued record is guaranteed to be on disk:
+
+- 'always': every record is written (and fsynced) before `submit` returns.
+- 'batch':  a background thread writes whenever `batch_size` records are pending or
+            `flush_interval` seconds have passed since the oldest pending record.
+- 'exit':   records are written only on `flush` or `close`.
+
+A writer that is never closed is closed when it is garbage collected, or at interpreter
+exit, so queued records are not lost with the daemon thread. Neither the background
+thread nor the exit hook keeps the writer alive: the thread holds only a weak reference
+to it between batches.
+"""
+import atexit
+import threading
+import weakref
+from typing import Callable, List, Optional, Sequence
+
+DURABILITY_LEVELS = ('always', 'batch', 'exit')
+
+# Writers not yet closed, closed by the exit hook; weak so that they can still be collected
+_open_writers: 'weakref.WeakSet[HistoryWriter]' = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_writers() -> None:
+    for writer in list(_open_writers):
+        writer.close()
+
+
+class _Queue:
+    """Pending records and the state the background thread waits on, kept apart from the writer."""
+
+    __slots__ = ('condition', 'records', 'closed')
+
+    def __init__(self) -> None:
+        self.condition = threading.Condition()
+        self.records: List = []
+        self.closed = False
+
+
+def _run(writer_ref: 'weakref.ref[HistoryWriter]', queue: _Queue, batch_size: int, flush_interval: float) -> None:
+    """Background loop for 'batch' mode; holds the writer only while writing a batch."""
+    while True:
+        with queue.condition:
+            queue.condition.wait_for(lambda: queue.records or queue.closed)
+            if queue.closed:
+                return
+            queue.condition.wait_for(lambda: len(queue.records) >= batch_size or queue.closed,
+                                     timeout=flush_interval)
+        writer = writer_ref()
+        if writer is None:
+            return
+        writer._flush_in_background()
+        del writer
+
+
+class HistoryWriter:
+    """
+    Queues records and persists them through `write` according to a durability level.
+
+    Attributes:
+        durability (str): One of DURABILITY_LEVELS.
+        batch_size (int): Pending records that trigger a write in 'batch' mode.
+        flush_interval (float): Seconds a record may wait in 'batch' mode.
+    """
+
+    def __init__(self, write: Callable[[List], None], durability: str = 'batch',
+                 batch_size: int = 100, flush_interval: float = 0.05) -> None:
+        """
+        Initialize the writer and, in 'batch' mode, start its background thread.
+
+        Args:
+            write (Callable): Persists a list of records; called with the write lock held.
+            durability (str): One of DURABILITY_LEVELS.
+            batch_size (int): Pending records that trigger a write in 'batch' mode.
+            flush_interval (float): Seconds a record may wait in 'batch' mode.
+
+        Raises:
+            ValueError: If the durability level is unknown.
+        """
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability '{durability}', expected one of {', '.join(DURABILITY_LEVELS)}")
+        self.durability = durability
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._write = write
+        self._queue = _Queue()
+        # Held while a batch is written so batches reach the file in submission order
+        self._write_lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        if durability == 'batch':
+            self._thread = threading.Thread(target=_run, name="history-writer", daemon=True,
+                                            args=(weakref.ref(self), self._queue, batch_size, flush_interval))
+            self._thread.start()
+        _open_writers.add(self)
+
+    def __del__(self) -> None:
+        # Nothing to close if __init__ failed
+        if hasattr(self, '_thread'):
+            self.close()
+
+    @property
+    def pending(self) -> int:
+        """The number of records not yet handed to `write`."""
+        with self._queue.condition:
+            return len(self._queue.records)
+
+    def submit(self, records: Sequence) -> None:
+        """
+        Queue records for writing.
+
+        Raises:
+            RuntimeError: If the writer has been closed.
+        """
+        queue = self._queue
+        with queue.condition:
+            if queue.closed:
+                raise RuntimeError("History writer is closed")
+            queue.records.extend(records)
+            if len(queue.records) >= self.batch_size:
+                queue.condition.notify()
+        if self.durability == 'always':
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write every pending record now.
+
+        Records whose write fails stay queued, ahead of anything submitted since, so the
+        next flush retries them.
+
+        Raises:
+            Exception: The write error, or one from the background thread, re-raised once.
+        """
+        queue = self._queue
+        with self._write_lock:
+            with queue.condition:
+                batch, queue.records = queue.records, []
+            if batch:
+                try:
+                    self._write(batch)
+                except BaseException:
+                    with queue.condition:
+                        queue.records[:0] = batch
+                    raise
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self) -> None:
+        """Stop the background thread and write every pending record."""
+        queue = self._queue
+        with queue.condition:
+            if queue.closed:
+                return
+            queue.closed = True
+            queue.condition.notify()
+        _open_writers.discard(self)
+        # The background thread may itself drop the last reference, closing the writer
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _flush_in_background(self) -> None:
+        """Flush from the background thread, keeping any error for the next flush on the caller's thread."""
+        try:
+            self.flush()
+        except Exception as error:
+            # Imported here: logging is slow to import and only needed on failure
+            import logging
+            logging.error(f"Failed to write history in the background. Error: {error}")
+            self._error = error
@@ -0,0 +1,159 @@
+"""
+Lightweight performance instrumentation.
+
+The shared `METRICS` registry keeps a latency histogram per (stage, operation) pair and
+plain event counters. Histograms use fixed logarithmic buckets, so recording a sample
+is a bisect plus a few increments and memory stays constant however many samples are
+recorded; percentiles are reported as the upper bound of the bucket they fall in.
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Bucket upper bounds in seconds: 100 ns to ~100 s, growing by 25% per bucket
+BUCKET_BOUNDS: List[float] = []
+_bound = 1e-7
+while _bound < 100:
+    BUCKET_BOUNDS.append(_bound)
+    _bound *= 1.25
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram.
+
+    Attributes:
+        count (int): Number of samples recorded.
+        total (float): Sum of all samples in seconds.
+        maximum (float): Largest sample in seconds.
+    """
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def percentile(self, quantile: float) -> float:
+        """Return the latency below which `quantile` of the samples fall."""
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.maximum
+        return self.maximum
+
+
+class MetricsRegistry:
+    """Collects latency histograms and event counters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard everything recorded so far."""
+        with self._lock:
+            self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+            self._counters: Dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float, operation: str = "") -> None:
+        """Record one latency sample for `stage`, optionally per operation type."""
+        key = (stage, operation)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        """Add `amount` to the counter `name`."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def export(self) -> Dict:
+        """Return a picklable copy of everything recorded, e.g. to send it to another process."""
+        with self._lock:
+            return {
+                'histograms': {key: (list(h.buckets), h.count, h.total, h.maximum)
+                               for key, h in self._histograms.items()},
+                'counters': dict(self._counters),
+            }
+
+    def merge(self, state: Dict) -> None:
+        """Add a state returned by `export` into this registry."""
+        with self._lock:
+            for key, (buckets, count, total, maximum) in state['histograms'].items():
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = LatencyHistogram()
+                histogram.buckets = [mine + theirs for mine, theirs in zip(histogram.buckets, buckets)]
+                histogram.count += count
+                histogram.total += total
+                histogram.maximum = max(histogram.maximum, maximum)
+            for name, value in state['counters'].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def histogram(self, stage: str, operation: str = "") -> Optional[LatencyHistogram]:
+        return self._histograms.get((stage, operation))
+
+    def counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def format_table(self) -> str:
+        """Render the histograms and counters as a plain-text table (latencies in microseconds)."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        if not histograms and not counters:
+            return "No statistics recorded yet."
+        lines = [f"{'stage':<14} {'operation':<10} {'count':>8} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10}"]
+        for (stage, operation), histogram in histograms:
+            p50, p95, p99 = (histogram.percentile(q) * 1e6 for q in QUANTILES)
+            lines.append(f"{stage:<14} {operation or '-':<10} {histogram.count:>8} {p50:>10.1f} {p95:>10.1f} {p99:>10.1f}")
+        for name, value in counters:
+            lines.append(f"{name:<25} {value:>8g}")
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = [
+            "# HELP calculator_stage_seconds Latency of calculator stages.",
+            "# TYPE calculator_stage_seconds summary",
+        ]
+        for (stage, operation), histogram in histograms:
+            labels = f'stage="{stage}",operation="{operation}"'
+            for quantile in QUANTILES:
+                lines.append(f'calculator_stage_seconds{{{labels},quantile="{quantile}"}} {histogram.percentile(quantile):.9g}')
+            lines.append(f"calculator_stage_seconds_sum{{{labels}}} {histogram.total:.9g}")
+            lines.append(f"calculator_stage_seconds_count{{{labels}}} {histogram.count}")
+        lines += [
+            "# HELP calculator_events_total Calculator event counters.",
+            "# TYPE calculator_events_total counter",
+        ]
+        lines += [f'calculator_events_total{{event="{name}"}} {value:g}' for name, value in counters]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Write the Prometheus text format to `path`."""
+        with open(path, 'w') as file:
+            file.write(self.to_prometheus())
+
+
+# Registry shared by the whole application
+METRICS = MetricsRegistry()
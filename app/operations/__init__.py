@@ -1,9 +1,25 @@
+import math
 from typing import Union
 
 # Define a type alias for numbers (both int and float)
 
 Number = Union[int, float]
 
+# Largest exact integer power computed, in bits of the result (about 30,000 digits)
+MAX_POWER_BITS = 100_000
+
+# Floats overflow past 2 ** 1024
+FLOAT_MAX_BITS = 1024
+
+# How `power` evaluates a pair of operands, as chosen by `power_strategy`
+POWER_FLOAT = 'float'
+POWER_EXACT = 'exact'
+POWER_REFUSE = 'refuse'
+
+
+class CostLimitError(OverflowError):
+    """Raised instead of starting a computation whose result would be unreasonably large."""
+
 # addition function 
 def addition(a: Number, b: Number) -> Number:
    
@@ -21,8 +37,77 @@ def division(a: Number, b: Number) -> Number:
 
     return a / b  # Return the result of a divided by b
 
+def power_bits(a: Number, b: Number) -> float:
+    """
+    Estimate log2 of |a ** b|, the number of bits of the result, without computing it.
+
+    Returns 0.0 when the estimate is meaningless (a zero, infinite or NaN operand), leaving
+    those cases to the power itself.
+    """
+    if a == 0 or any(isinstance(x, float) and not math.isfinite(x) for x in (a, b)):
+        return 0.0
+    magnitude = math.log2(abs(a))
+    if magnitude == 0:
+        return 0.0
+    try:
+        return b * magnitude
+    except OverflowError:
+        # An integer exponent too large to convert to float
+        return math.inf if (b > 0) == (magnitude > 0) else -math.inf
+
+def power_strategy(a: Number, b: Number) -> str:
+    """
+    Pick how to evaluate a ** b from the estimated size of its result.
+
+    Integer operands with a non-negative exponent are computed exactly, which costs time
+    and memory proportional to the result, so they are refused past MAX_POWER_BITS.
+    Everything else takes the constant-time float path, which is refused past the float
+    range instead of overflowing.
+
+    Returns:
+        str: POWER_EXACT, POWER_FLOAT or POWER_REFUSE.
+    """
+    bits = power_bits(a, b)
+    if isinstance(a, int) and isinstance(b, int) and b >= 0:
+        return POWER_EXACT if bits <= MAX_POWER_BITS else POWER_REFUSE
+    return POWER_FLOAT if bits < FLOAT_MAX_BITS else POWER_REFUSE
+
 def power(a: Number, b: Number) -> Number:
+    """
+    Return a ** b, refusing powers whose result would be too large (see `power_strategy`).
+
+    Raises:
+        CostLimitError: If the result is estimated to be too large.
+    """
+    if power_strategy(a, b) == POWER_REFUSE:
+        bits = power_bits(a, b)
+        size = f"about {int(bits * math.log10(2)) + 1} digits" if math.isfinite(bits) else "too many digits"
+        raise CostLimitError(f"{a} ** {b} has {size}; use 'power a b mod m' for a modular result")
     return a ** b # return the power of a by b 
 
+def modular_power(a: Number, b: Number, m: Number) -> int:
+    """
+    Return (a ** b) % m without building a ** b, in time proportional to the bits of b.
+
+    Args:
+        a (Number): The base; must be integer-valued.
+        b (Number): The exponent; must be integer-valued. A negative exponent uses the
+            modular inverse of a.
+        m (Number): The modulus; must be integer-valued and non-zero.
+
+    Raises:
+        ValueError: If an operand is not integer-valued, or a has no inverse modulo m.
+        ZeroDivisionError: If m is zero.
+    """
+    operands = []
+    for value in (a, b, m):
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError("power with mod requires whole numbers")
+        operands.append(int(value))
+    a, b, m = operands
+    if m == 0:
+        raise ZeroDivisionError("Modulus by zero is not allowed")
+    return pow(a, b, m)
+
 def modulus(a: Number, b: Number) -> Number:
     return a % b  # return float value of a modulus b 
\ No newline at end of file
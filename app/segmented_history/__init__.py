@@ -0,0 +1,335 @@
+"""
+Segmented CSV history with rotation, background compression and retention.
+
+History is split into CSV segment files in a `<history file>.segments` directory. Only
+the newest, active segment is writable; once it reaches `segment_rows` records or
+`segment_bytes` bytes it is sealed and a new one is started, so appends, undo and saves
+only ever touch a bounded file. Sealed segments are immutable and carry their record
+count in their name (`00000007-100000.csv`), so opening the history reads nothing but
+the active segment. A background thread gzips sealed segments (`...csv.gz`), and
+`retain_segments` bounds how many sealed segments are kept, dropping the oldest.
+
+Every rename is atomic, and a sealed segment left next to a reopened active segment of
+the same sequence number (an interrupted undo) is discarded on load.
+"""
+import contextlib
+import csv
+import gzip
+import io
+import os
+import re
+import shutil
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from app.history_manager import ColumnarHistory, CsvHistoryStorage, HistoryStorage, OperationCommand
+from app.metrics import METRICS
+
+# Directory holding the segments of a history file
+SEGMENTS_SUFFIX = ".segments"
+
+# Active segments are '<sequence>.csv', sealed ones '<sequence>-<records>.csv[.gz]'
+SEGMENT_NAME = re.compile(r"^(\d{8})(?:-(\d+))?\.csv(\.gz)?$")
+
+
+class Segment:
+    """A sealed, read-only segment file."""
+
+    __slots__ = ('sequence', 'rows', 'path')
+
+    def __init__(self, sequence: int, rows: int, path: str) -> None:
+        self.sequence = sequence
+        self.rows = rows
+        self.path = path
+
+
+class SegmentedHistoryStorage(HistoryStorage):
+    """
+    History storage split into size- or count-capped CSV segment files.
+
+    Attributes:
+        directory (str): Directory holding the segment files.
+        segment_rows (int or None): Records after which the active segment is sealed.
+        segment_bytes (int or None): File size after which the active segment is sealed.
+        compress (bool): Whether sealed segments are gzipped in the background.
+        retain_segments (int or None): Sealed segments kept; older ones are deleted.
+    """
+
+    def __init__(self, history_file: str, segment_rows: Optional[int] = None,
+                 segment_bytes: Optional[int] = None, compress: bool = True,
+                 retain_segments: Optional[int] = None, append_only: bool = True,
+                 durability: Optional[str] = None, batch_size: int = 100,
+                 flush_interval: float = 0.05) -> None:
+        """
+        Open the segments of `history_file`, reading only the active one.
+
+        Raises:
+            ValueError: If neither segment_rows nor segment_bytes is set.
+        """
+        if not segment_rows and not segment_bytes:
+            raise ValueError("Segmented history needs segment_rows or segment_bytes")
+        self.directory = history_file + SEGMENTS_SUFFIX
+        self.segment_rows = segment_rows
+        self.segment_bytes = segment_bytes
+        self.compress = compress
+        self.retain_segments = retain_segments
+        self._csv_options = dict(append_only=append_only, durability=durability, batch_size=batch_size,
+                                 flush_interval=flush_interval)
+        # Guards the sealed segment list and segment paths against the compaction thread
+        self._lock = threading.Lock()
+        self._sealed: List[Segment] = []
+        self._starts: List[int] = []
+        self._sealed_rows = 0
+        self._cached: Optional[Tuple[Segment, ColumnarHistory]] = None
+        self._compactor = ThreadPoolExecutor(1, thread_name_prefix="history-compactor") if compress else None
+        self._jobs: List[Future] = []
+        self._active: Optional[CsvHistoryStorage] = None
+        self._sequence = 0
+        self.reload()
+
+    @property
+    def segments(self) -> List[str]:
+        """Paths of the sealed segments, oldest first, followed by the active segment."""
+        with self._lock:
+            return [segment.path for segment in self._sealed] + [self._active.history_file]
+
+    def __len__(self) -> int:
+        return self._sealed_rows + len(self._active)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1 and stop == len(self):
+                return self.tail(stop - start)
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index >= self._sealed_rows:
+            return self._active[index - self._sealed_rows]
+        position = bisect_right(self._starts, index) - 1
+        return self._records(self._sealed[position])[index - self._starts[position]]
+
+    def __iter__(self) -> Iterator[OperationCommand]:
+        with self._lock:
+            sealed = list(self._sealed)
+        for segment in sealed:
+            yield from self._records(segment)
+        yield from list(self._active)
+
+    def tail(self, n: int) -> List[OperationCommand]:
+        if n <= 0:
+            return []
+        commands = self._active.tail(n)
+        with self._lock:
+            sealed = list(self._sealed)
+        # Read sealed segments newest first, only as far back as needed
+        for segment in reversed(sealed):
+            if len(commands) >= n:
+                break
+            commands = list(self._records(segment)[-(n - len(commands)):]) + commands
+        return commands
+
+    def append(self, command: OperationCommand) -> None:
+        self.extend([command])
+
+    def extend(self, commands: List[OperationCommand]) -> None:
+        commands = list(commands)
+        while commands:
+            if self._is_full():
+                self._rotate()
+            room = len(commands)
+            if self.segment_rows:
+                room = min(room, self.segment_rows - len(self._active))
+            self._active.extend(commands[:room])
+            commands = commands[room:]
+        if self._is_full():
+            self._rotate()
+
+    def pop(self) -> OperationCommand:
+        if not len(self._active):
+            if not self._sealed:
+                raise IndexError("pop from empty history")
+            self._reopen_last()
+        return self._active.pop()
+
+    def clear(self) -> None:
+        self._wait_for_compaction()
+        with self._lock:
+            for segment in self._sealed:
+                os.remove(segment.path)
+            self._set_sealed([])
+        self._active.clear()
+
+    def save(self) -> None:
+        # Sealed segments never change, so only the active one is rewritten
+        self._active.save()
+
+    def reload(self) -> None:
+        """Rescan the segment directory and load the active segment."""
+        if self._active is not None:
+            self._active.close()
+        self._wait_for_compaction()
+        os.makedirs(self.directory, exist_ok=True)
+        found = {}
+        active_sequence = None
+        for name in sorted(os.listdir(self.directory)):
+            match = SEGMENT_NAME.match(name)
+            path = os.path.join(self.directory, name)
+            if not match:
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                continue
+            sequence, rows, compressed = int(match.group(1)), match.group(2), match.group(3)
+            if rows is None:
+                active_sequence = max(sequence, active_sequence or 0)
+            elif sequence in found and not compressed:
+                # Both forms exist when compaction stopped after the rename; the .gz is complete
+                os.remove(path)
+            else:
+                if sequence in found:
+                    os.remove(found[sequence].path)
+                found[sequence] = Segment(sequence, int(rows), path)
+        sealed = []
+        for sequence, segment in sorted(found.items()):
+            if active_sequence is not None and sequence >= active_sequence:
+                # Left behind by an undo that reopened this segment
+                os.remove(segment.path)
+            else:
+                sealed.append(segment)
+        with self._lock:
+            self._set_sealed(sealed)
+        if active_sequence is None:
+            active_sequence = sealed[-1].sequence + 1 if sealed else 1
+        self._open_active(active_sequence)
+        for segment in sealed:
+            if not segment.path.endswith('.gz'):
+                self._schedule_compaction(segment)
+
+    def flush(self) -> None:
+        """Write any records still queued for the active segment."""
+        self._active.flush()
+
+    def close(self) -> None:
+        """Flush the active segment and wait for background compaction to finish."""
+        self._active.close()
+        if self._compactor is not None:
+            self._compactor.shutdown(wait=True)
+
+    def _is_full(self) -> bool:
+        if self.segment_rows and len(self._active) >= self.segment_rows:
+            return True
+        if self.segment_bytes:
+            path = self._active.history_file
+            return os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes
+        return False
+
+    def _open_active(self, sequence: int) -> None:
+        self._sequence = sequence
+        path = os.path.join(self.directory, f"{sequence:08d}.csv")
+        self._active = CsvHistoryStorage(path, **self._csv_options)
+
+    def _rotate(self) -> None:
+        """Seal the active segment and start the next one."""
+        self._active.close()
+        rows = len(self._active)
+        if not rows:
+            return
+        segment = Segment(self._sequence, rows, os.path.join(self.directory, f"{self._sequence:08d}-{rows}.csv"))
+        os.replace(self._active.history_file, segment.path)
+        with self._lock:
+            sealed = self._sealed + [segment]
+            dropped = []
+            if self.retain_segments is not None and len(sealed) > self.retain_segments:
+                dropped = sealed[:len(sealed) - self.retain_segments]
+                sealed = sealed[len(dropped):]
+            for old in dropped:
+                os.remove(old.path)
+            self._set_sealed(sealed)
+        if dropped:
+            METRICS.increment("history.segments_dropped", len(dropped))
+        self._open_active(self._sequence + 1)
+        self._schedule_compaction(segment)
+
+    def _reopen_last(self) -> None:
+        """Make the newest sealed segment writable again, e.g. to undo past its end."""
+        self._active.close()
+        with self._lock:
+            segment = self._sealed[-1]
+        records = self._records(segment)
+        # The active file only exists once something was appended after the rotation
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._active.history_file)
+        # Write the reopened segment before deleting the sealed copy; reload discards the
+        # sealed copy if we stop in between
+        path = os.path.join(self.directory, f"{segment.sequence:08d}.csv")
+        CsvHistoryStorage(path).extend(list(records))
+        with self._lock:
+            self._set_sealed(self._sealed[:-1])
+            os.remove(segment.path)
+        self._open_active(segment.sequence)
+
+    def _set_sealed(self, sealed: List[Segment]) -> None:
+        """Replace the sealed segment list; the caller holds the lock."""
+        self._sealed = sealed
+        self._starts = []
+        total = 0
+        for segment in sealed:
+            self._starts.append(total)
+            total += segment.rows
+        self._sealed_rows = total
+        if self._cached is not None and self._cached[0] not in sealed:
+            self._cached = None
+
+    def _records(self, segment: Segment) -> ColumnarHistory:
+        """Read a sealed segment, keeping the most recent one decoded for repeated access."""
+        cached = self._cached
+        if cached is not None and cached[0] is segment:
+            return cached[1]
+        with self._lock:
+            path = segment.path
+            # Opened under the lock so compaction cannot delete the file first
+            raw = open(path, 'rb')
+        records = ColumnarHistory()
+        with (gzip.open(raw, 'rb') if path.endswith('.gz') else raw) as file, raw:
+            reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8', newline=''))
+            next(reader, None)
+            append_values = records.append_values
+            for operation, a, b, result in reader:
+                append_values(operation, float(a), float(b), float(result))
+        self._cached = (segment, records)
+        return records
+
+    def _schedule_compaction(self, segment: Segment) -> None:
+        if self._compactor is not None:
+            self._jobs = [job for job in self._jobs if not job.done()]
+            self._jobs.append(self._compactor.submit(self._compress, segment))
+
+    def _wait_for_compaction(self) -> None:
+        for job in self._jobs:
+            job.result()
+        self._jobs = []
+
+    def _compress(self, segment: Segment) -> None:
+        """Gzip a sealed segment and swap it in atomically (runs on the compaction thread)."""
+        start = time.perf_counter()
+        with self._lock:
+            if segment not in self._sealed or segment.path.endswith('.gz'):
+                return
+            source = segment.path
+            raw = open(source, 'rb')
+        target = source + '.gz'
+        with raw, gzip.open(target + '.tmp', 'wb') as compressed:
+            shutil.copyfileobj(raw, compressed)
+        with self._lock:
+            if segment in self._sealed:
+                os.replace(target + '.tmp', target)
+                segment.path = target
+                os.remove(source)
+            else:
+                os.remove(target + '.tmp')
+        METRICS.observe("history.compact", time.perf_counter() - start)
@@ -0,0 +1,248 @@
+"""
+SQLite history storage.
+
+History lives in a single `history` table with an INTEGER PRIMARY KEY, so records keep
+their insertion order, plus indexes on `operation` and `result`. That lets `find`
+answer questions such as "every divide with a result above 1e6" without scanning the
+whole history. The database runs in WAL mode, appends are inserted in one transaction
+per batch, and undo deletes a single row instead of rewriting a file.
+
+With `shared`, several processes may use the same database. SQLite serializes their
+writes; before each read the storage checks `PRAGMA data_version`, which changes when
+another connection commits, and re-counts the rows only then.
+
+Results that are not real numbers (e.g. complex powers) are stored as NULL and read
+back as NaN, like the binary format.
+"""
+import math
+import sqlite3
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from app.history_manager import HistoryStorage, OperationCommand
+from app.history_writer import HistoryWriter
+from app.metrics import METRICS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    operation TEXT NOT NULL,
+    a REAL NOT NULL,
+    b REAL NOT NULL,
+    result REAL
+);
+CREATE INDEX IF NOT EXISTS history_operation ON history (operation);
+CREATE INDEX IF NOT EXISTS history_result ON history (result);
+"""
+
+_COLUMNS = "operation, a, b, result"
+
+# Rows fetched per query while iterating, bounding memory on large histories
+ITER_PAGE_SIZE = 1000
+
+
+def _as_float(value) -> Optional[float]:
+    """Convert a value to float, mapping values without a float form to None (NULL)."""
+    try:
+        return float(value)
+    except (TypeError, OverflowError):
+        return None
+
+
+def _row(command: OperationCommand) -> tuple:
+    return command.operation, float(command.a), float(command.b), _as_float(command.result)
+
+
+def _command(row: tuple) -> OperationCommand:
+    operation, a, b, result = row
+    return OperationCommand(operation, a, b, math.nan if result is None else result)
+
+
+class SqliteHistoryStorage(HistoryStorage):
+    """
+    History storage backed by an SQLite database.
+
+    Nothing is loaded into memory: indexing, `tail` and iteration run queries. With a
+    `durability` level, appends are queued in a write-behind HistoryWriter and inserted one
+    transaction per batch; without one every append is committed before it returns.
+
+    Attributes:
+        history_file (str): Path of the database file, or ':memory:'.
+        durability (str or None): Write-behind durability level (see app.history_writer),
+            or None to commit on every add.
+        shared (bool): When True, other processes may change the database at the same time.
+    """
+
+    def __init__(self, history_file: str, durability: Optional[str] = None, batch_size: int = 100,
+                 flush_interval: float = 0.05, shared: bool = False) -> None:
+        self.history_file = history_file
+        self.durability = durability
+        self.shared = shared
+        # data_version when the row count was last taken
+        self._data_version: Optional[int] = None
+        # The write-behind thread shares the connection, guarded by this lock
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(history_file, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+        self._writer: Optional[HistoryWriter] = None
+        if durability is not None:
+            self._writer = HistoryWriter(self._insert, durability, batch_size, flush_interval)
+        self._count = 0
+        self.reload()
+
+    def __len__(self) -> int:
+        self._sync()
+        return self._count
+
+    def __getitem__(self, index):
+        self._sync()
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            if step != 1:
+                return self[start:stop][::step]
+            return self._select("ORDER BY id LIMIT ? OFFSET ?", max(stop - start, 0), start)
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+        return self._select("ORDER BY id LIMIT 1 OFFSET ?", index)[0]
+
+    def __iter__(self) -> Iterator[OperationCommand]:
+        self.flush()
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT id, {_COLUMNS} FROM history WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, ITER_PAGE_SIZE)).fetchall()
+            for row in rows:
+                yield _command(row[1:])
+            if len(rows) < ITER_PAGE_SIZE:
+                return
+            last_id = rows[-1][0]
+
+    def tail(self, n: int) -> List[OperationCommand]:
+        if n <= 0:
+            return []
+        self._sync()
+        return self._select("ORDER BY id DESC LIMIT ?", n)[::-1]
+
+    def find(self, operation: Optional[str] = None, min_result: Optional[float] = None,
+             max_result: Optional[float] = None) -> List[OperationCommand]:
+        """
+        Return the records matching every given condition, oldest first, using the indexes.
+
+        Args:
+            operation (str, optional): Only records of this operation.
+            min_result (float, optional): Only records whose result is at least this value.
+            max_result (float, optional): Only records whose result is at most this value.
+        """
+        conditions, parameters = [], []
+        if operation is not None:
+            conditions.append("operation = ?")
+            parameters.append(operation)
+        if min_result is not None:
+            conditions.append("result >= ?")
+            parameters.append(min_result)
+        if max_result is not None:
+            conditions.append("result <= ?")
+            parameters.append(max_result)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        return self._select(f"{where}ORDER BY id", *parameters)
+
+    def append(self, command: OperationCommand) -> None:
+        self.extend([command])
+
+    def extend(self, commands: List[OperationCommand]) -> None:
+        self._count += len(commands)
+        if self._writer is not None:
+            self._writer.submit(commands)
+        else:
+            self._insert(commands)
+
+    def pop(self) -> OperationCommand:
+        self._sync()
+        self.flush()
+        with self._lock:
+            # One write transaction, so another process cannot remove the same row in between
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    f"SELECT id, {_COLUMNS} FROM history ORDER BY id DESC LIMIT 1").fetchone()
+                if row is not None:
+                    self._connection.execute("DELETE FROM history WHERE id = ?", (row[0],))
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            if row is None:
+                self._count = 0
+                raise IndexError("pop from empty history")
+            self._count -= 1
+        return _command(row[1:])
+
+    def clear(self) -> None:
+        self.flush()
+        with self._lock:
+            self._connection.execute("DELETE FROM history")
+        self._count = 0
+
+    def save(self) -> None:
+        # Every mutation is committed as it happens
+        self.flush()
+
+    def reload(self) -> None:
+        self.flush()
+        with self._lock:
+            self._data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+            self._count = self._connection.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def _sync(self) -> None:
+        """In shared mode, re-count the rows if another connection committed since the last count."""
+        if not self.shared:
+            return
+        # Queued records must be in the database before it is counted
+        self.flush()
+        with self._lock:
+            if self._connection.execute("PRAGMA data_version").fetchone()[0] == self._data_version:
+                return
+            self.external_changes += 1
+            METRICS.increment("history.external_changes")
+            self.reload()
+
+    def flush(self) -> None:
+        """Insert any records still queued in the write-behind writer."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        """Insert every queued record and close the database connection."""
+        if self._writer is not None:
+            self._writer.close()
+        with self._lock:
+            self._connection.close()
+
+    def _insert(self, commands: List[OperationCommand]) -> None:
+        """Insert records in a single transaction."""
+        start = time.perf_counter()
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(f"INSERT INTO history ({_COLUMNS}) VALUES (?, ?, ?, ?)",
+                                             map(_row, commands))
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        METRICS.observe("history.write", time.perf_counter() - start)
+        METRICS.increment("history.rows_written", len(commands))
+
+    def _select(self, clause: str, *parameters) -> List[OperationCommand]:
+        self.flush()
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {_COLUMNS} FROM history {clause}", parameters).fetchall()
+        return [_command(row) for row in rows]
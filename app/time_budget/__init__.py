@@ -0,0 +1,95 @@
+"""
+Per-calculation time budgets enforced by a worker process.
+
+A calculation cannot be interrupted from inside its own thread, so `BudgetedRunner`
+evaluates calculations in a separate worker process and waits at most the budget for
+the answer. A worker that runs over is terminated and replaced, so one runaway command
+costs its budget and a worker restart instead of stalling the caller.
+
+The worker is started before the first calculation and reports when it is ready, so
+process startup is not charged to any calculation's budget.
+"""
+from app.calculation import Calculation
+from app.metrics import METRICS
+from app.operations import Number
+
+
+class TimeBudgetExceeded(TimeoutError):
+    """Raised when a calculation does not finish within its time budget."""
+
+
+def _serve(connection) -> None:
+    """Worker loop: compute each calculation received and send back its result or error."""
+    connection.send('ready')
+    while True:
+        try:
+            calculation = connection.recv()
+        except EOFError:
+            return
+        try:
+            connection.send((True, calculation.compute()))
+        except Exception as e:
+            connection.send((False, e))
+
+
+class BudgetedRunner:
+    """
+    Computes calculations in a worker process, giving up on any that exceed the budget.
+
+    Attributes:
+        budget (float): Seconds a calculation may take.
+    """
+
+    def __init__(self, budget: float) -> None:
+        if budget <= 0:
+            raise ValueError("The time budget must be positive")
+        self.budget = budget
+        # Imported here so that importing this module (e.g. for TimeBudgetExceeded) stays cheap
+        import multiprocessing
+        # Spawned rather than forked, so the worker does not inherit locks held by other threads
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._connection = None
+
+    def compute(self, calculation: Calculation) -> Number:
+        """
+        Compute `calculation` in the worker within the budget.
+
+        Errors raised by the calculation (e.g. ZeroDivisionError) are re-raised here.
+
+        Raises:
+            TimeBudgetExceeded: If the result does not arrive within the budget.
+        """
+        if self._process is None:
+            self._start()
+        self._connection.send(calculation)
+        if not self._connection.poll(self.budget):
+            self._stop()
+            METRICS.increment("errors.time_budget")
+            raise TimeBudgetExceeded(f"{calculation.operation} did not finish within {self.budget * 1000:g} ms")
+        succeeded, value = self._connection.recv()
+        if not succeeded:
+            raise value
+        return value
+
+    def close(self) -> None:
+        """Stop the worker process."""
+        self._stop()
+
+    def _start(self) -> None:
+        self._connection, child = self._context.Pipe()
+        self._process = self._context.Process(target=_serve, args=(child,), daemon=True,
+                                              name="calculation-worker")
+        self._process.start()
+        child.close()
+        # Wait for the worker's imports to finish before any budget starts counting
+        self._connection.recv()
+
+    def _stop(self) -> None:
+        if self._process is None:
+            return
+        self._process.terminate()
+        self._process.join()
+        self._connection.close()
+        self._process = None
+        self._connection = None
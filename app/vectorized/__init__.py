@@ -0,0 +1,159 @@
+"""
+Vectorized batch computation for the calculator operations using NumPy.
+
+`compute_batch` applies one operation element-wise to whole operand arrays in a
+single NumPy pass instead of building one Calculation object per pair. Results
+match the scalar `app.operations` functions on float inputs. Pairs for which the
+scalar path would raise (or return a non-real number) are flagged in an error
+mask instead of stopping the batch.
+"""
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.history_manager import HistoryManager, OperationCommand
+
+
+def _add(a: np.ndarray, b: np.ndarray):
+    return np.add(a, b), np.zeros(a.shape, dtype=bool)
+
+
+def _subtract(a: np.ndarray, b: np.ndarray):
+    return np.subtract(a, b), np.zeros(a.shape, dtype=bool)
+
+
+def _multiply(a: np.ndarray, b: np.ndarray):
+    return np.multiply(a, b), np.zeros(a.shape, dtype=bool)
+
+
+def _divide(a: np.ndarray, b: np.ndarray):
+    # Division.compute raises ZeroDivisionError for a zero divisor
+    return np.divide(a, b), b == 0
+
+
+def _mod(a: np.ndarray, b: np.ndarray):
+    # np.mod follows Python's sign convention for float modulus
+    return np.mod(a, b), b == 0
+
+
+def _power(a: np.ndarray, b: np.ndarray):
+    results = np.power(a, b)
+    # float ** raises ZeroDivisionError for 0 ** negative, OverflowError for finite
+    # inputs with an infinite result, and returns a complex number for a negative
+    # finite base with a non-integer exponent
+    errors = (a == 0) & (b < 0) & np.isfinite(b)
+    errors |= np.isinf(results) & np.isfinite(a) & np.isfinite(b)
+    errors |= (a < 0) & np.isfinite(a) & np.isfinite(b) & (b != np.floor(b))
+    return results, errors
+
+
+# Kernels keyed by the same operation names as main.operations_map
+KERNELS: Dict[str, Callable] = {
+    'add': _add,
+    'subtract': _subtract,
+    'multiply': _multiply,
+    'divide': _divide,
+    'power': _power,
+    'mod': _mod,
+}
+
+
+class BatchResult:
+    """
+    Results of one operation applied element-wise to two operand arrays.
+
+    Attributes:
+        operation (str): The operation name (e.g. 'divide').
+        a (np.ndarray): The first operands as float64.
+        b (np.ndarray): The second operands as float64.
+        results (np.ndarray): The results; entries flagged in `errors` are NaN.
+        errors (np.ndarray): Boolean mask, True where the scalar operation would fail.
+    """
+
+    def __init__(self, operation: str, a: np.ndarray, b: np.ndarray,
+                 results: np.ndarray, errors: np.ndarray) -> None:
+        self.operation = operation
+        self.a = a
+        self.b = b
+        self.results = results
+        self.errors = errors
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    @property
+    def valid(self) -> np.ndarray:
+        """Boolean mask, True where the result is valid."""
+        return ~self.errors
+
+    def raise_for_errors(self) -> None:
+        """
+        Raise the exception the scalar calculation would raise for the first failing pair.
+
+        Raises:
+            ZeroDivisionError: For a zero divisor in 'divide' or 'mod', or 0 raised to a negative power.
+            OverflowError: For a 'power' result out of float range.
+            ValueError: For a 'power' result that is not a real number.
+        """
+        if not self.errors.any():
+            return
+        index = int(np.argmax(self.errors))
+        a, b = float(self.a[index]), float(self.b[index])
+        if self.operation == 'divide':
+            raise ZeroDivisionError("Division by zero is not allowed")
+        if self.operation == 'mod':
+            raise ZeroDivisionError("Modulus by zero is not allowed")
+        if a == 0:
+            raise ZeroDivisionError(f"0.0 cannot be raised to a negative power (index {index})")
+        if a < 0 and b != int(b):
+            raise ValueError(f"{a} ** {b} is not a real number (index {index})")
+        raise OverflowError(f"{a} ** {b} is out of range (index {index})")
+
+    def to_commands(self) -> List[OperationCommand]:
+        """Build history records for every valid entry."""
+        valid = self.valid
+        return [
+            OperationCommand(self.operation, a, b, result)
+            for a, b, result in zip(self.a[valid].tolist(), self.b[valid].tolist(), self.results[valid].tolist())
+        ]
+
+
+def compute_batch(operation: str, a, b, raise_on_error: bool = False) -> BatchResult:
+    """
+    Compute `operation` element-wise over operand arrays in one vectorized pass.
+
+    Args:
+        operation (str): Any operation name from main.operations_map.
+        a: First operands (array-like, or a scalar broadcast against `b`).
+        b: Second operands (array-like, or a scalar broadcast against `a`).
+        raise_on_error (bool): Raise like the scalar calculation on the first
+            failing pair instead of only flagging it in the error mask.
+
+    Returns:
+        BatchResult: The results and error mask.
+
+    Raises:
+        ValueError: If the operation is unknown or the operands cannot be broadcast.
+    """
+    if operation not in KERNELS:
+        raise ValueError(f"Unknown operation '{operation}'")
+    a_arr, b_arr = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    with np.errstate(all='ignore'):
+        results, errors = KERNELS[operation](a_arr, b_arr)
+    results = np.where(errors, np.nan, results)
+    batch = BatchResult(operation, a_arr, b_arr, results, errors)
+    if raise_on_error:
+        batch.raise_for_errors()
+    return batch
+
+
+def record_batch(history_manager: HistoryManager, batch: BatchResult) -> int:
+    """
+    Record every valid entry of `batch` in history with a single write.
+
+    Returns:
+        int: The number of operations recorded.
+    """
+    commands = batch.to_commands()
+    history_manager.add_many(commands)
+    return len(commands)
@@ -0,0 +1,4 @@
+"""Performance benchmarks for the calculator application.
+
+Each module can be run on its own, e.g. ``python -m benchmarks.bench_history_append``.
+"""
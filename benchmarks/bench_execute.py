@@ -0,0 +1,58 @@
+"""
+Micro-benchmark CommandProcessor.execute per operation type.
+
+Each command is parsed, computed, recorded in history and formatted for output, so the
+numbers reflect the whole per-command path. Output is captured in memory and history is
+written to a temporary directory, or kept in memory with `--memory` to isolate the
+dispatch, compute and formatting cost from disk writes.
+
+Usage:
+    python -m benchmarks.bench_execute --repeat 5000 [--memory]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from app.history_manager import HistoryManager, MemoryHistoryStorage
+from main import CommandProcessor
+
+COMMANDS = {
+    'add': "add 12.5 7.25",
+    'subtract': "subtract 12.5 7.25",
+    'multiply': "multiply 12.5 7.25",
+    'divide': "divide 12.5 7.25",
+    'power': "power 1.0001 5000",
+    'mod': "mod 12.5 7.25",
+}
+
+
+def time_execute(processor: CommandProcessor, command: str, repeat: int) -> float:
+    """Return the mean seconds per execute call for `command`."""
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            processor.execute(command)
+        elapsed = time.perf_counter() - start
+    return elapsed / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5000)
+    parser.add_argument('--memory', action='store_true', help="keep history in memory instead of a CSV file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = MemoryHistoryStorage() if args.memory else None
+        processor = CommandProcessor(HistoryManager(os.path.join(tmp, "history.csv"), storage=storage))
+        print(f"{'operation':>10} {'us/execute':>11}")
+        for operation, command in COMMANDS.items():
+            print(f"{operation:>10} {time_execute(processor, command, args.repeat) * 1e6:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark exporting, importing and removing many small files one at a time vs. in bulk.
+
+Sequential runs call FileManager once per file; bulk runs use `write_files`,
+`read_files` and `delete_files`, and async runs the `*_async` variants under
+asyncio. Every write is atomic and fsynced, so writes are bound by disk latency,
+which is what the shared I/O thread pool overlaps.
+
+Usage:
+    python -m benchmarks.bench_file_bulk --files 2000 --size 4096
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Callable, Dict
+
+from app.file_manager import (FileManager, delete_files, delete_files_async, read_files, read_files_async,
+                              write_files, write_files_async)
+
+
+def sequential(contents: Dict[str, str]) -> Dict[str, Callable[[], object]]:
+    return {
+        'write': lambda: [FileManager(name).write_file(data) for name, data in contents.items()],
+        'read': lambda: [FileManager(name).read_file() for name in contents],
+        'delete': lambda: [FileManager(name).delete_file() for name in contents],
+    }
+
+
+def bulk(contents: Dict[str, str]) -> Dict[str, Callable[[], object]]:
+    return {
+        'write': lambda: write_files(contents),
+        'read': lambda: read_files(contents),
+        'delete': lambda: delete_files(contents),
+    }
+
+
+def bulk_async(contents: Dict[str, str]) -> Dict[str, Callable[[], object]]:
+    return {
+        'write': lambda: asyncio.run(write_files_async(contents)),
+        'read': lambda: asyncio.run(read_files_async(contents)),
+        'delete': lambda: asyncio.run(delete_files_async(contents)),
+    }
+
+
+def run(files: int, size: int) -> None:
+    """Time write, read and delete of `files` files of `size` bytes for each strategy."""
+    # Per-file log lines would otherwise dominate the sequential runs
+    logging.disable(logging.CRITICAL)
+    print(f"{'strategy':>10} {'write files/s':>14} {'read files/s':>13} {'delete files/s':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        contents = {os.path.join(tmp, f"report_{i}.txt"): "x" * size for i in range(files)}
+        for label, strategy in (("sequential", sequential), ("bulk", bulk), ("async", bulk_async)):
+            rates = []
+            for action, call in strategy(contents).items():
+                start = time.perf_counter()
+                call()
+                rates.append(files / (time.perf_counter() - start))
+            print(f"{label:>10} {rates[0]:>14.0f} {rates[1]:>13.0f} {rates[2]:>15.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=4096)
+    args = parser.parse_args()
+    run(args.files, args.size)
+
+
+if __name__ == '__main__':
+    main()
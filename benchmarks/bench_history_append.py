@@ -0,0 +1,56 @@
+"""
+Benchmark the per-append cost of HistoryManager persistence as history grows.
+
+Compares the append-only journal mode against the legacy full-rewrite mode.
+In append-only mode the cost per add should stay flat regardless of history size.
+
+Usage:
+    python -m benchmarks.bench_history_append --sizes 1000 10000 100000 --appends 100
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List
+
+from app.history_manager import HistoryManager, OperationCommand
+
+
+def prefill(path: str, size: int) -> None:
+    """Write a history file containing `size` rows."""
+    manager = HistoryManager(path, append_only=True)
+    manager.add_many(OperationCommand('add', float(i), 1.0, float(i + 1)) for i in range(size))
+
+
+def time_appends(path: str, appends: int, append_only: bool) -> float:
+    """Return the mean seconds per add_to_history call on an existing history file."""
+    manager = HistoryManager(path, append_only=append_only)
+    start = time.perf_counter()
+    for i in range(appends):
+        manager.add_to_history(OperationCommand('multiply', float(i), 2.0, float(i * 2)))
+    return (time.perf_counter() - start) / appends
+
+
+def run(sizes: List[int], appends: int) -> None:
+    """Run the benchmark for every history size and print a table of results."""
+    print(f"{'entries':>10} {'append-only (us)':>18} {'rewrite (us)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            results = []
+            for append_only in (True, False):
+                path = os.path.join(tmp, f"history_{size}_{append_only}.csv")
+                prefill(path, size)
+                results.append(time_appends(path, appends, append_only) * 1e6)
+            print(f"{size:>10} {results[0]:>18.1f} {results[1]:>14.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--appends', type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.appends)
+
+
+if __name__ == '__main__':
+    main()
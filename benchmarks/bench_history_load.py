@@ -0,0 +1,78 @@
+"""
+Benchmark history load time and peak memory for the CSV and binary formats.
+
+Each load runs in a fresh interpreter so the reported peak RSS belongs to that load only.
+The binary format is memory-mapped, so "load" covers opening the history and reading the
+latest 10 entries, which is what the REPL needs before its first prompt.
+
+Usage:
+    python -m benchmarks.bench_history_load --sizes 1000000 10000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from app.binary_history import MAGIC, RECORD
+
+CHILD_CODE = """
+import resource, sys, time
+start = time.perf_counter()
+from app.history_manager import HistoryManager
+manager = HistoryManager(sys.argv[1])
+manager.get_latest(10)
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def write_csv(path: str, size: int) -> None:
+    """Write a CSV history file with `size` rows."""
+    with open(path, 'w', newline='') as file:
+        file.write("operation,a,b,result\n")
+        file.writelines(f"add,{float(i)},1.5,{i + 1.5}\n" for i in range(size))
+
+
+def write_binary(path: str, size: int) -> None:
+    """Write a binary history file with `size` records."""
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        pack = RECORD.pack
+        for start in range(0, size, 100_000):
+            file.write(b"".join(pack(0, float(i), 1.5, i + 1.5) for i in range(start, min(size, start + 100_000))))
+
+
+def measure(path: str) -> tuple:
+    """Load `path` in a child interpreter and return (seconds, peak RSS in MiB)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", CHILD_CODE, path], cwd=root,
+                            check=True, capture_output=True, text=True).stdout.split()
+    return float(output[0]), int(output[1]) / 1024
+
+
+def run(sizes: List[int]) -> None:
+    """Run the benchmark for every history size and print a table of results."""
+    print(f"{'entries':>10} {'format':>7} {'file (MiB)':>11} {'load (s)':>9} {'peak RSS (MiB)':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for label, suffix, writer in (("csv", ".csv", write_csv), ("binary", ".bin", write_binary)):
+                path = os.path.join(tmp, f"history_{size}{suffix}")
+                writer(path, size)
+                seconds, rss = measure(path)
+                file_mib = os.path.getsize(path) / (1 << 20)
+                print(f"{size:>10} {label:>7} {file_mib:>11.1f} {seconds:>9.3f} {rss:>15.1f}")
+                os.remove(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    args = parser.parse_args()
+    run(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the in-memory cost per history entry.
+
+Compares a list of dict-backed records (the original OperationCommand layout), a list of
+the current slotted OperationCommand, and the array-backed ColumnarHistory used by
+CsvHistoryStorage. Memory is measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.bench_history_memory --size 1000000
+"""
+import argparse
+import tracemalloc
+from typing import Callable
+
+from app.history_manager import ColumnarHistory, OperationCommand
+
+OPERATIONS = ['add', 'subtract', 'multiply', 'divide', 'power', 'mod']
+
+
+class DictOperationCommand:
+    """The original OperationCommand layout, with a per-instance __dict__."""
+
+    def __init__(self, operation: str, a: float, b: float, result: float) -> None:
+        self.operation = operation
+        self.a = a
+        self.b = b
+        self.result = result
+
+
+def build_dict_list(size: int) -> list:
+    return [DictOperationCommand(OPERATIONS[i % 6], float(i), 2.5, i * 2.5) for i in range(size)]
+
+
+def build_slotted_list(size: int) -> list:
+    return [OperationCommand(OPERATIONS[i % 6], float(i), 2.5, i * 2.5) for i in range(size)]
+
+
+def build_columnar(size: int) -> ColumnarHistory:
+    history = ColumnarHistory()
+    for i in range(size):
+        history.append_values(OPERATIONS[i % 6], float(i), 2.5, i * 2.5)
+    return history
+
+
+def bytes_per_entry(builder: Callable, size: int) -> float:
+    """Return the bytes retained per entry by the structure `builder` creates."""
+    tracemalloc.start()
+    structure = builder(size)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del structure
+    return retained / size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'layout':>24} {'bytes/entry':>12}")
+    for label, builder in (("list of dict objects", build_dict_list),
+                           ("list of slotted objects", build_slotted_list),
+                           ("ColumnarHistory", build_columnar)):
+        print(f"{label:>24} {bytes_per_entry(builder, args.size):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark indexed `history where` queries against a full scan as history grows.
+
+Each history cycles through every operation with results shuffled over a wide range (so
+the index is not built from already sorted values), and the query selects a fixed number
+of entries. The indexed query should stay roughly flat
+while the scan grows linearly. The one-off cost of building the index is shown separately.
+
+Usage:
+    python -m benchmarks.bench_history_query --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from app.history_manager import HistoryManager, MemoryHistoryStorage, OperationCommand
+from main import operations_map
+
+QUERY = "operation = divide and result > {threshold}"
+
+
+def build(size: int) -> HistoryManager:
+    """Return an in-memory history of `size` entries."""
+    operations = list(operations_map)
+    results = [float(i) * 1.5 for i in range(size)]
+    random.Random(size).shuffle(results)
+    manager = HistoryManager(storage=MemoryHistoryStorage())
+    manager.add_many(OperationCommand(operations[i % len(operations)], float(i), 2.0, results[i])
+                     for i in range(size))
+    return manager
+
+
+def scan(manager: HistoryManager, threshold: float) -> list:
+    """Answer the query by checking every entry."""
+    return [(position, command) for position, command in enumerate(manager.iter_history())
+            if command.operation == 'divide' and command.result > threshold]
+
+
+def run(sizes: List[int], repeat: int, matches: int) -> None:
+    """Run the benchmark for every history size and print a table of results."""
+    print(f"{'entries':>10} {'matches':>8} {'index build (ms)':>17} {'indexed (us)':>13} {'scan (us)':>12}")
+    for size in sizes:
+        manager = build(size)
+        # Only the `matches` largest divide results lie above the threshold
+        divides = sorted(command.result for command in manager.iter_history() if command.operation == 'divide')
+        threshold = divides[-matches - 1]
+        query = QUERY.format(threshold=threshold)
+
+        start = time.perf_counter()
+        found = manager.query(query)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            manager.query(query)
+        indexed = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        expected = scan(manager, threshold)
+        scanned = time.perf_counter() - start
+
+        assert found == expected
+        print(f"{size:>10} {len(found):>8} {build_ms:>17.1f} {indexed * 1e6:>13.1f} {scanned * 1e6:>12.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--matches', type=int, default=10, help="entries the query selects")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.matches)
+
+
+if __name__ == '__main__':
+    main()
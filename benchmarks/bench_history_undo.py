@@ -0,0 +1,64 @@
+"""
+Benchmark undo latency as history grows.
+
+Compares undo by truncating the history file (the current behaviour) with the old
+approach of dropping the record in memory and rewriting the whole file. Truncation
+should stay flat regardless of history size; the rewrite grows linearly.
+
+Usage:
+    python -m benchmarks.bench_history_undo --sizes 1000 10000 100000 1000000 --undos 50
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List
+
+from app.history_manager import HistoryManager
+from benchmarks.bench_history_load import write_csv
+
+
+def time_truncating_undo(path: str, undos: int) -> float:
+    """Return the mean seconds per undo_last call."""
+    manager = HistoryManager(path)
+    start = time.perf_counter()
+    for _ in range(undos):
+        manager.undo_last()
+    return (time.perf_counter() - start) / undos
+
+
+def time_rewriting_undo(path: str, undos: int) -> float:
+    """Return the mean seconds per undo done the old way: pop in memory, then rewrite the file."""
+    manager = HistoryManager(path)
+    storage = manager.get_full_history()
+    start = time.perf_counter()
+    for _ in range(undos):
+        storage.records.pop()
+        manager.save_history()
+    return (time.perf_counter() - start) / undos
+
+
+def run(sizes: List[int], undos: int) -> None:
+    """Run the benchmark for every history size and print a table of results."""
+    print(f"{'entries':>10} {'truncate (us)':>14} {'rewrite (us)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"history_{size}.csv")
+            write_csv(path, size)
+            truncate = time_truncating_undo(path, undos)
+            write_csv(path, size)
+            # The rewrite is slow on big histories, so fewer repetitions are enough
+            rewrite = time_rewriting_undo(path, min(undos, max(1, 1_000_000 // size)))
+            print(f"{size:>10} {truncate * 1e6:>14.1f} {rewrite * 1e6:>14.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--undos', type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.undos)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark parallel batch mode at 1, 2, 4 and 8 workers against sequential `run_batch`.
+
+Every run executes the same command script into an in-memory history, so the numbers
+compare calculation throughput rather than disk speed. Speedup is relative to the
+sequential run; worker start-up time is included.
+
+Usage:
+    python -m benchmarks.bench_parallel --commands 1000000 --workers 1 2 4 8
+"""
+import argparse
+import io
+import time
+from typing import List
+
+from app.history_manager import HistoryManager, MemoryHistoryStorage
+from main import PARALLEL_CHUNK_SIZE, CommandProcessor, operations_map, run_batch, run_parallel
+
+
+def make_script(count: int) -> str:
+    """Return `count` calculation commands cycling through every operation."""
+    operations = list(operations_map)
+    return "".join(f"{operations[i % len(operations)]} {i + 1} 3\n" for i in range(count))
+
+
+def throughput(script: str, workers: int, chunk_size: int) -> float:
+    """Return commands per second for one run; `workers` 0 means sequential `run_batch`."""
+    processor = CommandProcessor(HistoryManager(storage=MemoryHistoryStorage()))
+    start = time.perf_counter()
+    if workers:
+        count, _ = run_parallel(processor, io.StringIO(script), io.StringIO(), workers=workers, chunk_size=chunk_size)
+    else:
+        count, _ = run_batch(processor, io.StringIO(script), io.StringIO())
+    return count / (time.perf_counter() - start)
+
+
+def run(commands: int, worker_counts: List[int], chunk_size: int) -> None:
+    """Run the benchmark for every worker count and print a table of results."""
+    script = make_script(commands)
+    baseline = throughput(script, 0, chunk_size)
+    print(f"{'workers':>10} {'commands/s':>12} {'speedup':>8}")
+    print(f"{'sequential':>10} {baseline:>12.0f} {1.0:>8.2f}")
+    for workers in worker_counts:
+        rate = throughput(script, workers, chunk_size)
+        print(f"{workers:>10} {rate:>12.0f} {rate / baseline:>8.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-size', type=int, default=PARALLEL_CHUNK_SIZE)
+    args = parser.parse_args()
+    run(args.commands, args.workers, args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
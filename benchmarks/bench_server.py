@@ -0,0 +1,104 @@
+"""
+Load-generate against the calculator server and report throughput and latency percentiles.
+
+The server runs as `main.py --serve` in a subprocess with its history in a temporary
+directory. Each client connection keeps up to `--depth` commands in flight (pipelining)
+and measures every command's latency from sending it to receiving the end of its
+response.
+
+Usage:
+    python -m benchmarks.bench_server --clients 1 8 32 --requests 100000 --depth 16
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [b"add 1 2\n", b"multiply 3 4\n", b"divide 10 4\n", b"power 2 8\n", b"mod 9 4\n", b"subtract 5 3\n"]
+
+
+async def client(path: str, requests: int, depth: int) -> List[float]:
+    """Send `requests` commands over one connection with up to `depth` in flight; return latencies."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    sent: deque = deque()
+    latencies = []
+    next_request = 0
+
+    def fill() -> None:
+        nonlocal next_request
+        while next_request < requests and len(sent) < depth:
+            writer.write(COMMANDS[next_request % len(COMMANDS)])
+            sent.append(time.perf_counter())
+            next_request += 1
+
+    fill()
+    while sent:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        if line == b".\n":
+            latencies.append(time.perf_counter() - sent.popleft())
+            fill()
+    writer.close()
+    return latencies
+
+
+async def load(path: str, clients: int, requests: int, depth: int) -> Tuple[float, List[float]]:
+    """Run `clients` concurrent clients sharing `requests`; return elapsed seconds and all latencies."""
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(path, requests // clients, depth) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return elapsed, sorted(latency for latencies in results for latency in latencies)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def start_server(directory: str, path: str) -> subprocess.Popen:
+    """Start `main.py --serve` on a Unix socket and wait until it accepts connections."""
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'main.py'), '--serve', path],
+                              cwd=directory, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(path):
+        if time.monotonic() > deadline or server.poll() is not None:
+            server.kill()
+            raise RuntimeError("server did not start")
+        time.sleep(0.05)
+    return server
+
+
+def run(client_counts: List[int], requests: int, depth: int) -> None:
+    """Run the load for every client count against one server and print a table of results."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'calculator.sock')
+        server = start_server(directory, path)
+        try:
+            print(f"{'clients':>8} {'depth':>6} {'commands/s':>12} {'p50 ms':>8} {'p99 ms':>8}")
+            for clients in client_counts:
+                elapsed, latencies = asyncio.run(load(path, clients, requests, depth))
+                print(f"{clients:>8} {depth:>6} {len(latencies) / elapsed:>12.0f} "
+                      f"{percentile(latencies, 0.5) * 1000:>8.3f} {percentile(latencies, 0.99) * 1000:>8.3f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=100_000)
+    parser.add_argument('--depth', type=int, default=16)
+    args = parser.parse_args()
+    run(args.clients, args.requests, args.depth)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark REPL startup: wall time to the first prompt and `-X importtime` of main.py.
+
+For each history size a history file is generated in a temporary directory, and
+`main.py` is run there with a single command on stdin. Wall time covers interpreter
+start, imports, history setup and the command, so it is what a user waits for. The
+import table lists the slowest modules imported by `import main`, cumulative.
+
+Usage:
+    python -m benchmarks.bench_startup --sizes 0 1000 100000 1000000 --runs 5
+"""
+import argparse
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_history(path: str, size: int) -> None:
+    """Write a CSV history file of `size` operations."""
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["operation", "a", "b", "result"])
+        writer.writerows(("add", float(i), 2.0, i + 2.0) for i in range(size))
+
+
+def startup_time(directory: str, command: str, runs: int) -> float:
+    """Return the median seconds to run main.py with `command` on stdin in `directory`."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, 'main.py')], input=command.encode(), cwd=directory,
+                       stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_times(top: int) -> Tuple[int, List[Tuple[int, str]]]:
+    """Return the total microseconds of `import main` and its `top` slowest imports."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative), name.rstrip()))
+    total = next(cumulative for cumulative, name in modules if name.strip() == 'main')
+    slowest = sorted((m for m in modules if m[1].strip() != 'main'), reverse=True)[:top]
+    return total, slowest
+
+
+def run(sizes: List[int], runs: int, top: int) -> None:
+    """Run the benchmark for every history size and print the results."""
+    total, slowest = import_times(top)
+    print(f"import main: {total / 1000:.1f} ms")
+    for cumulative, name in slowest:
+        print(f"  {cumulative / 1000:>7.1f} ms {name}")
+    print()
+    print(f"{'history':>10} {'exit ms':>9} {'add ms':>9} {'history ms':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, 'history.csv')
+            write_history(path, size)
+            exit_time = startup_time(directory, "exit\n", runs)
+            add_time = startup_time(directory, "add 1 2\nundo\nexit\n", runs)
+            history_time = startup_time(directory, "history\nexit\n", runs)
+            print(f"{size:>10} {exit_time * 1000:>9.1f} {add_time * 1000:>9.1f} {history_time * 1000:>11.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 1000, 100_000, 1_000_000])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    run(args.sizes, args.runs, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Benchmark suite with JSON results and baseline comparison.
+
+Runs every registered benchmark, writes the results to a JSON file and, when a baseline
+file is given, flags metrics that regressed by more than the threshold. The exit status
+is 1 when a regression is found, so the suite can gate CI.
+
+Covered:
+    calculation.<op>          Calculation.create + compute per operation (us/op)
+    history.add.<n>           HistoryManager.add_to_history on a history of n entries (us/op)
+    history.undo.<n>          HistoryManager.undo_last on a history of n entries (us/op)
+    history.load.<n>          cold HistoryManager start plus its first read, the latest 10
+                              entries, on a history of n entries (s)
+    file_manager.write/read   FileManager.write_file/read_file on a large payload (MiB/s)
+    e2e.batch                 commands per second through `main.py --batch` (commands/s)
+
+Usage:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output results.json --baseline baseline.json --threshold 0.2
+    python -m benchmarks.suite --quick
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from app.file_manager import FileManager
+from app.history_manager import HistoryManager, OperationCommand
+from benchmarks.bench_history_load import write_csv
+from main import operations_map
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sizes used by a full run and by --quick
+FULL = {'history_sizes': [1_000, 100_000, 1_000_000], 'payload_mib': 256, 'commands': 200_000, 'repeat': 100_000}
+QUICK = {'history_sizes': [1_000, 10_000], 'payload_mib': 8, 'commands': 10_000, 'repeat': 10_000}
+
+# Metrics where a bigger number is better; everything else is a duration
+HIGHER_IS_BETTER_UNITS = {'MiB/s', 'commands/s'}
+
+
+def metric(value: float, unit: str) -> Dict:
+    return {'value': value, 'unit': unit}
+
+
+def bench_calculations(config: Dict, tmp: str) -> Dict[str, Dict]:
+    """Time Calculation.create + compute for every operation."""
+    results = {}
+    for operation, calculation_class in operations_map.items():
+        start = time.perf_counter()
+        for i in range(config['repeat']):
+            calculation_class.create(i + 1.5, 2.0).compute()
+        elapsed = time.perf_counter() - start
+        results[f"calculation.{operation}"] = metric(elapsed / config['repeat'] * 1e6, 'us/op')
+    return results
+
+
+def bench_history(config: Dict, tmp: str) -> Dict[str, Dict]:
+    """Time add_to_history, undo_last and a cold load at each history size."""
+    results = {}
+    appends = 200
+    for size in config['history_sizes']:
+        path = os.path.join(tmp, f"history_{size}.csv")
+        write_csv(path, size)
+
+        start = time.perf_counter()
+        manager = HistoryManager(path)
+        # History is only read on first use, so include that first read, as bench_history_load does
+        manager.get_latest(10)
+        results[f"history.load.{size}"] = metric(time.perf_counter() - start, 's')
+
+        start = time.perf_counter()
+        for i in range(appends):
+            manager.add_to_history(OperationCommand('add', float(i), 1.0, i + 1.0))
+        results[f"history.add.{size}"] = metric((time.perf_counter() - start) / appends * 1e6, 'us/op')
+
+        start = time.perf_counter()
+        for _ in range(appends):
+            manager.undo_last()
+        results[f"history.undo.{size}"] = metric((time.perf_counter() - start) / appends * 1e6, 'us/op')
+        os.remove(path)
+    return results
+
+
+def bench_file_manager(config: Dict, tmp: str) -> Dict[str, Dict]:
+    """Measure FileManager write and read throughput on a large payload."""
+    size_mib = config['payload_mib']
+    payload = ("0123456789abcdef" * 64 + "\n") * (size_mib * 1024 * 1024 // 1025)
+    manager = FileManager(os.path.join(tmp, "payload.txt"))
+
+    start = time.perf_counter()
+    manager.write_file(payload)
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    manager.read_file()
+    read_seconds = time.perf_counter() - start
+
+    manager.delete_file()
+    return {
+        'file_manager.write': metric(size_mib / write_seconds, 'MiB/s'),
+        'file_manager.read': metric(size_mib / read_seconds, 'MiB/s'),
+    }
+
+
+def bench_end_to_end(config: Dict, tmp: str) -> Dict[str, Dict]:
+    """Measure commands per second through `main.py --batch`, including interpreter startup."""
+    count = config['commands']
+    operations = list(operations_map)
+    script = os.path.join(tmp, "commands.txt")
+    with open(script, 'w') as file:
+        file.writelines(f"{operations[i % len(operations)]} {i + 1} 3\n" for i in range(count))
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--batch", script],
+                   cwd=tmp, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    return {'e2e.batch': metric(count / elapsed, 'commands/s')}
+
+
+BENCHMARKS: List[Callable[[Dict, str], Dict[str, Dict]]] = [
+    bench_calculations,
+    bench_history,
+    bench_file_manager,
+    bench_end_to_end,
+]
+
+
+def run_suite(config: Dict) -> Dict:
+    """Run every benchmark and return the results document."""
+    logging.disable(logging.INFO)
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for benchmark in BENCHMARKS:
+            results.update(benchmark(config, tmp))
+    logging.disable(logging.NOTSET)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': config,
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Compare two results documents.
+
+    Args:
+        current (Dict): The results of this run.
+        baseline (Dict): Stored results to compare against.
+        threshold (float): Allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        List[str]: One message per metric that regressed beyond the threshold.
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None or reference['unit'] != result['unit'] or not reference['value']:
+            continue
+        ratio = result['value'] / reference['value']
+        if result['unit'] in HIGHER_IS_BETTER_UNITS:
+            regressed = ratio < 1 - threshold
+        else:
+            regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(f"{name}: {reference['value']:.4g} -> {result['value']:.4g} {result['unit']}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_results.json', help="where to write the results JSON")
+    parser.add_argument('--baseline', help="results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    parser.add_argument('--quick', action='store_true', help="use small sizes for a fast smoke run")
+    args = parser.parse_args(argv)
+
+    document = run_suite(dict(QUICK if args.quick else FULL))
+    with open(args.output, 'w') as file:
+        json.dump(document, file, indent=2)
+    for name, result in document['results'].items():
+        print(f"{name:>28} {result['value']:>14.4g} {result['unit']}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(document, json.load(file), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
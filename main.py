@@ -1,9 +1,22 @@
 # app/command_processor.py
 
-from typing import Dict, Type
-from app.calculation import Addition, Subtraction, Multiplication, Division, Power, Modulus
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, TextIO, Tuple, Type
+from app.calculation import Addition, Calculation, Subtraction, Multiplication, Division, ModularPower, Power, Modulus
 from app.calculator import Calculator
-from app.history_manager import HistoryManager, OperationCommand
+from app.dispatch import FAST_OPERATIONS, OperationRegistry
+from app.history_manager import HistoryManager, MemoryHistoryStorage, OperationCommand
+from app.metrics import METRICS
+from app.time_budget import TimeBudgetExceeded
+
+# Modules needed only by some commands or modes (asyncio, multiprocessing, the expression
+# parser and the query language) are imported where they are used, to keep startup fast.
 
 # Dictionary mapping operation strings to the corresponding calculation class.
 operations_map: Dict[str, Type] = {
@@ -15,18 +28,47 @@ operations_map: Dict[str, Type] = {
     'mod': Modulus
 }
 
+# Built-in operations plus those of installed plugins, which are loaded on the first unknown name
+operation_registry = OperationRegistry(operations_map)
+
+# Size of the read and write buffers used by batch mode
+BATCH_BUFFER_SIZE = 1 << 20
+
+# Commands per chunk handed to a worker process in parallel batch mode
+PARALLEL_CHUNK_SIZE = 10_000
+
+# Commands that read or change shared history and so must run in the parent process
+STATEFUL_COMMANDS = {'help', 'history', 'undo', 'clear', 'stats'}
+
 class CommandProcessor:
     """
     Processes user commands, performs calculations, and interacts with the Calculator and HistoryManager.
 
     Attributes:
         calculator (Calculator): The calculator to perform operations.
-        history_manager (HistoryManager): Manages the history of operations.
+        history_manager (HistoryManager): Manages the history of operations. It is the same
+            instance the calculator records into, so there is a single writer per history file.
     """
-    def __init__(self) -> None:
-        """Initializes the CommandProcessor with a Calculator and HistoryManager instance."""
-        self.calculator = Calculator()
-        self.history_manager = HistoryManager()
+    def __init__(self, history_manager: Optional[HistoryManager] = None,
+                 time_budget: Optional[float] = None, calculator: Optional[Calculator] = None) -> None:
+        """
+        Initializes the CommandProcessor with a Calculator sharing one HistoryManager.
+
+        Args:
+            history_manager (HistoryManager, optional): History to record into. A new
+                HistoryManager on the default history file is created when omitted.
+            time_budget (float, optional): Seconds each calculation may take; calculations
+                then run in a worker process (see app.time_budget).
+            calculator (Calculator, optional): An existing calculator to share, e.g. between
+                server sessions; `history_manager` and `time_budget` are then ignored.
+        """
+        self.calculator = calculator if calculator is not None else Calculator(history_manager, time_budget)
+        self.history_manager = self.calculator.history_manager
+
+    def close(self) -> None:
+        """Writes any queued history and stops background persistence and the calculation worker."""
+        self.calculator.close()
+        self.history_manager.close()
 
     def undo_last(self):
         """Undoes the last executed command, if any exist in history."""
@@ -39,54 +81,114 @@ class CommandProcessor:
     
     def execute(self, command: str) -> None:
         """
-        Executes a given command, processes the operation, records it in history, and displays the result.
+        Executes a given command, processes the operation and displays the result.
+
+        The operation is recorded in history by the calculator. Built-in operations take
+        the fast path of app.dispatch, which creates no Calculation; plugin operations,
+        'power a b mod m' and calculations under a time budget use Calculation classes.
 
         Args:
             command (str): The user's input command.
         """
+        start = time.perf_counter()
+
         # Split the command into operation and arguments
         parts = command.split()
 
-        # Validate input command length
-        if len(parts) != 3:
+        # Validate input command length; 'power a b mod m' is the only five-part command
+        modular = len(parts) == 5 and parts[0] == 'power' and parts[3] == 'mod'
+        if len(parts) != 3 and not modular:
+            METRICS.increment("commands.invalid")
             print("Invalid command format. Type 'help' for instructions.")
             return
 
-        operation, a_str, b_str = parts
+        operation, a_str, b_str = parts[:3]
 
         # Convert inputs to float
         try:
             a = float(a_str)
             b = float(b_str)
+            m = float(parts[4]) if modular else None
         except ValueError:
+            METRICS.increment("commands.invalid")
             print("Invalid numbers. Please enter valid numeric values.")
             return
 
-        # Check if the operation is valid
-        if operation not in operations_map:
-            print(f"Unknown operation '{operation}'. Type 'help' for instructions.")
-            return
+        fast = None if modular or self.calculator.time_budget else FAST_OPERATIONS.get(operation)
+        if fast is None:
+            # Check if the operation is valid
+            calculation_class = operation_registry.get(operation)
+            if calculation_class is None:
+                METRICS.increment("commands.invalid")
+                print(f"Unknown operation '{operation}'. Type 'help' for instructions.")
+                return
 
-        # Instantiate the appropriate calculation class
-        calculation_class = operations_map[operation]
-        calculation = calculation_class.create(a, b)
+            # Instantiate the appropriate calculation class
+            if modular:
+                calculation = ModularPower.create(a, b, m)
+            else:
+                calculation = calculation_class.create(a, b)
+        METRICS.observe("parse", time.perf_counter() - start, operation)
 
         # Perform the calculation and print the result
         try:
-            result = self.calculator.perform_operation(calculation)
+            if fast is not None:
+                result = self.calculator.perform_values(operation, fast.kernel, a, b)
+            else:
+                result = self.calculator.perform_operation(calculation)
+            start = time.perf_counter()
             print(f"Result: {result}")
-            print(f"Operation: {calculation}")  # This uses the __str__ of the calculation class
-
-            # Record the operation in history
-            operation_command = OperationCommand(
-                operation=operation,
-                a=a,
-                b=b,
-                result=result
-            )
-            self.history_manager.add_to_history(operation_command)
+            if fast is not None:
+                print(f"Operation: {fast.describe(a, b, result)}")
+            else:
+                print(f"Operation: {calculation}")  # This uses the __str__ of the calculation class
+            METRICS.observe("print", time.perf_counter() - start, operation)
         except ZeroDivisionError:
+            METRICS.increment("errors.zero_division")
             print("Error: Division by zero.")
+        except (OverflowError, TypeError, ValueError, TimeBudgetExceeded) as e:
+            print(f"Error: {e}")
+
+    def evaluate(self, expression: str) -> None:
+        """
+        Evaluates an arithmetic expression, records its final operation in history, and displays the result.
+
+        Parsing (including the cached compile) is timed as the 'parse' stage and the
+        intermediate operations as the 'compute' stage, both under the 'eval' operation;
+        the final operation is timed by the calculator like a regular command. An
+        expression whose root is a unary minus or a plain number has no final operation
+        and is not recorded.
+
+        Args:
+            expression (str): The expression, e.g. '(3 + 4) * 2 ** 8 % 7'.
+        """
+        from app.expression import ExpressionError, compile_expression
+
+        start = time.perf_counter()
+        try:
+            plan = compile_expression(expression)
+        except ExpressionError as e:
+            METRICS.increment("commands.invalid")
+            print(f"Invalid expression: {e}")
+            return
+
+        METRICS.observe("parse", time.perf_counter() - start, 'eval')
+
+        try:
+            start = time.perf_counter()
+            value = plan.evaluate()
+            METRICS.observe("compute", time.perf_counter() - start, 'eval')
+            if isinstance(value, Calculation):
+                result = self.calculator.perform_operation(value)
+                print(f"Result: {result}")
+                print(f"Operation: {value}")
+            else:
+                print(f"Result: {value}")
+        except ZeroDivisionError:
+            METRICS.increment("errors.zero_division")
+            print("Error: Division by zero.")
+        except (OverflowError, TypeError, ValueError, TimeBudgetExceeded) as e:
+            print(f"Error: {e}")
 
     def show_help(self) -> None:
         """Displays the help menu with available commands."""
@@ -97,8 +199,16 @@ Available commands:
   multiply a b   - Multiplies a and b
   divide a b     - Divides a by b
   power a b      - Raises the power of a by b 
+  power a b mod m - Computes (a ** b) % m for whole numbers, even when a ** b is huge
   mod a b        - Modulus a by b 
+  eval expr      - Evaluates an expression, e.g. eval (3 + 4) * 2 ** 8 % 7
+                   (its final operation is recorded; a leading minus, as in
+                   -(2 ** 3), or a bare number is not recorded)
   history        - Shows the operation history
+  history where q - Shows the operations matching q, e.g.
+                   history where operation = divide and result > 1e6
+                   (fields: operation, a, b, result; compare with =, <, <=, >, >=)
+  stats          - Shows per-stage latency statistics
   undo           - Undoes the last operation
   clear          - Clears the operation history
   exit           - Exits the REPL
@@ -106,43 +216,374 @@ Available commands:
 """)
 
     def show_history(self) -> None:
-        """Displays the full history of operations performed."""
-        history = self.history_manager.get_full_history()
-        if not history:
+        """Displays the full history of operations performed, streaming it entry by entry."""
+        index = 0
+        for index, command in enumerate(self.history_manager.iter_history(), start=1):
+            print(f"{index}: {command.operation} {command.a} {command.b} = {command.result}")
+        if not index:
             print("No operations in history.")
-        else:
-            for index, command in enumerate(history, start=1):
-                print(f"{index}: {command.operation} {command.a} {command.b} = {command.result}")
+
+    def show_history_query(self, query: str) -> None:
+        """
+        Displays the operations matching a query, numbered by their position in history.
+
+        Args:
+            query (str): Conditions such as 'operation = divide and result > 1e6'.
+        """
+        from app.history_query import QueryError
+
+        try:
+            matches = self.history_manager.query(query)
+        except QueryError as e:
+            METRICS.increment("commands.invalid")
+            print(f"Invalid query: {e}")
+            return
+        for position, command in matches:
+            print(f"{position + 1}: {command.operation} {command.a} {command.b} = {command.result}")
+        if not matches:
+            print("No matching operations.")
+
+    def show_stats(self) -> None:
+        """Displays counters and p50/p95/p99 latencies per stage and operation."""
+        print(METRICS.format_table())
 
     def clear_history(self) -> None:
         """Clears the operation history."""
         self.history_manager.clear_history()
         print("History cleared.")
 
-def main():
-    processor = CommandProcessor()
-    print("Welcome to the Calculator REPL. Type 'help' for instructions or 'exit' to quit.")
+    def dispatch(self, command: str) -> bool:
+        """
+        Runs a single REPL command.
 
-    while True:
-        try:
-            command = input(">>> ").strip().lower()
-        except (EOFError, KeyboardInterrupt):
-            print("\nGoodbye!")
-            break
+        Args:
+            command (str): The normalized (stripped, lower-case) command.
 
+        Returns:
+            bool: False when the command asks to exit, True otherwise.
+        """
         if command in ['exit', 'quit']:
-            print("Goodbye!")
-            break
+            return False
         elif command == 'help':
-            processor.show_help()
+            self.show_help()
         elif command == 'history':
-            processor.show_history()
+            self.show_history()
+        elif command.startswith('history where '):
+            self.show_history_query(command[len('history where '):])
+        elif command == 'stats':
+            self.show_stats()
+        elif command.startswith('eval '):
+            self.evaluate(command[len('eval '):])
         elif command == 'undo':
-            processor.undo_last()
+            self.undo_last()
         elif command == 'clear':
-            processor.clear_history()
+            self.clear_history()
+        else:
+            self.execute(command)
+        return True
+
+def run_batch(processor: CommandProcessor, source: Iterable[str], output: TextIO) -> Tuple[int, float]:
+    """
+    Runs commands from `source` without prompts, writing all results to `output`.
+
+    Blank lines and lines starting with '#' are skipped. Processing stops at an
+    'exit' or 'quit' command or at the end of the input.
+
+    Args:
+        processor (CommandProcessor): The processor that executes the commands.
+        source (Iterable[str]): Lines of commands, e.g. an open file.
+        output (TextIO): Stream receiving everything the commands print.
+
+    Returns:
+        Tuple[int, float]: The number of commands run and the elapsed seconds.
+    """
+    count = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        for line in source:
+            command = line.strip().lower()
+            if not command or command.startswith('#'):
+                continue
+            if not processor.dispatch(command):
+                break
+            count += 1
+    output.flush()
+    return count, time.perf_counter() - start
+
+# CommandProcessor of a worker process, recording into memory only
+_worker_processor: Optional['CommandProcessor'] = None
+
+def _init_worker(time_budget: Optional[float] = None) -> None:
+    global _worker_processor
+    _worker_processor = CommandProcessor(HistoryManager(storage=MemoryHistoryStorage()), time_budget)
+
+def _run_chunk(commands: List[str]) -> Tuple[str, List[Tuple], Dict]:
+    """Run a chunk of stateless commands in a worker, returning their output, history records and metrics."""
+    history_manager = _worker_processor.history_manager
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        for command in commands:
+            _worker_processor.dispatch(command)
+    records = [(c.operation, c.a, c.b, c.result) for c in history_manager.get_full_history()]
+    history_manager.clear_history()
+    metrics = METRICS.export()
+    METRICS.reset()
+    return output.getvalue(), records, metrics
+
+def run_parallel(processor: CommandProcessor, source: Iterable[str], output: TextIO,
+                 workers: Optional[int] = None, chunk_size: int = PARALLEL_CHUNK_SIZE) -> Tuple[int, float]:
+    """
+    Runs commands like `run_batch`, sharding calculations across a process pool.
+
+    Calculations and expressions are sent to the workers in chunks of `chunk_size`. The
+    parent writes each chunk's output and merges its history records into the processor's
+    HistoryManager, and the metrics the workers recorded into METRICS, in the original
+    input order. Commands in STATEFUL_COMMANDS wait for all earlier chunks and then run in
+    the parent, so they see the same history as in `run_batch`. Workers apply the
+    processor's time budget, if any, to their calculations.
+
+    Args:
+        processor (CommandProcessor): The processor owning the shared history.
+        source (Iterable[str]): Lines of commands.
+        output (TextIO): Stream receiving everything the commands print.
+        workers (int, optional): Worker processes; defaults to the CPU count.
+        chunk_size (int): Commands per chunk.
+
+    Returns:
+        Tuple[int, float]: The number of commands run and the elapsed seconds.
+    """
+    import multiprocessing
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    start = time.perf_counter()
+    chunk: List[str] = []
+    in_flight: Deque[Future] = deque()
+
+    def merge(future: Future) -> None:
+        text, records, metrics = future.result()
+        output.write(text)
+        processor.history_manager.add_many(OperationCommand(*record) for record in records)
+        METRICS.merge(metrics)
+
+    # Workers are spawned rather than forked: a fork while the history writer thread holds
+    # a lock (e.g. the metrics lock) would leave the child deadlocked on that lock
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(processor.calculator.time_budget,)) as pool:
+        for line in source:
+            command = line.strip().lower()
+            if not command or command.startswith('#'):
+                continue
+            if command in ['exit', 'quit']:
+                break
+            count += 1
+            if command.split()[0] in STATEFUL_COMMANDS:
+                if chunk:
+                    in_flight.append(pool.submit(_run_chunk, chunk))
+                    chunk = []
+                while in_flight:
+                    merge(in_flight.popleft())
+                with contextlib.redirect_stdout(output):
+                    processor.dispatch(command)
+                continue
+            chunk.append(command)
+            if len(chunk) >= chunk_size:
+                in_flight.append(pool.submit(_run_chunk, chunk))
+                chunk = []
+                # Bound memory by merging once every worker has work queued
+                while len(in_flight) > 2 * workers:
+                    merge(in_flight.popleft())
+        if chunk:
+            in_flight.append(pool.submit(_run_chunk, chunk))
+        while in_flight:
+            merge(in_flight.popleft())
+    output.flush()
+    return count, time.perf_counter() - start
+
+def batch_main(path: str, history_manager: Optional[HistoryManager] = None,
+               workers: int = 0, chunk_size: int = PARALLEL_CHUNK_SIZE,
+               time_budget: Optional[float] = None) -> None:
+    """
+    Runs a command script from `path` ('-' for stdin) with block-buffered input and output.
+
+    With `workers` set, calculations are spread over that many processes (see `run_parallel`).
+
+    A throughput summary is written to stderr so it does not mix with the results.
+    """
+    if path == '-':
+        source = io.open(sys.stdin.fileno(), 'r', buffering=BATCH_BUFFER_SIZE, closefd=False)
+    else:
+        source = open(path, 'r', buffering=BATCH_BUFFER_SIZE)
+    output = io.open(sys.stdout.fileno(), 'w', buffering=BATCH_BUFFER_SIZE, closefd=False)
+    processor = CommandProcessor(history_manager, time_budget)
+    try:
+        with source, output:
+            if workers:
+                count, elapsed = run_parallel(processor, source, output, workers, chunk_size)
+            else:
+                count, elapsed = run_batch(processor, source, output)
+    finally:
+        processor.close()
+    rate = count / elapsed if elapsed > 0 else float('inf')
+    print(f"Processed {count} commands in {elapsed:.3f}s ({rate:.0f} commands/s)", file=sys.stderr)
+
+def repl(history_manager: Optional[HistoryManager] = None, time_budget: Optional[float] = None) -> None:
+    """Runs the interactive read-eval-print loop, flushing history on every way out."""
+    processor = CommandProcessor(history_manager, time_budget)
+    print("Welcome to the Calculator REPL. Type 'help' for instructions or 'exit' to quit.")
+
+    try:
+        while True:
+            try:
+                command = input(">>> ").strip().lower()
+            except (EOFError, KeyboardInterrupt):
+                print("\nGoodbye!")
+                break
+
+            if not processor.dispatch(command):
+                print("Goodbye!")
+                break
+    finally:
+        processor.close()
+
+def frame_response(text: str) -> bytes:
+    """
+    Encode a command's output as a server response: its lines, then a line holding '.'.
+
+    Output lines that start with '.' get an extra '.', so a lone '.' always ends a response.
+    """
+    lines = [f".{line}" if line.startswith('.') else line for line in text.splitlines()]
+    lines.append('.')
+    return ("\n".join(lines) + "\n").encode()
+
+async def handle_session(calculator: Calculator, reader: 'asyncio.StreamReader',
+                         writer: 'asyncio.StreamWriter') -> None:
+    """
+    Serves one client connection: one command per line, one framed response per command.
+
+    Commands run one at a time on the event loop, in the order they arrive, so a client
+    may pipeline many commands without waiting for each response. When the client stops
+    reading, `drain` suspends this session once the socket buffer is full, so it stops
+    reading further commands until the client catches up.
+    """
+    METRICS.increment("server.connections")
+    processor = CommandProcessor(calculator=calculator)
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # A line longer than the stream limit
+                writer.write(frame_response("Error: command too long."))
+                break
+            if not line:
+                break
+            command = line.decode('utf-8', 'replace').strip().lower()
+            output = io.StringIO()
+            keep_open = True
+            if command:
+                with contextlib.redirect_stdout(output):
+                    keep_open = processor.dispatch(command)
+            writer.write(frame_response(output.getvalue()))
+            if not keep_open:
+                break
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+async def start_server(calculator: Calculator, address: str) -> 'asyncio.AbstractServer':
+    """
+    Starts serving `calculator` on `address`, 'HOST:PORT' for TCP or a Unix socket path.
+
+    Every connection gets its own session (see `handle_session`), and all sessions share
+    the calculator and so the same history.
+    """
+    import asyncio
+
+    def session(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        return handle_session(calculator, reader, writer)
+
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return await asyncio.start_server(session, host, int(port))
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(address)
+    return await asyncio.start_unix_server(session, address)
+
+def serve_main(address: str, history_manager: Optional[HistoryManager] = None,
+               time_budget: Optional[float] = None) -> None:
+    """Runs the calculator server on `address` until interrupted, then flushes history."""
+    import asyncio
+
+    calculator = Calculator(history_manager, time_budget)
+
+    async def run() -> None:
+        server = await start_server(calculator, address)
+        print(f"Serving on {address}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        calculator.close()
+        calculator.history_manager.close()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Calculator REPL")
+    parser.add_argument('--batch', metavar='FILE', nargs='?', const='-',
+                        help="run commands from FILE (or stdin when omitted) without prompts")
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help="serve clients on ADDRESS, HOST:PORT or a Unix socket path, instead of the REPL")
+    parser.add_argument('--workers', type=int, default=0, metavar='N',
+                        help="with --batch, spread calculations over N worker processes")
+    parser.add_argument('--chunk-size', type=int, default=PARALLEL_CHUNK_SIZE, metavar='N',
+                        help="with --workers, commands sent to a worker at a time")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="write metrics in Prometheus text format to PATH on exit")
+    parser.add_argument('--durability', choices=['always', 'batch', 'exit'], default='batch',
+                        help="when history reaches disk: every operation, in background batches, or on exit")
+    parser.add_argument('--flush-every', type=int, default=100, metavar='N',
+                        help="with batch durability, write after N queued operations")
+    parser.add_argument('--flush-interval', type=float, default=50, metavar='MS',
+                        help="with batch durability, write queued operations at least every MS milliseconds")
+    parser.add_argument('--time-budget', type=float, metavar='MS',
+                        help="abandon any calculation taking longer than MS milliseconds")
+    parser.add_argument('--segment-rows', type=int, metavar='N',
+                        help="split history into segment files of at most N operations")
+    parser.add_argument('--segment-bytes', type=int, metavar='BYTES',
+                        help="split history into segment files of about BYTES bytes")
+    parser.add_argument('--retain-segments', type=int, metavar='N',
+                        help="with segments, keep only the newest N full segments")
+    args = parser.parse_args(argv)
+    if args.batch not in (None, '-') and not os.path.isfile(args.batch):
+        parser.error(f"batch file '{args.batch}' does not exist")
+
+    segmented = bool(args.segment_rows or args.segment_bytes)
+    # Several sessions may run in the same directory, so the history file is shared safely
+    history_manager = HistoryManager(durability=args.durability, batch_size=args.flush_every,
+                                     flush_interval=args.flush_interval / 1000, segment_rows=args.segment_rows,
+                                     segment_bytes=args.segment_bytes, retain_segments=args.retain_segments,
+                                     shared=not segmented)
+    time_budget = args.time_budget / 1000 if args.time_budget else None
+    try:
+        if args.serve is not None:
+            serve_main(args.serve, history_manager, time_budget)
+        elif args.batch is not None:
+            batch_main(args.batch, history_manager, args.workers, args.chunk_size, time_budget)
         else:
-            processor.execute(command)
+            repl(history_manager, time_budget)
+    finally:
+        if args.metrics_file:
+            METRICS.dump(args.metrics_file)
 
 if __name__ == '__main__':
     main()
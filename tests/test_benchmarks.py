@@ -0,0 +1,43 @@
+"""Test module for the benchmark suite runner and baseline comparison."""
+
+import pytest
+
+from benchmarks.suite import bench_calculations, bench_history, compare
+from main import operations_map
+
+
+def results(**metrics):
+    """Build a results document from name=(value, unit) pairs."""
+    return {'results': {name.replace('_', '.'): {'value': value, 'unit': unit} for name, (value, unit) in metrics.items()}}
+
+
+@pytest.mark.fast
+def test_compare_flags_only_regressions_beyond_threshold():
+    """
+    Test that slower durations and lower throughputs are flagged, and improvements are not.
+    """
+    baseline = results(calc_add=(1.0, 'us/op'), calc_mod=(1.0, 'us/op'), e2e_batch=(1000.0, 'commands/s'),
+                       file_read=(100.0, 'MiB/s'))
+    current = results(calc_add=(1.5, 'us/op'), calc_mod=(1.1, 'us/op'), e2e_batch=(700.0, 'commands/s'),
+                      file_read=(150.0, 'MiB/s'), history_new=(5.0, 's'))
+
+    regressions = compare(current, baseline, threshold=0.2)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("calc.add")
+    assert regressions[1].startswith("e2e.batch")
+
+
+@pytest.mark.slow
+def test_suite_benchmarks_report_every_metric():
+    """
+    Test that the in-process benchmarks produce a metric for every operation and history size.
+    """
+    config = {'history_sizes': [10], 'repeat': 10}
+
+    calculation_results = bench_calculations(config, ".")
+    history_results = bench_history(config, ".")
+
+    assert set(calculation_results) == {f"calculation.{operation}" for operation in operations_map}
+    assert set(history_results) == {"history.load.10", "history.add.10", "history.undo.10"}
+    assert all(result['value'] >= 0 for result in history_results.values())
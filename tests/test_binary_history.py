@@ -0,0 +1,100 @@
+"""Test module for the binary history format."""
+
+import os
+
+import pytest
+
+from app.binary_history import (
+    HEADER_SIZE,
+    RECORD_SIZE,
+    BinaryHistoryStorage,
+    binary_to_csv,
+    csv_to_binary,
+)
+from app.history_manager import HistoryManager, OperationCommand
+
+
+def test_history_manager_uses_binary_storage_for_bin_files():
+    """
+    Test that a '.bin' history file is written as fixed-width records and read back lazily.
+    """
+    history_manager = HistoryManager("history.bin")
+    assert isinstance(history_manager.get_full_history(), BinaryHistoryStorage)
+
+    history_manager.add_to_history(OperationCommand('add', 5.0, 10.0, 15.0))
+    history_manager.add_many([OperationCommand('divide', 9.0, 3.0, 3.0), OperationCommand('mod', 7.0, 4.0, 3.0)])
+    assert os.path.getsize("history.bin") == HEADER_SIZE + 3 * RECORD_SIZE
+
+    reloaded = HistoryManager("history.bin")
+    assert len(reloaded.get_full_history()) == 3
+    assert reloaded.get_latest(2) == [OperationCommand('divide', 9.0, 3.0, 3.0), OperationCommand('mod', 7.0, 4.0, 3.0)]
+    assert reloaded.get_full_history()[0] == OperationCommand('add', 5.0, 10.0, 15.0)
+
+
+def test_binary_undo_and_clear_truncate_the_file():
+    """
+    Test that undo removes only the last record and clear leaves just the header.
+    """
+    history_manager = HistoryManager("history.bin")
+    history_manager.add_to_history(OperationCommand('power', 2.0, 3.0, 8.0))
+    history_manager.add_to_history(OperationCommand('subtract', 10.0, 5.0, 5.0))
+
+    assert history_manager.undo_last() == OperationCommand('subtract', 10.0, 5.0, 5.0)
+    assert os.path.getsize("history.bin") == HEADER_SIZE + RECORD_SIZE
+
+    history_manager.clear_history()
+    assert os.path.getsize("history.bin") == HEADER_SIZE
+    assert history_manager.undo_last() is None
+
+
+def test_binary_reload_drops_a_partial_record():
+    """
+    Test that a torn trailing record is truncated on load so later appends stay aligned.
+    """
+    history_manager = HistoryManager("history.bin")
+    history_manager.add_to_history(OperationCommand('add', 1.0, 2.0, 3.0))
+    with open("history.bin", 'ab') as file:
+        file.write(b"\x00" * (RECORD_SIZE // 2))
+
+    reloaded = HistoryManager("history.bin")
+    assert os.path.getsize("history.bin") == HEADER_SIZE + RECORD_SIZE
+    reloaded.add_to_history(OperationCommand('power', 2.0, 3.0, 8.0))
+
+    assert list(HistoryManager("history.bin").get_full_history()) == [
+        OperationCommand('add', 1.0, 2.0, 3.0),
+        OperationCommand('power', 2.0, 3.0, 8.0),
+    ]
+
+
+@pytest.mark.parametrize("options", [{'lazy': True}, {'index': True}, {'durability': 'batch'}, {'append_only': False}])
+def test_binary_history_rejects_csv_only_options(options):
+    """
+    Test that CSV-only options are refused for a '.bin' history instead of being ignored.
+    """
+    with pytest.raises(ValueError, match="not supported by binary history files"):
+        HistoryManager("history.bin", **options)
+
+
+def test_binary_storage_rejects_unknown_operations():
+    """
+    Test that operations without an opcode are refused instead of written.
+    """
+    storage = BinaryHistoryStorage("history.bin")
+    with pytest.raises(ValueError, match="cannot be stored"):
+        storage.append(OperationCommand('sqrt', 4.0, 0.0, 2.0))
+    assert len(storage) == 0
+
+
+def test_csv_binary_round_trip():
+    """
+    Test converting a CSV history to binary and back preserves every record.
+    """
+    commands = [OperationCommand('add', 1.5, 2.0, 3.5), OperationCommand('multiply', -4.0, 2.5, -10.0)]
+    HistoryManager("history.csv").add_many(commands)
+
+    assert csv_to_binary("history.csv", "history.bin") == 2
+    assert list(BinaryHistoryStorage("history.bin")) == commands
+
+    assert binary_to_csv("history.bin", "copy.csv") == 2
+    with open("history.csv", 'r', encoding='utf-8') as original, open("copy.csv", 'r', encoding='utf-8') as copy:
+        assert original.read() == copy.read()
@@ -4,8 +4,13 @@ Unit test for the Calculator's ability to perform operations
 """
 from unittest.mock import Mock
 
+import pytest
+
+import app.calculation
+from app.calculation import Division, ModularPower, Power
 from app.calculator import Calculator
 from app.history_manager import OperationCommand
+from app.operations import MAX_POWER_BITS, CostLimitError
 
 def test_perform_operation_add():
     """
@@ -90,3 +95,82 @@ def test_perform_operation_multiply():
     assert history[0].a == 5
     assert history[0].b == 10
     assert history[0].result == 50
+
+
+def test_calculation_computes_once_until_operand_changes(monkeypatch):
+    """
+    Test that compute() and the formatted representations are cached until an operand is reassigned.
+    """
+    calls = []
+
+    def counting_power(a, b):
+        calls.append((a, b))
+        return a ** b
+
+    monkeypatch.setattr(app.calculation, "power", counting_power)
+
+    calculation = Power.create(2, 10)
+    assert calculation.compute() == 1024
+    assert str(calculation) == "Power: 2 ** 10 = 1024"
+    assert repr(calculation) == "Power(a=2, b=10, result=1024)"
+    assert str(calculation) is str(calculation)
+    assert calls == [(2, 10)]
+
+    calculation.b = 3
+    assert str(calculation) == "Power: 2 ** 3 = 8"
+    assert calls == [(2, 10), (2, 3)]
+
+
+def test_division_by_zero_is_not_cached():
+    """
+    Test that a failing computation raises every time instead of caching a result.
+    """
+    calculation = Division.create(4, 0)
+    for _ in range(2):
+        with pytest.raises(ZeroDivisionError):
+            calculation.compute()
+
+    calculation.b = 2
+    assert str(calculation) == "Division: 4 / 2 = 2"
+
+
+def test_operand_setters_validate_types():
+    """
+    Test that reassigning an operand is validated like the constructor arguments.
+    """
+    calculation = Power.create(2, 3)
+
+    with pytest.raises(TypeError, match="must be numbers"):
+        calculation.a = "2"
+    with pytest.raises(TypeError, match="must be numbers"):
+        calculation.b = None
+    assert calculation.compute() == 8
+
+def test_power_refuses_results_that_are_too_large():
+    """
+    Test that Power estimates the size of its result and refuses huge powers instead of computing them.
+    """
+    assert Power.create(2, 10).compute() == 1024
+    assert Power.create(2, MAX_POWER_BITS).compute() == 2 ** MAX_POWER_BITS
+    with pytest.raises(CostLimitError, match="power a b mod m"):
+        Power.create(10, 10 ** 9).compute()
+    # Float powers are refused before they overflow; CostLimitError is an OverflowError
+    with pytest.raises(OverflowError):
+        Power.create(10.0, 400.0).compute()
+    assert Power.create(2.0, 0.5).compute() == pytest.approx(1.4142135623730951)
+
+
+def test_modular_power():
+    """
+    Test that ModularPower computes (a ** b) % m for huge exponents and validates its operands.
+    """
+    calculation = ModularPower.create(3.0, 1e18, 1e9 + 7)
+
+    assert calculation.compute() == pow(3, 10 ** 18, 10 ** 9 + 7)
+    assert calculation.operation == 'powmod'
+    with pytest.raises(ValueError):
+        ModularPower.create(2.5, 2, 7).compute()
+    with pytest.raises(ZeroDivisionError):
+        ModularPower.create(2, 3, 0).compute()
+    with pytest.raises(TypeError):
+        ModularPower.create(2, 3, "7")
@@ -54,3 +54,29 @@ def test_get_history():
     assert isinstance(history[0], OperationCommand)
     assert history[0].operation == 'add'
     assert history[1].operation == 'multiply'
+
+
+def test_command_processor_shares_history_manager():
+    """
+    Test that CommandProcessor and its Calculator record into the same HistoryManager.
+    """
+    history_manager = HistoryManager()
+    processor = CommandProcessor(history_manager)
+
+    assert processor.history_manager is history_manager
+    assert processor.calculator.history_manager is history_manager
+
+
+def test_execute_records_operation_once():
+    """
+    Test that executing a command persists exactly one history entry.
+    """
+    processor = CommandProcessor()
+    processor.execute("add 2 3")
+
+    history = processor.history_manager.get_full_history()
+    assert len(history) == 1
+    assert str(history[0]) == "add 2.0 3.0 = 5.0"
+
+    with open("history.csv", 'r', encoding='utf-8') as file:
+        assert file.read().splitlines() == ["operation,a,b,result", "add,2.0,3.0,5.0"]
@@ -0,0 +1,106 @@
+"""Tests for the fast dispatch table and the operation plugin registry."""
+import importlib.metadata
+import io
+
+import pytest
+
+from app.calculation import Calculation
+from app.dispatch import FAST_OPERATIONS, OperationRegistry
+from app.history_manager import HistoryManager, MemoryHistoryStorage
+from main import CommandProcessor, operations_map, run_batch
+
+
+class Hypotenuse(Calculation):
+    """A plugin operation used by the registry tests."""
+
+    def compute(self):
+        return (self.a ** 2 + self.b ** 2) ** 0.5
+
+    def __str__(self):
+        return f"Hypotenuse: {self.a}, {self.b} = {self.compute()}"
+
+    def __repr__(self):
+        return f"Hypotenuse(a={self.a}, b={self.b})"
+
+    @property
+    def operation(self):
+        return 'hypot'
+
+
+class FakeEntryPoint:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def load(self):
+        return self.value
+
+
+@pytest.mark.parametrize("a, b", [(12.5, 7.25), (6.0, 3.0), (-8.0, 0.5), (0.0, 2.0)])
+def test_fast_operations_match_calculation_classes(a, b):
+    """
+    Test that every fast-path kernel and description agrees with the Calculation class of the same name.
+    """
+    for name, fast in FAST_OPERATIONS.items():
+        calculation = operations_map[name].create(a, b)
+        result = fast.kernel(a, b)
+        assert result == calculation.compute()
+        assert fast.describe(a, b, result) == str(calculation)
+
+
+def test_execute_fast_path_creates_no_calculation(monkeypatch):
+    """
+    Test that built-in commands are computed, recorded and printed without creating a Calculation.
+    """
+    def forbidden(self, a, b):
+        raise AssertionError("a Calculation was created")
+
+    processor = CommandProcessor(HistoryManager(storage=MemoryHistoryStorage()))
+    output = io.StringIO()
+    monkeypatch.setattr(Calculation, "__init__", forbidden)
+
+    run_batch(processor, io.StringIO("divide 6 3\nmod 1 0\n"), output)
+
+    assert output.getvalue().splitlines() == [
+        "Result: 2.0",
+        "Operation: Division: 6.0 / 3.0 = 2",
+        "Error: Division by zero.",
+    ]
+    assert [str(command) for command in processor.history_manager.get_full_history()] == ["divide 6.0 3.0 = 2.0"]
+
+
+def test_plugins_load_on_first_unknown_operation(monkeypatch):
+    """
+    Test that plugin entry points are read only when an unknown operation is looked up.
+    """
+    calls = []
+
+    def entry_points(group):
+        calls.append(group)
+        return [FakeEntryPoint('hypot', Hypotenuse), FakeEntryPoint('add', Hypotenuse)]
+
+    monkeypatch.setattr(importlib.metadata, "entry_points", entry_points)
+    registry = OperationRegistry(operations_map)
+
+    assert registry.get('add') is operations_map['add']
+    assert calls == []
+    assert registry.get('hypot') is Hypotenuse
+    assert registry.get('bogus') is None
+    # Loaded once, and built-ins are not overridden
+    assert calls == ['calculator.operations']
+    assert registry.get('add') is operations_map['add']
+    with pytest.raises(TypeError):
+        registry.register('bad', object)
+
+
+def test_execute_runs_plugin_operations(monkeypatch):
+    """
+    Test that a registered plugin operation runs through its Calculation class.
+    """
+    monkeypatch.setattr("main.operation_registry", OperationRegistry({**operations_map, 'hypot': Hypotenuse}))
+    processor = CommandProcessor(HistoryManager(storage=MemoryHistoryStorage()))
+    output = io.StringIO()
+
+    run_batch(processor, io.StringIO("hypot 3 4\n"), output)
+
+    assert output.getvalue().splitlines() == ["Result: 5.0", "Operation: Hypotenuse: 3.0, 4.0 = 5.0"]
@@ -0,0 +1,111 @@
+"""Test module for the expression engine and its plan cache."""
+
+import pytest
+
+from app.calculation import Modulus
+from app.expression import (
+    ExpressionError,
+    clear_plan_cache,
+    compile_expression,
+    plan_cache_info,
+)
+from app.metrics import METRICS
+from main import CommandProcessor
+
+
+@pytest.mark.parametrize("expression", [
+    "(3 + 4) * 2 ** 8 % 7",
+    "2 ** 3 ** 2",
+    "-2 ** 2 + 10 / 4",
+    "2 ** -1 - .5e1",
+    "((1.5 + 2) * (3 - 4.25)) % 2",
+])
+def test_expressions_match_python_semantics(expression):
+    """
+    Test that precedence and associativity follow Python.
+    """
+    value = compile_expression(expression).evaluate()
+    result = value if isinstance(value, float) else value.compute()
+    assert result == pytest.approx(eval(expression))  # pylint: disable=eval-used
+
+
+def test_compiled_plan_is_folded_and_cached():
+    """
+    Test that constant subtrees are folded into the root operation and plans are reused.
+    """
+    clear_plan_cache()
+    plan = compile_expression("(3 + 4) * 2 ** 8 % 7")
+
+    assert plan.steps == [('const', 1792.0), ('const', 7.0), ('op', Modulus)]
+    assert compile_expression("(3 +  4) * 2 ** 8   % 7") is plan
+    assert compile_expression("(3+4)*2**8%7") is plan
+    assert plan_cache_info().hits == 2
+
+
+def test_failing_subexpressions_raise_at_evaluation():
+    """
+    Test that a division by zero is not folded away but raised when the plan runs.
+    """
+    plan = compile_expression("1 / 0 + 1")
+    with pytest.raises(ZeroDivisionError):
+        plan.evaluate()
+
+
+@pytest.mark.parametrize("expression", ["", "(1 + 2", "1 2", "3 $ 4", "* 2"])
+def test_malformed_expressions_are_rejected(expression):
+    """
+    Test that malformed expressions raise ExpressionError.
+    """
+    with pytest.raises(ExpressionError):
+        compile_expression(expression)
+
+
+@pytest.mark.parametrize("expression", [
+    "(" * 400 + "1 + 2" + ")" * 400,
+    "-" * 2000 + "1",
+    " + ".join(["1"] * 3000),
+    "2" + " ** 2" * 2000,
+])
+def test_deeply_nested_expressions_are_rejected(expression, capsys):
+    """
+    Test that expressions too deep to parse safely are reported as invalid instead of exhausting the stack.
+    """
+    with pytest.raises(ExpressionError, match="nested too deeply"):
+        compile_expression(expression)
+
+    assert CommandProcessor().dispatch(f"eval {expression}")
+    assert capsys.readouterr().out == "Invalid expression: expression nested too deeply\n"
+    assert compile_expression("(" * 50 + "1 + 2" + ")" * 50).evaluate().compute() == 3
+
+
+def test_eval_command_records_one_history_entry(capsys):
+    """
+    Test that the eval command prints the result and records only the final operation.
+    """
+    processor = CommandProcessor()
+    assert processor.dispatch("eval (3 + 4) * 2 ** 8 % 7")
+
+    assert capsys.readouterr().out.splitlines() == [
+        "Result: 0.0",
+        "Operation: Modulus: 1792.0 % 7.0 = 0.0",
+    ]
+    assert [str(command) for command in processor.history_manager.get_full_history()] == ["mod 1792.0 7.0 = 0.0"]
+
+    processor.dispatch("eval 1 +")
+    assert capsys.readouterr().out == "Invalid expression: unexpected end of expression\n"
+
+
+def test_eval_times_parse_and_compute_separately(capsys):
+    """
+    Test that eval records parsing and intermediate computation as separate stages.
+    """
+    METRICS.reset()
+    processor = CommandProcessor()
+    processor.dispatch("eval (1 / 0 + 2) * 3")
+    processor.dispatch("eval -(2 ** 3)")
+
+    assert capsys.readouterr().out.splitlines() == ["Error: Division by zero.", "Result: -8.0"]
+    assert METRICS.histogram("parse", "eval").count == 2
+    assert METRICS.histogram("compute", "eval").count == 1
+    # A unary minus at the root leaves no operation to record
+    assert len(processor.history_manager.get_full_history()) == 0
@@ -1,11 +1,16 @@
 """Test module for FileManager operations using pyfakefs and pytest."""
 
+import asyncio
 import logging
+import mmap
+import os
+import tempfile
 from typing import Any
 
 import pytest
 
-from app.file_manager import FileManager
+from app.file_manager import (FileManager, delete_files, delete_files_async, read_files, read_files_async,
+                              write_files, write_files_async)
 
 
 def test_write_file_positive(fake_fs: Any, caplog: pytest.LogCaptureFixture):
@@ -78,3 +83,152 @@ def test_delete_file_negative(caplog: pytest.LogCaptureFixture):
 
     # Check logging without quotes around the filename
     assert "File not found for deletion: non_existent_file.txt" in caplog.text
+
+
+def test_write_file_replaces_atomically(fake_fs: Any):
+    """Test that writes replace the file whole, keep its permissions and leave no temporary files."""
+    fake_fs.create_file("reports/test_file.txt", contents="old", st_mode=0o100640)
+    file_manager = FileManager("reports/test_file.txt")
+
+    file_manager.write_file("new")
+
+    assert fake_fs.listdir("reports") == ["test_file.txt"]
+    assert file_manager.read_file() == "new"
+    assert os.stat("reports/test_file.txt").st_mode & 0o777 == 0o640
+
+
+def test_interrupted_write_keeps_previous_contents(fake_fs: Any, caplog: pytest.LogCaptureFixture):
+    """Test that a write failing part way leaves the original file untouched."""
+    fake_fs.create_file("test_file.txt", contents="Hello, World!")
+    file_manager = FileManager("test_file.txt")
+
+    def chunks():
+        yield "partial"
+        raise IOError("disk full")
+
+    with caplog.at_level(logging.ERROR):
+        with pytest.raises(IOError):
+            file_manager.write_chunks(chunks())
+
+    assert [name for name in os.listdir(".") if name.endswith(".tmp")] == []
+    assert file_manager.read_file() == "Hello, World!"
+    assert "Failed to write to file 'test_file.txt'. Error: disk full" in caplog.text
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_chunked_round_trip(fake_fs: Any, binary: bool):
+    """Test streaming a file out and back in fixed-size chunks."""
+    file_manager = FileManager("test_file.txt")
+    data = "0123456789" * 10
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+    if binary:
+        chunks = [chunk.encode() for chunk in chunks]
+
+    assert file_manager.write_chunks(iter(chunks), binary=binary) == len(data)
+
+    read = list(file_manager.read_chunks(chunk_size=16, binary=binary))
+    assert [len(chunk) for chunk in read] == [16] * 6 + [4]
+    assert (b"" if binary else "").join(read) == (data.encode() if binary else data)
+
+
+def test_read_chunks_negative(caplog: pytest.LogCaptureFixture):
+    """Test streaming from a non-existent file."""
+    file_manager = FileManager("non_existent_file.txt")
+
+    with caplog.at_level(logging.ERROR):
+        with pytest.raises(FileNotFoundError):
+            next(file_manager.read_chunks())
+
+    assert "File not found: non_existent_file.txt" in caplog.text
+
+
+def test_read_mapped_is_zero_copy(fake_fs: Any):
+    """Test that mapped reads expose the file through mmap without copying it."""
+    fake_fs.pause()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            file_manager = FileManager(os.path.join(directory, "payload.bin"))
+            file_manager.write_chunks([b"header", bytes(range(256)) * 64], binary=True)
+
+            with file_manager.read_mapped() as view:
+                buffer = view.obj
+                assert isinstance(buffer, mmap.mmap)
+                assert view.readonly
+                assert bytes(view[:6]) == b"header"
+                assert len(view) == 6 + 256 * 64
+            assert buffer.closed
+    finally:
+        fake_fs.resume()
+
+
+def test_read_mapped_falls_back_for_empty_files(fake_fs: Any):
+    """Test that files which cannot be mapped are read instead."""
+    fake_fs.create_file("empty.txt")
+    fake_fs.create_file("test_file.txt", contents="Hello, World!")
+
+    with FileManager("empty.txt").read_mapped() as view:
+        assert len(view) == 0
+    with FileManager("test_file.txt").read_mapped() as view:
+        assert bytes(view) == b"Hello, World!"
+
+
+def test_async_file_operations(fake_fs: Any):
+    """Test the async API writing, reading and deleting a file."""
+    file_manager = FileManager("test_file.txt")
+
+    async def round_trip():
+        await file_manager.write_file_async("Hello, World!")
+        content = await file_manager.read_file_async()
+        await file_manager.delete_file_async()
+        return content
+
+    assert asyncio.run(round_trip()) == "Hello, World!"
+    assert not fake_fs.exists("test_file.txt")
+
+
+def test_bulk_operations_report_together(fake_fs: Any, caplog: pytest.LogCaptureFixture):
+    """Test bulk write, read and delete with one summary log line per operation instead of one per file."""
+    fake_fs.create_dir("reports")
+    contents = {f"reports/report_{i}.txt": f"report {i}" for i in range(50)}
+
+    with caplog.at_level(logging.INFO):
+        written = write_files(contents)
+        read = read_files(list(contents) + ["reports/missing.txt"])
+        deleted = delete_files(contents)
+
+    assert written.results == dict.fromkeys(contents) and written.errors == {}
+    assert read.results == contents
+    assert list(read.errors) == ["reports/missing.txt"]
+    assert isinstance(read.errors["reports/missing.txt"], FileNotFoundError)
+    assert deleted.errors == {} and fake_fs.listdir("reports") == []
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 4
+    assert messages[0].startswith("Bulk write: 50 of 50 files succeeded in ")
+    assert messages[1].startswith("Bulk read: 50 of 51 files succeeded in ")
+    assert messages[2].startswith("Bulk read failed for 1 files: reports/missing.txt: ")
+    assert messages[3].startswith("Bulk delete: 50 of 50 files succeeded in ")
+
+
+def test_async_bulk_operations_summarize_failures(fake_fs: Any, caplog: pytest.LogCaptureFixture):
+    """Test that the async bulk API runs concurrently and names only the first few failures."""
+    fake_fs.create_file("present.txt", contents="here")
+    fake_fs.create_file("old.txt")
+    filenames = ["present.txt"] + [f"missing_{i}.txt" for i in range(8)]
+
+    async def bulk():
+        return await asyncio.gather(read_files_async(filenames),
+                                    write_files_async({"copy.txt": "here"}),
+                                    delete_files_async(["old.txt"]))
+
+    with caplog.at_level(logging.ERROR):
+        read, written, deleted = asyncio.run(bulk())
+
+    assert read.results == {"present.txt": "here"}
+    assert list(read.errors) == filenames[1:]
+    assert written.errors == {} and deleted.errors == {}
+    assert fake_fs.exists("copy.txt") and not fake_fs.exists("old.txt")
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert message.startswith("Bulk read failed for 8 files: missing_0.txt: ")
+    assert "missing_4.txt" in message and "missing_5.txt" not in message
+    assert message.endswith("; and 3 more")
@@ -2,9 +2,20 @@
 
 
 
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import pytest
+
+import app.history_manager
 from app.history_manager import (
+    ColumnarHistory,
     OperationCommand,
     HistoryManager,
+    MemoryHistoryStorage,
 )  # Assuming HistoryManager is in 'history_manager'
 
 def test_operation_command_creation():
@@ -131,3 +142,292 @@ def test_undo_last():
     # Ensure that undoing when the history is empty returns None
     last_operation = history_manager.undo_last()
     assert last_operation is None
+
+
+def test_append_only_history_is_reloaded():
+    """
+    Test that append-only persistence produces a CSV file that load_history can read back.
+    """
+    history_manager = HistoryManager("journal.csv")
+    history_manager.add_to_history(OperationCommand('add', 1.0, 2.0, 3.0))
+    history_manager.add_to_history(OperationCommand('divide', 9.0, 3.0, 3.0))
+
+    with open("journal.csv", 'r', encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    assert lines == ["operation,a,b,result", "add,1.0,2.0,3.0", "divide,9.0,3.0,3.0"]
+
+    reloaded = HistoryManager("journal.csv")
+    assert [str(command) for command in reloaded.get_full_history()] == [
+        "add 1.0 2.0 = 3.0",
+        "divide 9.0 3.0 = 3.0",
+    ]
+
+
+def test_rewrite_mode_matches_append_only():
+    """
+    Test that the legacy full-rewrite mode and append-only mode write identical files.
+    """
+    for filename, append_only in (("rewrite.csv", False), ("append.csv", True)):
+        history_manager = HistoryManager(filename, append_only=append_only)
+        history_manager.add_to_history(OperationCommand('power', 2.0, 3.0, 8.0))
+        history_manager.add_to_history(OperationCommand('mod', 10.0, 3.0, 1.0))
+
+    with open("rewrite.csv", 'r', encoding='utf-8') as rewrite, open("append.csv", 'r', encoding='utf-8') as append:
+        assert rewrite.read() == append.read()
+
+
+def test_equal_operation_commands_hash_alike():
+    """
+    Test that equal records hash equally, so they work as set members and dict keys.
+    """
+    records = {OperationCommand('add', 1.0, 2.0, 3.0), OperationCommand('add', 1.0, 2.0, 3.0)}
+
+    assert records == {OperationCommand('add', 1.0, 2.0, 3.0)}
+    assert OperationCommand('add', 1.0, 2.0, 3.0) not in {OperationCommand('add', 1.0, 2.0, 4.0)}
+
+
+def test_columnar_history_views_and_exact_values():
+    """
+    Test that ColumnarHistory hands out equal OperationCommand views and keeps non-float results intact.
+    """
+    complex_result = OperationCommand('power', -8.0, 0.5, complex(0, 2.8))
+    big_result = OperationCommand('power', 3, 50, 3 ** 50)
+    history = ColumnarHistory([OperationCommand('add', 1.0, 2.0, 3.0), complex_result, big_result])
+
+    assert len(history) == 3
+    assert history[0] == OperationCommand('add', 1.0, 2.0, 3.0)
+    assert history[1].result == complex(0, 2.8)
+    assert history[2].result == 3 ** 50
+    assert history[-2:] == [complex_result, big_result]
+
+    assert history.pop() == big_result
+    assert history.pop() == complex_result
+    history.append(OperationCommand('mod', 7.0, 4.0, 3.0))
+    assert [str(command) for command in history] == ["add 1.0 2.0 = 3.0", "mod 7.0 4.0 = 3.0"]
+
+
+def test_operation_command_has_no_instance_dict():
+    """
+    Test that OperationCommand uses __slots__ to keep history records small.
+    """
+    assert not hasattr(OperationCommand('add', 1.0, 2.0, 3.0), '__dict__')
+
+
+def test_lazy_history_reads_without_loading(monkeypatch):
+    """
+    Test that a lazy HistoryManager answers tail, index and iteration queries from disk.
+    """
+    commands = [OperationCommand('add', float(i), 1.0, float(i + 1)) for i in range(50)]
+    HistoryManager().add_many(commands)
+
+    # A tiny block size makes the backwards tail read span several blocks
+    monkeypatch.setattr(app.history_manager, "TAIL_BLOCK_SIZE", 16)
+    history_manager = HistoryManager(lazy=True)
+
+    assert history_manager.get_latest(3) == commands[-3:]
+    assert history_manager.get_entry(-1) == commands[-1]
+    assert history_manager.get_entry(7) == commands[7]
+    assert list(history_manager.iter_history()) == commands
+    assert len(history_manager.get_full_history()) == 50
+    assert history_manager.get_full_history()._records is None
+
+    history_manager.add_to_history(OperationCommand('mod', 7.0, 4.0, 3.0))
+    assert len(history_manager.get_full_history()) == 51
+    assert history_manager.get_latest(1) == [OperationCommand('mod', 7.0, 4.0, 3.0)]
+
+    # Undo needs the records in memory and still works
+    assert history_manager.undo_last() == OperationCommand('mod', 7.0, 4.0, 3.0)
+    assert HistoryManager(lazy=True).get_latest(1) == commands[-1:]
+
+
+def test_offset_index_gives_random_access(fake_fs):
+    """
+    Test that the sidecar index tracks every record and is rebuilt when stale.
+    """
+    commands = [OperationCommand('multiply', float(i), 2.0, float(i * 2)) for i in range(10)]
+    history_manager = HistoryManager(lazy=True, index=True)
+    history_manager.add_many(commands[:6])
+    history_manager.add_many(commands[6:])
+
+    assert fake_fs.stat("history.csv.idx").st_size == 10 * 8
+    assert history_manager.get_entry(4) == commands[4]
+    assert history_manager.get_latest(2) == commands[-2:]
+
+    # Rows appended without the index make it stale; the next indexed open rebuilds it
+    HistoryManager().add_to_history(OperationCommand('add', 1.0, 1.0, 2.0))
+    reopened = HistoryManager(lazy=True, index=True)
+    assert len(reopened.get_full_history()) == 11
+    assert reopened.get_entry(10) == OperationCommand('add', 1.0, 1.0, 2.0)
+
+
+@pytest.mark.parametrize("options", [{}, {'lazy': True}, {'lazy': True, 'index': True}, {'durability': 'exit'}])
+def test_undo_and_clear_truncate_instead_of_rewriting(options):
+    """
+    Test that undo cuts the last row off the file and clear cuts it back to the header, without rewriting rows.
+    """
+    commands = [OperationCommand('add', float(i), 0.5, i + 0.5) for i in range(5)]
+    HistoryManager("expected.csv").add_many(commands[:3])
+    with open("expected.csv", 'rb') as file:
+        expected = file.read()
+
+    history_manager = HistoryManager(**options)
+    history_manager.add_many(commands)
+    history_manager.flush()
+    rows_written = app.history_manager.METRICS.counter("history.rows_written")
+
+    assert history_manager.undo_last() == commands[4]
+    assert history_manager.undo_last() == commands[3]
+    assert app.history_manager.METRICS.counter("history.rows_written") == rows_written
+    with open("history.csv", 'rb') as file:
+        assert file.read() == expected
+    assert HistoryManager(**options).get_latest(5) == commands[:3]
+
+    history_manager.clear_history()
+    assert history_manager.undo_last() is None
+    with open("history.csv", 'rb') as file:
+        assert file.read() == b"operation,a,b,result\r\n"
+    history_manager.add_to_history(commands[0])
+    history_manager.close()
+    assert list(HistoryManager(**options).iter_history()) == commands[:1]
+
+
+@pytest.mark.parametrize("options", [{}, {'durability': 'batch'}])
+def test_thread_safe_history_under_concurrent_add_undo_read(options):
+    """
+    Test that many threads adding, undoing and reading through one manager keep the history consistent.
+    """
+    history_manager = HistoryManager(thread_safe=True, **options)
+    threads, rounds = 8, 300
+    undone = [0] * threads
+    errors = []
+
+    def worker(thread: int) -> None:
+        try:
+            for i in range(rounds):
+                history_manager.add_to_history(OperationCommand('add', float(thread), float(i), float(thread + i)))
+                if i % 3 == 2 and history_manager.undo_last() is not None:
+                    undone[thread] += 1
+                snapshot = history_manager.get_full_history()
+                length = len(snapshot)
+                # A snapshot neither changes length nor shows a half-written record
+                assert all(command.result == command.a + command.b for command in snapshot)
+                assert len(list(snapshot)) == length
+                assert len(history_manager.get_latest(5)) <= 5
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(thread,)) for thread in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    history_manager.close()
+
+    assert errors == []
+    history = list(history_manager.get_full_history())
+    assert len(history) == threads * rounds - sum(undone)
+    assert list(HistoryManager().iter_history()) == history
+
+
+def test_thread_safe_undo_keeps_older_snapshots_intact():
+    """
+    Test that undo shares the in-memory copy instead of copying it, and that records reusing
+    the undone slots never show through snapshots taken before the undo.
+    """
+    commands = [OperationCommand('add', float(i), 1.0, i + 1.0) for i in range(6)]
+    history_manager = HistoryManager(storage=MemoryHistoryStorage(), thread_safe=True)
+    history_manager.add_many(commands[:3])
+    before = history_manager.get_full_history()
+    records = history_manager._published[0]
+
+    history_manager.undo_last()
+    history_manager.undo_last()
+    middle = history_manager.get_full_history()
+    assert history_manager._published[0] is records
+    history_manager.add_many(commands[3:5])
+    history_manager.add_to_history(commands[5])
+
+    assert list(before) == commands[:3]
+    assert before.tail(2) == commands[1:3] and before[-1] == commands[2]
+    assert list(middle) == commands[:1]
+    assert list(history_manager.get_full_history()) == commands[:1] + commands[3:]
+
+
+@pytest.mark.parametrize("thread_safe", [False, True])
+def test_shared_history_picks_up_other_sessions(thread_safe):
+    """
+    Test that sessions sharing a history file see each other's records and never drop them.
+    """
+    commands = [OperationCommand('add', float(i), 1.0, i + 1.0) for i in range(4)]
+    first = HistoryManager(shared=True, thread_safe=thread_safe)
+    second = HistoryManager(shared=True, durability='batch', thread_safe=thread_safe)
+
+    first.add_to_history(commands[0])
+    second.add_to_history(commands[1])
+    # Queued records become visible to other sessions once written
+    second.flush()
+    assert list(first.get_full_history()) == commands[:2]
+    assert first.get_latest(1) == commands[1:2]
+    assert first.query("a >= 1") == [(1, commands[1])]
+
+    # A full rewrite keeps the other session's records
+    first.save_history()
+    assert list(HistoryManager().iter_history()) == commands[:2]
+
+    # Undo removes the newest record of the shared history, whoever wrote it
+    assert first.undo_last() == commands[1]
+    assert list(second.get_full_history()) == commands[:1]
+    second.add_to_history(commands[2])
+    second.flush()
+    first.add_to_history(commands[3])
+    assert list(second.get_full_history()) == [commands[0], commands[2], commands[3]]
+    assert first.query("a >= 1") == [(1, commands[2]), (2, commands[3])]
+    second.close()
+
+
+def test_shared_history_across_processes(fake_fs):
+    """
+    Test that processes adding and undoing concurrently on one shared history file lose no records.
+    """
+    script = (
+        "from app.history_manager import HistoryManager, OperationCommand\n"
+        "history = HistoryManager(shared=True, durability='batch', batch_size=10)\n"
+        "for i in range(100):\n"
+        "    history.add_to_history(OperationCommand('add', float(i), 1.0, i + 1.0))\n"
+        "    if i % 5 == 4:\n"
+        "        history.undo_last()\n"
+        "history.close()\n"
+    )
+    # Real processes and file locks need the real filesystem
+    fake_fs.pause()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            environment = dict(os.environ, PYTHONPATH=os.getcwd())
+            processes = [subprocess.Popen([sys.executable, "-c", script], cwd=directory, env=environment)
+                         for _ in range(4)]
+            assert [process.wait(timeout=120) for process in processes] == [0] * 4
+            history = list(HistoryManager(os.path.join(directory, "history.csv")).iter_history())
+    finally:
+        fake_fs.resume()
+
+    assert len(history) == 4 * 80
+    assert all(command.result == command.a + command.b for command in history)
+
+
+@pytest.mark.parametrize("options", [{}, {'shared': True, 'durability': 'batch'}])
+def test_history_is_loaded_on_first_read(options):
+    """
+    Test that opening a history, adding to it and undoing read nothing until the history is read.
+    """
+    commands = [OperationCommand('add', float(i), 1.0, i + 1.0) for i in range(5)]
+    HistoryManager().add_many(commands)
+
+    history_manager = HistoryManager(**options)
+    history_manager.add_to_history(OperationCommand('mod', 7.0, 4.0, 3.0))
+    assert history_manager.undo_last() == OperationCommand('mod', 7.0, 4.0, 3.0)
+    history_manager.add_to_history(commands[0])
+    assert history_manager.get_full_history()._records is None
+
+    assert list(history_manager.get_full_history()) == commands + commands[:1]
+    assert history_manager.get_full_history()._records is not None
+    history_manager.close()
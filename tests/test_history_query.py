@@ -0,0 +1,125 @@
+"""Test module for indexed history queries."""
+
+import random
+
+import pytest
+
+from app.history_manager import HistoryManager, MemoryHistoryStorage, OperationCommand
+from app.history_query import COMPARISONS, Condition, HistoryIndex, QueryError, parse_query
+from main import CommandProcessor
+
+
+def matches_condition(command, condition):
+    if condition.field == 'operation':
+        return command.operation == condition.value
+    value = getattr(command, condition.field)
+    # Complex results never match a numeric comparison
+    return not isinstance(value, complex) and COMPARISONS[condition.comparison](value, condition.value)
+
+
+def brute_force(history, query):
+    """Answer a query by scanning every record."""
+    conditions = parse_query(query)
+    return [(position, command) for position, command in enumerate(history)
+            if all(matches_condition(command, condition) for condition in conditions)]
+
+
+def test_parse_query():
+    """
+    Test that conditions, fields and comparisons are parsed, and malformed queries rejected.
+    """
+    assert parse_query("operation = divide and result > 1e6 AND a<=10") == [
+        Condition('operation', '=', 'divide'),
+        Condition('result', '>', 1e6),
+        Condition('a', '<=', 10.0),
+    ]
+    for query in ["", "result >", "color = red", "operation > add", "b = x", "a = 1 or b = 2"]:
+        with pytest.raises(QueryError):
+            parse_query(query)
+
+
+QUERIES = [
+    "operation = divide and result > 1e6",
+    "result >= 10 and result < 20",
+    "result = 3",
+    "operation = add and a > 50 and b <= 20",
+    "result > 5 and result >= 5 and result <= 40 and result < 40",
+    "operation = mod",
+    "b = 7",
+]
+
+
+def test_index_stays_in_step_with_add_undo_and_clear():
+    """
+    Test that indexed queries match a full scan after adds, undos, a bulk add and a clear.
+    """
+    rng = random.Random(7)
+    history_manager = HistoryManager(storage=MemoryHistoryStorage())
+
+    def random_command():
+        operation = rng.choice(['add', 'divide', 'multiply'])
+        a, b = float(rng.randint(0, 100)), float(rng.randint(1, 30))
+        result = {'add': a + b, 'divide': a * 1e5 / b, 'multiply': a * b}[operation]
+        return OperationCommand(operation, a, b, result)
+
+    for _ in range(200):
+        history_manager.add_to_history(random_command())
+    assert history_manager.query(QUERIES[0]) == brute_force(history_manager.get_full_history(), QUERIES[0])
+
+    for _ in range(50):
+        history_manager.undo_last()
+    history_manager.add_many(random_command() for _ in range(30))
+    history_manager.add_to_history(OperationCommand('power', -8.0, 0.5, complex(0, 2.8)))
+    for query in QUERIES:
+        assert history_manager.query(query) == brute_force(history_manager.get_full_history(), query)
+
+    history_manager.clear_history()
+    assert history_manager.query("result > 0") == []
+    history_manager.add_to_history(OperationCommand('mod', 9.0, 7.0, 2.0))
+    assert history_manager.query("operation = mod") == [(0, OperationCommand('mod', 9.0, 7.0, 2.0))]
+
+
+def test_bulk_built_index_matches_incremental_index():
+    """
+    Test that indexing a whole history at once orders results, including ties, like adding records one by one.
+    """
+    rng = random.Random(11)
+    commands = [OperationCommand(rng.choice(['add', 'divide']), 1.0, 2.0, float(rng.randint(0, 50)))
+                for _ in range(500)]
+    commands.append(OperationCommand('power', -8.0, 0.5, complex(0, 2.8)))
+    built = HistoryIndex(commands)
+    incremental = HistoryIndex()
+    incremental.extend(commands)
+
+    assert len(built) == len(incremental) == len(commands)
+    for operation in ('add', 'divide', 'power'):
+        assert built._postings[operation] == incremental._postings[operation]
+        assert built._results[operation].keys == incremental._results[operation].keys
+        assert built._results[operation].positions == incremental._results[operation].positions
+    # Undo relies on the newest record of a value being the last of its run
+    built.pop(commands.pop())
+    built.pop(commands.pop())
+    for query in ("result >= 25 and result < 30", "operation = divide and result = 7"):
+        assert built.search(parse_query(query), commands.__getitem__) == brute_force(commands, query)
+
+
+def test_history_where_command(capsys):
+    """
+    Test that 'history where' prints matches numbered by their position in history.
+    """
+    processor = CommandProcessor(HistoryManager(storage=MemoryHistoryStorage()))
+    for command in ["divide 5000000 2", "add 1 2", "divide 4 2", "multiply 2000 1000"]:
+        processor.dispatch(command)
+    capsys.readouterr()
+
+    processor.dispatch("history where operation = divide and result > 1e6")
+    processor.dispatch("history where result >= 3 and a < 10")
+    processor.dispatch("history where result > 1e9")
+    processor.dispatch("history where size > 3")
+
+    assert capsys.readouterr().out.splitlines() == [
+        "1: divide 5000000.0 2.0 = 2500000.0",
+        "2: add 1.0 2.0 = 3.0",
+        "No matching operations.",
+        "Invalid query: unknown field 'size', expected operation, a, b or result",
+    ]
@@ -0,0 +1,153 @@
+"""Test module for the write-behind HistoryWriter and its use by HistoryManager."""
+
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+from app.history_manager import HistoryManager, OperationCommand
+from app.history_writer import HistoryWriter
+
+
+def read_rows(filename: str = "history.csv") -> list:
+    """Return the data rows of a CSV history file."""
+    with open(filename, 'r', encoding='utf-8') as file:
+        return file.read().splitlines()[1:]
+
+
+def test_exit_durability_writes_only_on_close():
+    """
+    Test that 'exit' durability keeps records queued until the writer is closed.
+    """
+    written = []
+    writer = HistoryWriter(written.extend, durability='exit')
+
+    writer.submit([1, 2])
+    writer.submit([3])
+    assert written == []
+    assert writer.pending == 3
+
+    writer.close()
+    assert written == [1, 2, 3]
+    with pytest.raises(RuntimeError):
+        writer.submit([4])
+
+
+def test_always_durability_writes_before_returning():
+    """
+    Test that 'always' durability persists every record synchronously.
+    """
+    written = []
+    writer = HistoryWriter(written.extend, durability='always')
+    writer.submit([1])
+    assert written == [1]
+    writer.close()
+
+
+def test_batch_durability_writes_in_background():
+    """
+    Test that the background thread writes once the batch size is reached.
+    """
+    batches = []
+    written = threading.Event()
+
+    def write(records):
+        batches.append(list(records))
+        written.set()
+
+    writer = HistoryWriter(write, durability='batch', batch_size=3, flush_interval=60)
+    writer.submit([1, 2, 3])
+    assert written.wait(5)
+    writer.close()
+    assert batches == [[1, 2, 3]]
+
+
+def test_failed_write_keeps_records_queued_in_order():
+    """
+    Test that records from a failed write are retried before later ones on the next flush.
+    """
+    written = []
+    failures = [OSError("disk full")]
+
+    def write(records):
+        if failures:
+            raise failures.pop()
+        written.extend(records)
+
+    writer = HistoryWriter(write, durability='exit')
+    writer.submit([1, 2])
+    with pytest.raises(OSError):
+        writer.flush()
+    assert writer.pending == 2
+
+    writer.submit([3])
+    writer.close()
+    assert written == [1, 2, 3]
+
+
+def test_unclosed_batch_writer_flushes_at_exit(fake_fs):
+    """
+    Test that a 'batch' writer the program never closes still writes its queue at interpreter exit.
+    """
+    script = ("from app.history_manager import HistoryManager, OperationCommand\n"
+              "manager = HistoryManager(durability='batch', flush_interval=3600)\n"
+              "manager.add_to_history(OperationCommand('add', 1.0, 2.0, 3.0))\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # The child process writes to the real filesystem
+    fake_fs.pause()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            subprocess.run([sys.executable, "-c", script], cwd=tmp, env=dict(os.environ, PYTHONPATH=root), check=True)
+            assert read_rows(os.path.join(tmp, "history.csv")) == ["add,1.0,2.0,3.0"]
+    finally:
+        fake_fs.resume()
+
+
+def test_unclosed_writers_are_collected_and_flushed():
+    """
+    Test that dropped, never closed managers release their writer threads and still write their queues.
+    """
+    # Writers other tests left behind must not count
+    gc.collect()
+    threads = threading.active_count()
+    for i in range(50):
+        manager = HistoryManager(f"history_{i}.csv", durability='batch', flush_interval=3600)
+        manager.add_to_history(OperationCommand('add', float(i), 2.0, i + 2.0))
+    del manager
+    # A collection already running on a writer thread may still be closing the others
+    deadline = time.monotonic() + 5
+    while gc.collect() or threading.active_count() > threads:
+        assert time.monotonic() < deadline, [thread.name for thread in threading.enumerate()]
+        time.sleep(0.01)
+    assert read_rows("history_49.csv") == ["add,49.0,2.0,51.0"]
+
+
+def test_unknown_durability_is_rejected():
+    """
+    Test that an unknown durability level raises ValueError.
+    """
+    with pytest.raises(ValueError, match="Unknown durability"):
+        HistoryWriter(list.append, durability='sometimes')
+
+
+def test_history_manager_write_behind_is_consistent():
+    """
+    Test that queued operations are flushed before reads, undo and close touch the file.
+    """
+    history_manager = HistoryManager(durability='exit')
+    history_manager.add_to_history(OperationCommand('add', 1.0, 2.0, 3.0))
+    history_manager.add_to_history(OperationCommand('multiply', 2.0, 3.0, 6.0))
+    assert len(history_manager.get_full_history()) == 2
+
+    assert history_manager.undo_last() == OperationCommand('multiply', 2.0, 3.0, 6.0)
+    assert read_rows() == ["add,1.0,2.0,3.0"]
+
+    history_manager.add_to_history(OperationCommand('mod', 7.0, 4.0, 3.0))
+    assert read_rows() == ["add,1.0,2.0,3.0"]
+    history_manager.close()
+    assert read_rows() == ["add,1.0,2.0,3.0", "mod,7.0,4.0,3.0"]
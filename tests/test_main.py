@@ -1,10 +1,21 @@
 """Test module for OperationCommand and HistoryManager."""
+import asyncio
+import io
+import os
+import subprocess
+import sys
 
+import pytest
 
 from app.history_manager import (
     OperationCommand,
     HistoryManager,
+    MemoryHistoryStorage,
 )
+from app.metrics import METRICS
+from app.calculator import Calculator
+import main as main_module
+from main import CommandProcessor, main, run_batch, run_parallel, start_server
 
 def __init__(self, operation: str, a: float, b: float, result: float) -> None:
     self.operation = operation
@@ -135,3 +146,186 @@ def test_undo_last():
     # Ensure that undoing when the history is empty returns None
     last_operation = history_manager.undo_last()
     assert last_operation is None
+
+
+def test_run_batch_writes_results_to_output():
+    """
+    Test that batch mode runs every command from the source and writes results to the output stream.
+    """
+    source = io.StringIO("add 1 2\n\n# comment\nDIVIDE 4 0\nhistory\nexit\nadd 9 9\n")
+    output = io.StringIO()
+
+    count, elapsed = run_batch(CommandProcessor(), source, output)
+
+    assert count == 3
+    assert elapsed >= 0
+    assert output.getvalue().splitlines() == [
+        "Result: 3.0",
+        "Operation: Addition: 1.0 + 2.0 = 3.0",
+        "Error: Division by zero.",
+        "1: add 1.0 2.0 = 3.0",
+    ]
+
+
+def test_run_batch_continues_after_overflow():
+    """
+    Test that an overflowing calculation is reported and the batch goes on with the next line.
+    """
+    output = io.StringIO()
+
+    count, _ = run_batch(CommandProcessor(), io.StringIO("power 10 400\nadd 3 4\n"), output)
+
+    assert count == 2
+    assert output.getvalue().splitlines() == [
+        "Error: 10.0 ** 400.0 has about 400 digits; use 'power a b mod m' for a modular result",
+        "Result: 7.0",
+        "Operation: Addition: 3.0 + 4.0 = 7.0",
+    ]
+
+
+def test_power_mod_command():
+    """
+    Test that 'power a b mod m' computes a modular power and records it as 'powmod'.
+    """
+    processor = CommandProcessor(HistoryManager(storage=MemoryHistoryStorage()))
+    output = io.StringIO()
+
+    run_batch(processor, io.StringIO("power 3 100000000000 mod 1000\npower 2 3 mod 0.5\n"), output)
+
+    assert output.getvalue().splitlines() == [
+        f"Result: {pow(3, 100000000000, 1000)}",
+        f"Operation: ModularPower: 3.0 ** 100000000000.0 mod 1000.0 = {pow(3, 100000000000, 1000)}",
+        "Error: power with mod requires whole numbers",
+    ]
+    assert [command.operation for command in processor.history_manager.get_full_history()] == ['powmod']
+
+
+def test_import_main_defers_optional_modules(fake_fs):
+    """
+    Test that importing main does not import the modules only some commands and modes need.
+    """
+    deferred = ['asyncio', 'multiprocessing', 'concurrent.futures', 'logging',
+                'app.expression', 'app.history_query', 'app.history_writer']
+    script = f"import sys, main; print([name for name in {deferred!r} if name in sys.modules])"
+    fake_fs.pause()
+    try:
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+    finally:
+        fake_fs.resume()
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_batch_missing_file_is_a_usage_error(capsys):
+    """
+    Test that --batch with a file that does not exist exits with a usage error.
+    """
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--batch", "missing.txt"])
+
+    assert exc_info.value.code == 2
+    assert "batch file 'missing.txt' does not exist" in capsys.readouterr().err
+
+
+def test_repl_flushes_history_on_eof(monkeypatch, capsys):
+    """
+    Test that the REPL writes queued history when input ends.
+    """
+    commands = iter(["add 1 2", "power 2 3"])
+
+    def fake_input(prompt):
+        try:
+            return next(commands)
+        except StopIteration:
+            raise EOFError from None
+
+    monkeypatch.setattr("builtins.input", fake_input)
+    main(["--durability", "exit"])
+
+    assert "Goodbye!" in capsys.readouterr().out
+    assert [str(command) for command in HistoryManager().get_full_history()] == [
+        "add 1.0 2.0 = 3.0",
+        "power 2.0 3.0 = 8.0",
+    ]
+
+
+def test_run_parallel_matches_sequential_batch(fake_fs):
+    """
+    Test that parallel batch mode produces the same output, history order and metrics as run_batch.
+    """
+    script = "add 1 2\nmultiply 3 4\ndivide 1 0\nundo\npower 2 5\neval (1 + 2) * 3\nhistory\nmod 9 4\nbogus\n"
+
+    sequential_output = io.StringIO()
+    sequential = CommandProcessor(HistoryManager(storage=MemoryHistoryStorage()))
+    run_batch(sequential, io.StringIO(script), sequential_output)
+
+    METRICS.reset()
+    parallel_output = io.StringIO()
+    parallel = CommandProcessor(HistoryManager(storage=MemoryHistoryStorage()))
+    # The process pool needs real pipes, so suspend the fake filesystem while it runs
+    fake_fs.pause()
+    try:
+        count, _ = run_parallel(parallel, io.StringIO(script), parallel_output, workers=2, chunk_size=2)
+    finally:
+        fake_fs.resume()
+
+    assert count == 9
+    assert parallel_output.getvalue() == sequential_output.getvalue()
+    assert list(parallel.history_manager.get_full_history()) == list(sequential.history_manager.get_full_history())
+    assert METRICS.histogram("compute", "add").count == 1
+    assert METRICS.counter("errors.zero_division") == 1
+
+
+def test_parallel_workers_apply_the_time_budget(fake_fs):
+    """
+    Test that worker processors are created with the parent's time budget, so --workers does not drop it.
+    """
+    # The budgeted calculation worker needs real pipes
+    fake_fs.pause()
+    try:
+        main_module._init_worker(0.25)
+        processor = main_module._worker_processor
+        assert processor.calculator.time_budget == 0.25
+        text, records, _ = main_module._run_chunk(["add 1 2", "power 3 200 mod 7"])
+        processor.close()
+    finally:
+        fake_fs.resume()
+
+    assert text.splitlines() == ["Result: 3.0", "Operation: Addition: 1.0 + 2.0 = 3.0",
+                                 "Result: 2", "Operation: ModularPower: 3.0 ** 200.0 mod 7.0 = 2"]
+    assert [record[0] for record in records] == ['add', 'powmod']
+
+
+def test_server_pipelined_sessions_share_history():
+    """
+    Test that the server answers pipelined commands in order and that sessions share one history.
+    """
+    calculator = Calculator(HistoryManager(storage=MemoryHistoryStorage()))
+
+    async def scenario():
+        server = await start_server(calculator, "127.0.0.1:0")
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            # All three commands are sent before any response is read
+            writer.write(b"add 1 2\nbogus\nhelp\n")
+            first = [(await reader.readline()).decode() for _ in range(4)]
+            while await reader.readline() != b".\n":
+                pass
+            other_reader, other_writer = await asyncio.open_connection("127.0.0.1", port)
+            other_writer.write(b"history\nexit\n")
+            second = (await other_reader.read()).decode()
+            writer.close()
+            other_writer.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first == [
+        "Result: 3.0\n",
+        "Operation: Addition: 1.0 + 2.0 = 3.0\n",
+        ".\n",
+        "Invalid command format. Type 'help' for instructions.\n",
+    ]
+    assert second == "1: add 1.0 2.0 = 3.0\n.\n.\n"
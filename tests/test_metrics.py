@@ -0,0 +1,61 @@
+"""Test module for performance instrumentation and the stats command."""
+
+import pytest
+
+from app.metrics import METRICS, LatencyHistogram, MetricsRegistry
+from main import CommandProcessor
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    """
+    Test that percentiles land in the bucket containing the requested rank.
+    """
+    histogram = LatencyHistogram()
+    for _ in range(98):
+        histogram.record(1e-6)
+    histogram.record(1e-3)
+    histogram.record(1e-3)
+
+    assert histogram.count == 100
+    assert histogram.percentile(0.5) == pytest.approx(1e-6, rel=0.25)
+    assert histogram.percentile(0.99) == pytest.approx(1e-3, rel=0.25)
+    assert histogram.total == pytest.approx(98e-6 + 2e-3)
+
+
+def test_prometheus_output_has_quantiles_and_counters():
+    """
+    Test the Prometheus text format of a registry.
+    """
+    registry = MetricsRegistry()
+    registry.observe("compute", 2e-6, "add")
+    registry.increment("errors.zero_division")
+
+    text = registry.to_prometheus()
+
+    assert '# TYPE calculator_stage_seconds summary' in text
+    assert 'calculator_stage_seconds{stage="compute",operation="add",quantile="0.99"}' in text
+    assert 'calculator_stage_seconds_count{stage="compute",operation="add"} 1' in text
+    assert 'calculator_events_total{event="errors.zero_division"} 1' in text
+
+
+def test_execute_records_stage_latencies(capsys):
+    """
+    Test that executing commands records parse, compute, persist and print latencies per operation.
+    """
+    METRICS.reset()
+    processor = CommandProcessor()
+    processor.execute("add 1 2")
+    processor.execute("divide 1 0")
+    processor.execute("bogus")
+
+    for stage in ("parse", "compute", "persist", "print"):
+        assert METRICS.histogram(stage, "add").count == 1
+    assert METRICS.histogram("history.write").count == 1
+    assert METRICS.counter("errors.zero_division") == 1
+    assert METRICS.counter("commands.invalid") == 1
+
+    capsys.readouterr()
+    assert processor.dispatch("stats")
+    output = capsys.readouterr().out
+    assert "p99 us" in output
+    assert "compute" in output
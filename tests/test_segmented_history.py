@@ -0,0 +1,118 @@
+"""Test module for segmented history storage."""
+
+import gzip
+import os
+
+import pytest
+
+from app.history_manager import HistoryManager, OperationCommand
+from app.segmented_history import SEGMENTS_SUFFIX, SegmentedHistoryStorage
+
+DIRECTORY = "history.csv" + SEGMENTS_SUFFIX
+
+
+def commands(start, stop):
+    return [OperationCommand('add', float(i), 1.0, float(i + 1)) for i in range(start, stop)]
+
+
+def test_segments_rotate_compress_and_read_back():
+    """
+    Test that full segments are sealed, gzipped in the background and still read as one history.
+    """
+    history_manager = HistoryManager(segment_rows=4)
+    assert isinstance(history_manager.get_full_history(), SegmentedHistoryStorage)
+    history_manager.add_many(commands(0, 6))
+    for command in commands(6, 10):
+        history_manager.add_to_history(command)
+    history_manager.close()
+
+    assert sorted(os.listdir(DIRECTORY)) == ["00000001-4.csv.gz", "00000002-4.csv.gz", "00000003.csv"]
+    with gzip.open(os.path.join(DIRECTORY, "00000002-4.csv.gz"), 'rt') as file:
+        assert file.read().splitlines()[1] == "add,4.0,1.0,5.0"
+
+    reopened = HistoryManager(segment_rows=4)
+    assert len(reopened.get_full_history()) == 10
+    assert list(reopened.iter_history()) == commands(0, 10)
+    assert reopened.get_entry(5) == commands(0, 10)[5]
+    assert reopened.get_latest(7) == commands(3, 10)
+    reopened.close()
+
+
+def test_load_reads_only_the_active_segment(monkeypatch):
+    """
+    Test that opening a history and reading its newest entries does not touch sealed segments.
+    """
+    HistoryManager(segment_rows=5, compress_segments=False).add_many(commands(0, 23))
+    reads = []
+    original = SegmentedHistoryStorage._records
+    monkeypatch.setattr(SegmentedHistoryStorage, "_records",
+                        lambda self, segment: reads.append(segment.sequence) or original(self, segment))
+
+    history_manager = HistoryManager(segment_rows=5, compress_segments=False)
+    assert len(history_manager.get_full_history()) == 23
+    assert history_manager.get_latest(3) == commands(20, 23)
+    assert reads == []
+    assert history_manager.get_latest(6) == commands(17, 23)
+    assert reads == [4]
+
+
+def test_undo_reopens_the_previous_segment():
+    """
+    Test that undoing past the start of the active segment makes the previous segment writable again.
+    """
+    history_manager = HistoryManager(segment_rows=3)
+    history_manager.add_many(commands(0, 7))
+
+    for expected in reversed(commands(2, 7)):
+        assert history_manager.undo_last() == expected
+    history_manager.add_to_history(OperationCommand('mod', 9.0, 4.0, 1.0))
+    history_manager.close()
+
+    reopened = HistoryManager(segment_rows=3)
+    assert list(reopened.iter_history()) == commands(0, 2) + [OperationCommand('mod', 9.0, 4.0, 1.0)]
+    # The reopened segment filled up again and was sealed
+    assert sorted(os.listdir(DIRECTORY)) == ["00000001-3.csv.gz"]
+    reopened.clear_history()
+    assert len(HistoryManager(segment_rows=3).get_full_history()) == 0
+
+
+def test_undo_straight_after_rotation():
+    """
+    Test undoing when the history is an exact multiple of the segment size, so the new active segment has no file yet.
+    """
+    history_manager = HistoryManager(segment_rows=2)
+    history_manager.add_many(commands(0, 4))
+
+    assert history_manager.undo_last() == commands(3, 4)[0]
+    assert history_manager.undo_last() == commands(2, 3)[0]
+    assert history_manager.undo_last() == commands(1, 2)[0]
+    history_manager.close()
+
+    assert list(HistoryManager(segment_rows=2).iter_history()) == commands(0, 1)
+
+
+def test_retention_and_byte_cap_bound_the_history():
+    """
+    Test that byte-capped segments rotate and only the newest retained segments are kept.
+    """
+    history_manager = HistoryManager(segment_bytes=100, retain_segments=2, compress_segments=False)
+    history_manager.add_many(commands(0, 3))
+    assert history_manager.query("result > 0") == [(i, command) for i, command in enumerate(commands(0, 3))]
+    for command in commands(3, 40):
+        history_manager.add_to_history(command)
+
+    assert len(os.listdir(DIRECTORY)) <= 3
+    history = list(history_manager.iter_history())
+    assert history == commands(40 - len(history), 40)
+    # Positions shifted when old segments were dropped, so the query index was rebuilt
+    assert history_manager.query("a >= 39") == [(len(history) - 1, commands(39, 40)[0])]
+
+
+def test_segment_options_are_validated():
+    """
+    Test that segmenting is refused for storages it cannot wrap.
+    """
+    with pytest.raises(ValueError, match="Segmented history"):
+        HistoryManager("history.bin", segment_rows=10)
+    with pytest.raises(ValueError, match="Segmented history"):
+        HistoryManager(segment_rows=10, lazy=True)
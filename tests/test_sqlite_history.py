@@ -0,0 +1,117 @@
+"""Test module for the SQLite history storage."""
+
+import math
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from app.history_manager import HistoryManager, OperationCommand
+from app.sqlite_history import SqliteHistoryStorage
+
+COMMANDS = [
+    OperationCommand('add', 1.0, 2.0, 3.0),
+    OperationCommand('divide', 9.0, 3.0, 3.0),
+    OperationCommand('power', 10.0, 7.0, 1e7),
+    OperationCommand('divide', 5e9, 2.0, 2.5e9),
+]
+
+
+@pytest.fixture
+def database(fake_fs):
+    """Yield the path of a database in a real temporary directory (SQLite bypasses pyfakefs)."""
+    fake_fs.pause()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            yield os.path.join(tmp, "history.db")
+    finally:
+        fake_fs.resume()
+
+
+def test_history_manager_uses_sqlite_for_db_files(database):
+    """
+    Test that a '.db' history keeps the HistoryManager API, persists, and undoes by deleting one row.
+    """
+    history_manager = HistoryManager(database)
+    assert isinstance(history_manager.get_full_history(), SqliteHistoryStorage)
+    history_manager.add_to_history(COMMANDS[0])
+    history_manager.add_many(COMMANDS[1:])
+
+    assert history_manager.get_latest(2) == COMMANDS[2:]
+    assert history_manager.get_entry(1) == COMMANDS[1]
+    assert history_manager.undo_last() == COMMANDS[3]
+    history_manager.close()
+
+    reopened = HistoryManager(database)
+    assert list(reopened.iter_history()) == COMMANDS[:3]
+    reopened.clear_history()
+    assert reopened.undo_last() is None
+    assert len(HistoryManager(database).get_full_history()) == 0
+
+
+def test_sqlite_uses_wal_and_indexes(database):
+    """
+    Test that the database runs in WAL mode and result/operation queries are answered from indexes.
+    """
+    storage = SqliteHistoryStorage(database)
+    storage.extend(COMMANDS)
+
+    assert storage.find(operation='divide', min_result=1e6) == [COMMANDS[3]]
+    assert storage.find(min_result=3.0, max_result=1e7) == COMMANDS[:3]
+    storage.close()
+
+    connection = sqlite3.connect(database)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    plan = " ".join(row[-1] for row in connection.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM history WHERE result >= 1e6"))
+    assert "USING INDEX history_result" in plan
+    connection.close()
+
+
+def test_sqlite_write_behind_and_non_real_results(database):
+    """
+    Test that queued inserts are visible to reads and results without a float form read back as NaN.
+    """
+    storage = SqliteHistoryStorage(database, durability='exit')
+    storage.append(OperationCommand('power', -8.0, 0.5, complex(0, 2.8)))
+    storage.append(COMMANDS[0])
+
+    assert len(storage) == 2
+    assert math.isnan(storage[0].result)
+    assert storage.tail(1) == [COMMANDS[0]]
+    storage.close()
+
+
+def test_sqlite_history_rejects_csv_only_options(database):
+    """
+    Test that CSV-only options are refused for an SQLite history.
+    """
+    with pytest.raises(ValueError, match="not supported by SQLite history files"):
+        HistoryManager(database, lazy=True)
+
+
+@pytest.mark.parametrize("durability", [None, 'batch'])
+def test_shared_sqlite_history_sees_other_sessions(database, durability):
+    """
+    Test that shared SQLite sessions see and undo each other's rows instead of trusting a stale count.
+    """
+    first = HistoryManager(database, shared=True, durability=durability)
+    second = HistoryManager(database, shared=True, durability=durability)
+    second.add_many(COMMANDS[:2])
+    # Queued rows become visible to other sessions once written
+    second.flush()
+
+    assert len(first.get_full_history()) == 2
+    assert first.get_latest(1) == [COMMANDS[1]]
+    assert first.undo_last() == COMMANDS[1]
+    first.add_to_history(COMMANDS[2])
+    first.flush()
+
+    assert list(second.iter_history()) == [COMMANDS[0], COMMANDS[2]]
+    assert second.undo_last() == COMMANDS[2]
+    assert second.undo_last() == COMMANDS[0]
+    assert first.undo_last() is None
+    assert len(first.get_full_history()) == 0 and len(second.get_full_history()) == 0
+    first.close()
+    second.close()
@@ -0,0 +1,38 @@
+"""Tests for per-calculation time budgets."""
+import pytest
+
+from app.calculation import Addition, ModularPower
+from app.calculator import Calculator
+from app.history_manager import HistoryManager, MemoryHistoryStorage
+from app.time_budget import BudgetedRunner, TimeBudgetExceeded
+
+
+def test_calculation_over_budget_is_abandoned_and_worker_replaced(fake_fs):
+    """
+    Test that a calculation exceeding its budget raises, is not recorded, and later calculations still run.
+    """
+    calculator = Calculator(HistoryManager(storage=MemoryHistoryStorage()), time_budget=0.5)
+    # The worker needs real pipes, so suspend the fake filesystem while it runs
+    fake_fs.pause()
+    try:
+        assert calculator.perform_operation(Addition.create(1, 2)) == 3
+        with pytest.raises(TimeBudgetExceeded):
+            calculator.perform_operation(ModularPower.create(3, 2 ** 100_000, 10 ** 20_000 + 1))
+        calculation = ModularPower.create(3, 200, 7)
+        assert calculator.perform_operation(calculation) == 2
+        with pytest.raises(ZeroDivisionError):
+            calculator.perform_operation(ModularPower.create(3, 2, 0))
+    finally:
+        calculator.close()
+        fake_fs.resume()
+
+    assert str(calculation) == "ModularPower: 3 ** 200 mod 7 = 2"
+    assert [command.operation for command in calculator.get_history()] == ['add', 'powmod']
+
+
+def test_budget_must_be_positive():
+    """
+    Test that a zero budget is rejected.
+    """
+    with pytest.raises(ValueError):
+        BudgetedRunner(0)
@@ -0,0 +1,76 @@
+"""Test module for the vectorized batch compute API."""
+
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.history_manager import HistoryManager
+from app.vectorized import KERNELS, compute_batch, record_batch
+from main import operations_map
+
+A_VALUES = [7.5, -3.0, 0.0, 2.0, -8.0, 1e300, 10.0, -math.inf, math.inf, -math.inf]
+B_VALUES = [2.0, 0.0, -1.0, 0.5, 1.0 / 3.0, 3.0, -2.0, 0.5, -1.0, 2.0]
+
+
+def scalar_results(operation):
+    """Compute results through the Calculation classes, returning None where they fail."""
+    results = []
+    for a, b in zip(A_VALUES, B_VALUES):
+        try:
+            result = operations_map[operation].create(a, b).compute()
+        except (ZeroDivisionError, OverflowError):
+            result = None
+        if isinstance(result, complex):
+            result = None
+        results.append(result)
+    return results
+
+
+def test_kernels_cover_operations_map():
+    """
+    Test that every REPL operation has a vectorized kernel.
+    """
+    assert set(KERNELS) == set(operations_map)
+
+
+@pytest.mark.parametrize("operation", sorted(operations_map))
+def test_compute_batch_matches_scalar_operations(operation):
+    """
+    Test that vectorized results and error masks match the scalar Calculation classes.
+    """
+    batch = compute_batch(operation, A_VALUES, B_VALUES)
+    expected = scalar_results(operation)
+
+    assert batch.errors.tolist() == [result is None for result in expected]
+    for actual, wanted in zip(batch.results.tolist(), expected):
+        if wanted is None:
+            assert math.isnan(actual)
+        else:
+            assert actual == pytest.approx(wanted, nan_ok=True)
+
+
+def test_compute_batch_raises_like_scalar_path():
+    """
+    Test that raise_on_error surfaces the same exception as Division.compute.
+    """
+    with pytest.raises(ZeroDivisionError, match="Division by zero is not allowed"):
+        compute_batch('divide', [1.0, 2.0], [1.0, 0.0], raise_on_error=True)
+    with pytest.raises(ValueError, match="Unknown operation"):
+        compute_batch('sqrt', [1.0], [1.0])
+
+
+def test_record_batch_adds_valid_results_in_one_write():
+    """
+    Test that record_batch stores only the valid results in history.
+    """
+    history_manager = HistoryManager()
+    batch = compute_batch('mod', [10.0, 4.0, 9.0], [3.0, 0.0, 4.0])
+
+    assert record_batch(history_manager, batch) == 2
+    assert [str(command) for command in history_manager.get_full_history()] == [
+        "mod 10.0 3.0 = 1.0",
+        "mod 9.0 4.0 = 1.0",
+    ]
+    assert len(HistoryManager().get_full_history()) == 2